@@ -1,13 +1,110 @@
 """Session management for Telegram client."""
 
 import os
+import sqlite3
 from pathlib import Path
 from typing import Optional
 
+from telethon import utils
+from telethon.sessions import MemorySession, SQLiteSession
+from telethon.tl import TLObject, types
+
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Input types of the ``type`` column in a session file's sent_files table
+SENT_FILE_TYPES = (types.InputDocument, types.InputPhoto)
+
+
+class PersistentMemorySession(MemorySession):
+    """In-memory session that keeps what it learns for writing back to disk.
+
+    Entities and sent files are captured in the public ``process_entities``
+    and ``cache_file`` hooks, so they can be replayed into a session file
+    without reading ``MemorySession`` internals.
+    """
+
+    def __init__(self):
+        """Initialize an empty session."""
+        super().__init__()
+        self.entities = {}
+        self.sent_files = {}
+
+    def process_entities(self, tlo) -> None:
+        """Cache the entities found in a TL object.
+
+        Args:
+            tlo: TL object or list of users and chats
+        """
+        super().process_entities(tlo)
+
+        for entity in _collect_entities(tlo):
+            try:
+                self.entities[utils.get_peer_id(entity)] = entity
+            except TypeError:
+                continue
+
+    def cache_file(self, md5_digest: bytes, file_size: int, instance) -> None:
+        """Cache an uploaded file.
+
+        Args:
+            md5_digest: MD5 digest of the file
+            file_size: File size in bytes
+            instance: InputDocument or InputPhoto of the upload
+        """
+        super().cache_file(md5_digest, file_size, instance)
+        self.sent_files[(md5_digest, file_size, type(instance))] = instance
+
+    def get_file(self, md5_digest: bytes, file_size: int, cls):
+        """Get a cached upload.
+
+        Args:
+            md5_digest: MD5 digest of the file
+            file_size: File size in bytes
+            cls: InputDocument or InputPhoto
+
+        Returns:
+            Cached input file or None
+        """
+        return self.sent_files.get((md5_digest, file_size, cls))
+
+
+def _collect_entities(tlo) -> list:
+    """Get the users and chats carried by a TL object, like Telethon does."""
+    if not isinstance(tlo, TLObject) and utils.is_list_like(tlo):
+        return list(tlo)
+
+    entities = []
+    for name in ("user", "chat"):
+        if hasattr(tlo, name):
+            entities.append(getattr(tlo, name))
+    for name in ("chats", "users"):
+        if utils.is_list_like(getattr(tlo, name, None)):
+            entities.extend(getattr(tlo, name))
+
+    return entities
+
+
+def _row_to_entity(marked_id: int, access_hash: int, username: Optional[str],
+                   phone: Optional[str], name: Optional[str]):
+    """Rebuild a minimal user or chat from a session file entity row."""
+    entity_id, peer_type = utils.resolve_id(marked_id)
+
+    if peer_type is types.PeerUser:
+        return types.User(
+            id=entity_id, access_hash=access_hash, username=username, phone=phone, first_name=name
+        )
+    if peer_type is types.PeerChat:
+        return types.Chat(
+            id=entity_id, title=name or "", photo=types.ChatPhotoEmpty(),
+            participants_count=0, date=None, version=0
+        )
+    return types.Channel(
+        id=entity_id, title=name or "", photo=types.ChatPhotoEmpty(), date=None,
+        access_hash=access_hash, username=username
+    )
+
 
 class SessionManager:
     """Manages Telegram session files."""
@@ -141,6 +238,112 @@ class SessionManager:
             logger.error(f"Failed to restore session: {e}")
             return False
 
+    def load_memory_session(self, session_name: str) -> PersistentMemorySession:
+        """Load a session file into an in-memory Telethon session.
+
+        The returned session never touches the disk; persist it with
+        ``flush_memory_session`` at safe points.
+
+        Args:
+            session_name: Session name
+
+        Returns:
+            In-memory session (empty if no session file exists)
+        """
+        memory = PersistentMemorySession()
+        session_file = self.session_dir / f"{session_name}.session"
+
+        if not session_file.exists():
+            logger.info(f"No session file to load, starting in-memory session: {session_name}")
+            return memory
+
+        stored = SQLiteSession(str(session_file))
+
+        try:
+            memory.set_dc(stored.dc_id, stored.server_address, stored.port)
+            memory.auth_key = stored.auth_key
+            memory.takeout_id = stored.takeout_id
+
+            for entity_id, state in stored.get_update_states():
+                memory.set_update_state(entity_id, state)
+        finally:
+            stored.close()
+
+        # Session files are plain SQLite; their tables are read directly
+        # and fed through the session's public caching hooks
+        conn = sqlite3.connect(f"file:{session_file}?mode=ro", uri=True)
+        try:
+            memory.process_entities([
+                _row_to_entity(*row) for row in
+                conn.execute('select id, hash, username, phone, name from entities')
+            ])
+
+            for md5_digest, file_size, file_type, file_id, file_hash in conn.execute(
+                'select md5_digest, file_size, type, id, hash from sent_files'
+            ):
+                memory.cache_file(md5_digest, file_size, SENT_FILE_TYPES[file_type](
+                    id=file_id, access_hash=file_hash, file_reference=b""
+                ))
+        finally:
+            conn.close()
+
+        logger.info(
+            f"Session loaded into memory: {session_name} "
+            f"({len(memory.entities)} entities)"
+        )
+        return memory
+
+    def flush_memory_session(self, session_name: str, memory: PersistentMemorySession) -> bool:
+        """Write an in-memory session back to its session file.
+
+        The session is written to a temporary file first; the current file
+        is kept with ``backup_session`` and then atomically replaced.
+
+        Args:
+            session_name: Session name
+            memory: In-memory session to persist
+
+        Returns:
+            True if flushed successfully
+        """
+        if memory.auth_key is None:
+            logger.warning(f"Not flushing unauthorized session: {session_name}")
+            return False
+
+        session_file = self.session_dir / f"{session_name}.session"
+        temp_file = self.session_dir / f"{session_name}.flush.session"
+
+        try:
+            temp_file.unlink(missing_ok=True)
+            stored = SQLiteSession(str(temp_file))
+
+            try:
+                stored.set_dc(memory.dc_id, memory.server_address, memory.port)
+                stored.auth_key = memory.auth_key
+                stored.takeout_id = memory.takeout_id
+
+                for entity_id, state in memory.get_update_states():
+                    stored.set_update_state(entity_id, state)
+
+                stored.process_entities(list(memory.entities.values()))
+
+                for (md5_digest, file_size, _), instance in memory.sent_files.items():
+                    stored.cache_file(md5_digest, file_size, instance)
+            finally:
+                stored.close()
+
+            if session_file.exists():
+                self.backup_session(session_name)
+
+            os.replace(temp_file, session_file)
+            logger.info(f"Session flushed to disk: {session_name}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to flush session: {e}")
+            temp_file.unlink(missing_ok=True)
+            return False
+
     def get_session_info(self, session_name: str) -> Optional[dict]:
         """Get information about a session file.
 
@@ -14,6 +14,7 @@ class TelegramConfig(BaseModel):
     api_hash: str
     phone: str
     session_name: str = "auto_booking_session"
+    in_memory_session: bool = False
 
 
 class BotConfig(BaseModel):
@@ -28,6 +29,16 @@ class BookingConfig(BaseModel):
     preparation_time_seconds: int = 60
     monitoring_start_seconds: int = 10
     sms_reaction_time_ms: int = 50
+    keepalive_interval_ms: int = 1000
+    rtt_degradation_factor: float = 2.0
+    fallback_to_any: bool = True
+    speculative_mode: bool = False
+    event_driven: bool = False
+    warm_up_rounds: int = 3
+    freeze_gc: bool = True
+    gc_freeze_max_seconds: int = 120
+    record_dir: Optional[str] = None
+    trace_dir: Optional[str] = None
 
     @validator('target_time')
     def validate_time_format(cls, v):
@@ -45,6 +56,8 @@ class TargetShipment(BaseModel):
     type: str
     cities: List[str]
     priority: int = 1
+    min_quantity: int = 0
+    max_quantity: Optional[int] = None
 
 
 class PerformanceConfig(BaseModel):
@@ -55,6 +68,11 @@ class PerformanceConfig(BaseModel):
     max_retries: int = 3
     connection_timeout: int = 10
     polling_interval_ms: int = 30
+    hedge_confirm: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 5
+    loop_monitor: bool = False
+    loop_stall_threshold_ms: float = 20.0
 
 
 class NotificationConfig(BaseModel):
@@ -143,13 +161,20 @@ def create_example_config(output_path: str = "config.example.yaml") -> None:
             "target_time": "11:30:00",
             "preparation_time_seconds": 60,
             "monitoring_start_seconds": 10,
-            "sms_reaction_time_ms": 50
+            "sms_reaction_time_ms": 50,
+            "keepalive_interval_ms": 1000,
+            "rtt_degradation_factor": 2.0,
+            "fallback_to_any": True,
+            "speculative_mode": False,
+            "record_dir": None,
+            "trace_dir": None
         },
         "targets": [
             {
                 "type": "прямые",
                 "cities": ["Челябинск", "Екатеринбург"],
-                "priority": 1
+                "priority": 1,
+                "min_quantity": 2
             },
             {
                 "type": "магистральные",
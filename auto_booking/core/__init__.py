@@ -2,12 +2,13 @@
 
 from .client import BookingClient
 from .bot_handler import BotHandler
-from .button_clicker import ButtonClicker
+from .button_clicker import ButtonClicker, HedgePolicy
 from .scheduler import BookingScheduler
 
 __all__ = [
     'BookingClient',
     'BotHandler',
     'ButtonClicker',
+    'HedgePolicy',
     'BookingScheduler',
 ]
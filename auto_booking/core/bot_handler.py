@@ -5,14 +5,26 @@ import time
 from datetime import datetime
 from typing import Optional, Callable, List
 
+from telethon import events
+from telethon.errors import MessageIdInvalidError
 from telethon.tl.types import Message
 
 from ..utils.logger import get_logger
 from ..utils.metrics import MetricsCollector
-from .button_clicker import ButtonClicker
+from ..utils.tracing import Tracer, span
+from .button_clicker import CONFIRM_PATTERNS, ButtonClicker, HedgePolicy
+from .message_tracker import MessageTracker
+from .shipment_parser import ShipmentButton, parse_shipment_buttons, predict_confirm_data
 
 logger = get_logger(__name__)
 
+# Per-request deadline is at least this multiple of the operation's p90
+RTT_TIMEOUT_FACTOR = 2.0
+# Pause between re-fetches of a message the bot has not sent yet
+REFETCH_DELAY = 0.005
+# Safety-net fetch interval while waiting for pushed updates (seconds)
+EVENT_FALLBACK_POLL = 1.0
+
 
 class BotHandler:
     """Handles bot message monitoring and automated responses."""
@@ -22,7 +34,12 @@ class BotHandler:
         client,
         bot_username: str,
         sms_trigger_text: str,
-        target_cities: List[str]
+        target_cities: List[str],
+        targets: Optional[list] = None,
+        fallback_to_any: bool = True,
+        speculative_mode: bool = False,
+        trace_dir: Optional[str] = None,
+        performance=None
     ):
         """Initialize bot handler.
 
@@ -30,15 +47,48 @@ class BotHandler:
             client: Telegram client instance
             bot_username: Bot username to monitor
             sms_trigger_text: Text that triggers SMS detection
-            target_cities: List of target cities for booking
+            target_cities: List of target cities for booking, in priority order
+            targets: Target configurations with quantity rules (optional)
+            fallback_to_any: Select any available shipment if no target matches
+            speculative_mode: Fire select/confirm callbacks predicted from a
+                menu snapshot instead of fetching each message first
+            trace_dir: Directory for per-attempt Chrome trace files (optional)
+            performance: PerformanceConfig whose stage budgets, retries,
+                connection timeout and confirm hedging are enforced (optional)
         """
         self.client = client
         self.bot_username = bot_username
         self.sms_trigger_text = sms_trigger_text
         self.target_cities = target_cities
         self.button_clicker = ButtonClicker(client.client, bot_username)
+        self.fallback_to_any = fallback_to_any
+        self.shipment_selector = self.button_clicker.compile_selector(
+            targets or target_cities
+        )
+        self.speculative_mode = speculative_mode
+        self.menu_snapshot: Optional[dict] = None
+        self.trace_dir = trace_dir
+        self.performance = performance
+
+        if performance is not None and performance.hedge_confirm:
+            self.button_clicker.hedge_policy = HedgePolicy(
+                percentile=performance.hedge_percentile,
+                min_samples=performance.hedge_min_samples
+            )
+            self.button_clicker.rtt_metrics = getattr(client, "metrics", None)
+
+        self.last_trace: Optional[Tracer] = None
         self.metrics = MetricsCollector()
-        self.last_message_id = 0
+        self.tracker = MessageTracker(client, bot_username)
+
+    @property
+    def last_message_id(self) -> int:
+        """ID of the newest bot message already processed."""
+        return self.tracker.last_message_id
+
+    @last_message_id.setter
+    def last_message_id(self, message_id: int) -> None:
+        self.tracker.last_message_id = message_id
 
     async def initialize(self) -> None:
         """Initialize handler and get last message ID."""
@@ -70,17 +120,25 @@ class BotHandler:
     async def monitor_sms(
         self,
         polling_interval_ms: int = 30,
-        timeout_seconds: int = 20
+        timeout_seconds: int = 20,
+        event_driven: bool = False
     ) -> Optional[Message]:
         """Monitor for SMS notification with ultra-low latency.
 
+        Every message newer than the last processed one is checked, in
+        order, so a burst of bot messages cannot hide the SMS.
+
         Args:
             polling_interval_ms: Polling interval in milliseconds
             timeout_seconds: Monitoring timeout in seconds
+            event_driven: Wait for pushed updates instead of polling
 
         Returns:
             SMS message if detected, None otherwise
         """
+        if event_driven:
+            return await self._monitor_sms_events(timeout_seconds)
+
         logger.info(f"Starting intensive SMS monitoring (polling every {polling_interval_ms}ms)")
 
         start_time = time.time()
@@ -88,20 +146,10 @@ class BotHandler:
 
         while (time.time() - start_time) < timeout_seconds:
             try:
-                messages = await self.client.get_latest_messages(
-                    self.bot_username,
-                    limit=1,
-                    min_id=self.last_message_id
-                )
+                sms_message = self._find_sms(await self.tracker.fetch_new())
 
-                if messages and messages[0].id > self.last_message_id:
-                    message = messages[0]
-                    self.last_message_id = message.id
-
-                    if self.is_sms_notification(message):
-                        detection_time = datetime.now()
-                        logger.info(f"✅ SMS detected at {detection_time.strftime('%H:%M:%S.%f')[:-3]}")
-                        return message
+                if sms_message is not None:
+                    return sms_message
 
                 await asyncio.sleep(polling_interval)
 
@@ -112,16 +160,86 @@ class BotHandler:
         logger.warning("SMS monitoring timeout reached")
         return None
 
+    async def _monitor_sms_events(self, timeout_seconds: float) -> Optional[Message]:
+        """Wait for the SMS among pushed updates.
+
+        Lost updates are detected by the tracker and recovered with a
+        batched fetch; a slow fetch also runs when nothing arrives for
+        ``EVENT_FALLBACK_POLL`` seconds.
+
+        Args:
+            timeout_seconds: Monitoring timeout in seconds
+
+        Returns:
+            SMS message if detected, None otherwise
+        """
+        logger.info("Starting event-driven SMS monitoring")
+
+        telegram = self.client.client
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_update(update) -> None:
+            try:
+                for message in await self.tracker.handle_update(update):
+                    queue.put_nowait(message)
+            except Exception as e:
+                logger.error(f"Error handling update: {e}")
+
+        await self.tracker.resolve_bot()
+        telegram.add_event_handler(on_update, events.Raw)
+        deadline = time.monotonic() + timeout_seconds
+
+        try:
+            await self.tracker.sync_state()
+
+            # Catch up on anything sent before the handler was registered
+            sms_message = self._find_sms(await self.tracker.fetch_new())
+
+            while sms_message is None:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    logger.warning("SMS monitoring timeout reached")
+                    return None
+
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), min(remaining, EVENT_FALLBACK_POLL)
+                    )
+                    sms_message = self._find_sms([message])
+                except asyncio.TimeoutError:
+                    sms_message = self._find_sms(await self.tracker.fetch_new())
+
+            return sms_message
+
+        finally:
+            telegram.remove_event_handler(on_update, events.Raw)
+
+            if self.tracker.gaps:
+                self.metrics.increment_counter("update_gaps", self.tracker.gaps)
+                self.metrics.increment_counter("recovered_messages", self.tracker.recovered)
+
+    def _find_sms(self, messages: List[Message]) -> Optional[Message]:
+        """Get the first SMS notification among messages in arrival order."""
+        for message in messages:
+            if self.is_sms_notification(message):
+                detection_time = datetime.now()
+                logger.info(f"✅ SMS detected at {detection_time.strftime('%H:%M:%S.%f')[:-3]}")
+                return message
+
+        return None
+
     async def execute_booking_sequence(
         self,
         sms_message: Message,
-        target_shipment_patterns: List[str]
+        target_shipment_patterns: Optional[List[str]] = None
     ) -> dict:
         """Execute ultra-fast booking sequence.
 
         Args:
             sms_message: The SMS notification message
-            target_shipment_patterns: List of shipment patterns to look for
+            target_shipment_patterns: List of shipment patterns to look for;
+                configured targets are used when omitted
 
         Returns:
             Dictionary with timing statistics and result
@@ -136,91 +254,141 @@ class BotHandler:
             "error": None
         }
 
+        tracer = Tracer("booking_attempt")
+        trace_token = tracer.activate()
+        tracer.instant("sms_detected", message_id=sms_message.id)
+        stage_start_ns = time.perf_counter_ns()
+
         try:
             # STAGE 1: Send /start command immediately
             logger.info("STAGE 1: Sending /start command...")
-            await self.client.send_message(self.bot_username, "/start")
+            start_message_id = await self._with_deadline(
+                "sms_to_start_ms",
+                (self.client.metrics, "send_message"),
+                self.client.send_message,
+                self.bot_username,
+                "/start",
+                retry=False
+            )
             start_sent_time = time.perf_counter()
+            stage_start_ns = self._trace_stage(tracer, "stage.sms_to_start", stage_start_ns)
 
             stage1_ms = (start_sent_time - sms_received_time) * 1000
             stats["stages"]["sms_to_start_ms"] = round(stage1_ms, 2)
+            self._check_budget(stats, "sms_to_start_ms", stage1_ms)
             logger.info(f"✅ Stage 1: {stage1_ms:.2f}ms (SMS → /start)")
 
-            # Minimal delay for response
-            await asyncio.sleep(0.015)
+            selected_message_id = None
+            target_button = None
 
-            # STAGE 2: Get menu with shipments
-            logger.info("STAGE 2: Retrieving shipment menu...")
-            messages = await self.client.get_latest_messages(self.bot_username, limit=1)
+            if self.speculative_mode and self.menu_snapshot and start_message_id is None:
+                # Nothing to predict the menu ID from
+                logger.warning("/start message ID unknown, speculative select skipped")
+            elif self.speculative_mode and self.menu_snapshot:
+                stats["speculative"] = {"select": None, "confirm": None, "saved_ms": 0.0}
+                target_button = self.menu_snapshot["target"]
+                with span("speculative.select", predicted_id=start_message_id + 1):
+                    selected_message_id = await self._speculative_select(
+                        start_message_id, target_button, stats
+                    )
+
+            if selected_message_id is None:
+                # Minimal delay for response
+                with span("wait.menu"):
+                    await asyncio.sleep(0.015)
+
+                # STAGE 2: Get menu with shipments
+                logger.info("STAGE 2: Retrieving shipment menu...")
+                menu_message = await self._await_message(
+                    "start_to_select_ms",
+                    lambda message: not message.out and message.reply_markup is not None
+                )
 
-            if not messages:
-                raise Exception("No menu message received")
+                if menu_message is None:
+                    raise Exception("No menu message received")
 
-            menu_message = messages[0]
-            all_buttons = await self.button_clicker.get_all_buttons(menu_message)
+                with span("parse.buttons", message_id=menu_message.id):
+                    all_buttons = await self.button_clicker.get_all_buttons(menu_message)
 
-            if not all_buttons:
-                raise Exception("No buttons found in menu")
+                if not all_buttons:
+                    raise Exception("No buttons found in menu")
 
-            logger.info(f"Found {len(all_buttons)} buttons in menu")
+                logger.info(f"Found {len(all_buttons)} buttons in menu")
 
-            # STAGE 3: Select target shipment
-            logger.info("STAGE 3: Selecting target shipment...")
-            shipment_selected = False
-            target_button = None
-
-            for pattern in target_shipment_patterns:
-                button_info = await self.button_clicker.find_button_by_pattern(
+                # STAGE 3: Select target shipment
+                logger.info("STAGE 3: Selecting target shipment...")
+                selector = (
+                    self.button_clicker.compile_selector(target_shipment_patterns)
+                    if target_shipment_patterns else self.shipment_selector
+                )
+                target_button = await self.button_clicker.select_shipment(
                     menu_message,
-                    [pattern]
+                    selector,
+                    allow_fallback=self.fallback_to_any
                 )
-                if button_info:
-                    target_button = button_info
-                    break
 
-            if not target_button:
-                # Try first available button as fallback
-                if all_buttons:
-                    target_button = all_buttons[0]
-                    logger.warning(f"Using fallback button: {target_button[0]}")
+                if not target_button:
+                    raise Exception("No suitable shipment button found")
 
-            if target_button:
-                button_text, button_data = target_button
-                logger.info(f"Selected shipment: {button_text}")
+                logger.info(f"Selected shipment: {target_button.text}")
 
                 shipment_click_start = time.perf_counter()
-                await self.button_clicker.ultra_fast_click(
+                await self._with_deadline(
+                    "start_to_select_ms",
+                    (self.button_clicker.metrics, "select_shipment"),
+                    self.button_clicker.ultra_fast_click,
                     menu_message,
-                    button_data,
+                    target_button.data,
                     "select_shipment"
                 )
                 stage2_ms = (time.perf_counter() - shipment_click_start) * 1000
-                stats["stages"]["start_to_select_ms"] = round(stage2_ms, 2)
-                stats["selected_shipment"] = button_text
-                logger.info(f"✅ Stage 2: {stage2_ms:.2f}ms (/start → select)")
-
-                shipment_selected = True
+                selected_message_id = menu_message.id
             else:
-                raise Exception("No suitable shipment button found")
+                stage2_ms = (time.perf_counter() - start_sent_time) * 1000
 
-            # Minimal delay
-            await asyncio.sleep(0.015)
+            stats["stages"]["start_to_select_ms"] = round(stage2_ms, 2)
+            self._check_budget(stats, "start_to_select_ms", stage2_ms)
+            stage_start_ns = self._trace_stage(tracer, "stage.start_to_select", stage_start_ns)
+            stats["selected_shipment"] = target_button.text
+            logger.info(f"✅ Stage 2: {stage2_ms:.2f}ms (/start → select)")
 
-            # STAGE 4: Get confirmation message and click confirm
+            # STAGE 4: Click confirm, predicting its callback when possible
             logger.info("STAGE 4: Confirming booking...")
-            new_messages = await self.client.get_latest_messages(self.bot_username, limit=1)
-
-            if not new_messages:
-                raise Exception("No confirmation message received")
+            confirm_time = None
+
+            if self.speculative_mode:
+                stats.setdefault("speculative", {"select": None, "confirm": None, "saved_ms": 0.0})
+                with span("speculative.confirm", message_id=selected_message_id):
+                    confirm_time = await self._speculative_confirm(
+                        selected_message_id, target_button, stats
+                    )
+
+            if confirm_time is None:
+                # Minimal delay
+                with span("wait.detail"):
+                    await asyncio.sleep(0.015)
+
+                confirm_matcher = self.button_clicker.compile_targets(CONFIRM_PATTERNS)
+                confirm_message = await self._await_message(
+                    "select_to_confirm_ms",
+                    lambda message: confirm_matcher.first_button(message) is not None
+                )
 
-            confirm_message = new_messages[0]
-            confirm_click_start = time.perf_counter()
+                if confirm_message is None:
+                    raise Exception("No confirmation message received")
 
-            confirm_time = await self.button_clicker.click_confirm_button(confirm_message)
+                confirm_time = await self._with_deadline(
+                    "select_to_confirm_ms",
+                    (self.button_clicker.metrics, "confirm_booking"),
+                    self.button_clicker.click_confirm_button,
+                    confirm_message
+                )
 
             if confirm_time is not None:
+                self._trace_stage(tracer, "stage.select_to_confirm", stage_start_ns)
                 stage3_ms = confirm_time
                 stats["stages"]["select_to_confirm_ms"] = round(stage3_ms, 2)
+                self._check_budget(stats, "select_to_confirm_ms", stage3_ms)
                 logger.info(f"✅ Stage 3: {stage3_ms:.2f}ms (select → confirm)")
             else:
                 raise Exception("Confirm button not found or failed to click")
@@ -231,7 +399,8 @@ class BotHandler:
             stats["success"] = True
 
             # Wait for result
-            await asyncio.sleep(0.1)
+            with span("wait.result"):
+                await asyncio.sleep(0.1)
 
             # Get final result message
             result_messages = await self.client.get_latest_messages(self.bot_username, limit=1)
@@ -249,8 +418,337 @@ class BotHandler:
             stats["error"] = str(e)
             stats["total_time_ms"] = round((time.perf_counter() - total_start) * 1000, 2)
 
+        finally:
+            Tracer.deactivate(trace_token)
+            self.last_trace = tracer
+
+        if self.trace_dir:
+            stats["trace_file"] = tracer.export(
+                f"{self.trace_dir}/booking_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json"
+            )
+            logger.info(f"Attempt trace written to {stats['trace_file']}")
+
         return stats
 
+    def _stage_timeout(self, stage: str, history: tuple) -> Optional[float]:
+        """Get the per-request deadline of a stage operation.
+
+        The deadline is the stage budget, raised to ``RTT_TIMEOUT_FACTOR``
+        times the operation's historical p90 latency (a budget below what
+        the round trip and the bot need would time out every request). An
+        operation without history gets ``connection_timeout``.
+
+        Args:
+            stage: Budget name in PerformanceConfig
+            history: Tuple of (MetricsCollector, action name) holding the
+                operation's past latencies
+
+        Returns:
+            Timeout in seconds, or None when no budgets are configured
+        """
+        if self.performance is None:
+            return None
+
+        metrics, action_name = history
+        p90_ms = metrics.get_percentile(action_name, 90)
+
+        if p90_ms is None:
+            return float(self.performance.connection_timeout)
+
+        timeout_ms = max(getattr(self.performance, stage), p90_ms * RTT_TIMEOUT_FACTOR)
+        return min(timeout_ms / 1000.0, self.performance.connection_timeout)
+
+    def _attempts(self) -> int:
+        """Number of tries per stage operation."""
+        return 1 if self.performance is None else self.performance.max_retries + 1
+
+    async def _with_deadline(self, stage: str, history: tuple, operation: Callable, *args,
+                             retry: bool = True):
+        """Run a stage operation under the stage deadline, retrying on timeout.
+
+        A timed out request may still have reached Telegram, so only
+        requests that are safe to repeat are retried. With ``retry=False``
+        the original request keeps running and each overrun deadline only
+        extends the wait.
+
+        Args:
+            stage: Budget name in PerformanceConfig
+            history: Latency history of the operation (see ``_stage_timeout``)
+            operation: Coroutine function to run
+            *args: Operation arguments
+            retry: Whether the operation can be sent again
+
+        Returns:
+            Operation result
+
+        Raises:
+            asyncio.TimeoutError: If every try overran the deadline
+        """
+        timeout = self._stage_timeout(stage, history)
+        attempts = self._attempts()
+        request = None if retry else asyncio.ensure_future(operation(*args))
+
+        try:
+            for attempt in range(attempts):
+                try:
+                    if request is None:
+                        return await asyncio.wait_for(operation(*args), timeout)
+                    return await asyncio.wait_for(asyncio.shield(request), timeout)
+                except asyncio.TimeoutError:
+                    self.metrics.increment_counter(f"stage_timeout_{stage}")
+                    logger.warning(
+                        f"{stage}: no answer within {timeout * 1000:.0f}ms "
+                        f"(try {attempt + 1}/{attempts})"
+                    )
+                    if attempt + 1 == attempts:
+                        raise asyncio.TimeoutError(f"{stage}: no answer after {attempts} tries")
+
+                    self.metrics.increment_counter(
+                        f"stage_retry_{stage}" if request is None else f"stage_wait_{stage}"
+                    )
+        finally:
+            if request is not None and not request.done():
+                request.cancel()
+
+    async def _await_message(self, stage: str, predicate: Callable[[Message], bool]) -> Optional[Message]:
+        """Fetch the latest bot message until it is the expected one.
+
+        Each fetch runs under the stage deadline; a timed out fetch or a
+        message the bot has not replaced yet is re-fetched right away, up
+        to ``max_retries`` times.
+
+        Args:
+            stage: Budget name in PerformanceConfig
+            predicate: Check identifying the expected message
+
+        Returns:
+            Expected message or None
+        """
+        timeout = self._stage_timeout(stage, (self.client.metrics, "get_messages"))
+        attempts = self._attempts()
+
+        for attempt in range(attempts):
+            if attempt:
+                self.metrics.increment_counter(f"stage_retry_{stage}")
+
+            try:
+                messages = await asyncio.wait_for(
+                    self.client.get_latest_messages(self.bot_username, limit=1),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                self.metrics.increment_counter(f"stage_timeout_{stage}")
+                continue
+
+            if messages and predicate(messages[0]):
+                return messages[0]
+
+            if attempt + 1 < attempts:
+                await asyncio.sleep(REFETCH_DELAY)
+
+        return None
+
+    def _check_budget(self, stats: dict, stage: str, elapsed_ms: float) -> None:
+        """Count a stage that exceeded its PerformanceConfig budget.
+
+        Args:
+            stats: Attempt statistics to update
+            stage: Budget name in PerformanceConfig
+            elapsed_ms: Measured stage duration
+        """
+        if self.performance is None:
+            return
+
+        budget_ms = getattr(self.performance, stage)
+        if elapsed_ms <= budget_ms:
+            return
+
+        self.metrics.increment_counter(f"budget_violation_{stage}")
+        stats.setdefault("budget_violations", {})[stage] = round(elapsed_ms - budget_ms, 2)
+        logger.warning(f"{stage} over budget: {elapsed_ms:.2f}ms > {budget_ms}ms")
+
+    @staticmethod
+    def _trace_stage(tracer: Tracer, name: str, start_ns: int) -> int:
+        """Record a finished booking stage as a span.
+
+        Args:
+            tracer: Tracer of the attempt
+            name: Stage span name
+            start_ns: Stage start from ``time.perf_counter_ns``
+
+        Returns:
+            End of the stage, i.e. start of the next one
+        """
+        end_ns = time.perf_counter_ns()
+        tracer.complete(name, start_ns, end_ns)
+        return end_ns
+
+    async def prepare_fast_path(self) -> None:
+        """Pre-build /start and callback requests for the booking sequence."""
+        self.button_clicker.templates = await self.client.prepare_fast_path(
+            self.bot_username
+        )
+
+    async def snapshot_menu(self, history_limit: int = 10) -> bool:
+        """Snapshot the shipment menu's callback map for speculative mode.
+
+        Called during preparation. The latest message carrying shipment
+        buttons is parsed and the shipment that would be selected is kept,
+        so that at booking time its callback can be fired without fetching
+        and parsing the menu again.
+
+        Args:
+            history_limit: Number of recent messages to look through
+
+        Returns:
+            True if a target shipment was found in the snapshot
+        """
+        self.menu_snapshot = None
+        messages = await self.client.get_latest_messages(self.bot_username, limit=history_limit)
+
+        for message in messages:
+            shipments = parse_shipment_buttons(message)
+            if not shipments:
+                continue
+
+            target = await self.button_clicker.select_shipment(
+                message,
+                self.shipment_selector,
+                allow_fallback=self.fallback_to_any
+            )
+
+            if target is None:
+                logger.warning("Menu snapshot has no suitable shipment")
+                return False
+
+            self.menu_snapshot = {
+                "message_id": message.id,
+                "callbacks": {shipment.text: shipment.data for shipment in shipments},
+                "target": target,
+                "taken_at": datetime.now().isoformat()
+            }
+            logger.info(
+                f"Menu snapshot taken: {len(shipments)} shipments, target {target.text}"
+            )
+            return True
+
+        logger.warning("No shipment menu found for snapshot")
+        return False
+
+    def _fetch_cost_ms(self) -> float:
+        """Estimate the cost of a skipped fetch round trip.
+
+        Returns:
+            Average message fetch latency plus the fixed pre-fetch delay
+        """
+        fetch_stats = self.client.metrics.get_action_stats("get_messages")
+        fetch_ms = fetch_stats["avg_ms"] if fetch_stats["recorded"] else 0.0
+
+        return fetch_ms + 15.0
+
+    async def _speculative_select(
+        self,
+        start_message_id: int,
+        target: ShipmentButton,
+        stats: dict,
+        max_attempts: int = 5
+    ) -> Optional[int]:
+        """Select the snapshot target without fetching the menu.
+
+        The bot answers /start with the next message in the chat, so the
+        menu's ID is predicted as the /start message ID plus one. A
+        ``MESSAGE_ID_INVALID`` answer means the menu has not been sent yet
+        and the click is retried; any other rejection (e.g. ``DATA_INVALID``
+        when the menu changed) or an overrun stage deadline is a miss.
+
+        Args:
+            start_message_id: ID of the /start message just sent
+            target: Shipment selected from the snapshot
+            stats: Attempt statistics to update
+            max_attempts: Maximum number of clicks while the menu is pending
+
+        Returns:
+            Menu message ID on hit, None on miss
+        """
+        predicted_id = start_message_id + 1
+
+        for _ in range(max_attempts):
+            try:
+                await self._with_deadline(
+                    "start_to_select_ms",
+                    (self.button_clicker.metrics, "speculative_select"),
+                    self.button_clicker.click_by_id,
+                    predicted_id,
+                    target.data,
+                    "speculative_select"
+                )
+                saved_ms = self._fetch_cost_ms()
+                self.metrics.increment_counter("speculative_select_hit")
+                self.metrics.record_action("speculative_saved_ms", saved_ms)
+                stats["speculative"]["select"] = "hit"
+                stats["speculative"]["saved_ms"] += round(saved_ms, 2)
+                logger.info(f"⚡ Speculative select hit (saved ~{saved_ms:.2f}ms)")
+                return predicted_id
+
+            except MessageIdInvalidError:
+                await asyncio.sleep(0.005)
+
+            except Exception as e:
+                logger.info(f"Speculative select rejected: {e}")
+                break
+
+        self.metrics.increment_counter("speculative_select_miss")
+        stats["speculative"]["select"] = "miss"
+        return None
+
+    async def _speculative_confirm(
+        self,
+        message_id: int,
+        shipment: ShipmentButton,
+        stats: dict
+    ) -> Optional[float]:
+        """Click the predicted confirm callback without fetching the detail.
+
+        The click runs under the ``select_to_confirm_ms`` deadline; a click
+        that overruns it is a miss and the detail is fetched instead.
+
+        Args:
+            message_id: ID of the message the shipment was selected in
+            shipment: Selected shipment
+            stats: Attempt statistics to update
+
+        Returns:
+            Reaction time in ms on hit, None on miss
+        """
+        confirm_data = predict_confirm_data(shipment)
+
+        if confirm_data is None:
+            return None
+
+        try:
+            elapsed = await self._with_deadline(
+                "select_to_confirm_ms",
+                (self.button_clicker.metrics, "confirm_booking"),
+                self.button_clicker.hedged_click,
+                message_id,
+                confirm_data,
+                "confirm_booking"
+            )
+        except Exception as e:
+            logger.info(f"Speculative confirm rejected: {e}")
+            self.metrics.increment_counter("speculative_confirm_miss")
+            stats["speculative"]["confirm"] = "miss"
+            return None
+
+        saved_ms = self._fetch_cost_ms()
+        self.metrics.increment_counter("speculative_confirm_hit")
+        self.metrics.record_action("speculative_saved_ms", saved_ms)
+        stats["speculative"]["confirm"] = "hit"
+        stats["speculative"]["saved_ms"] += round(saved_ms, 2)
+        logger.info(f"⚡ Speculative confirm hit (saved ~{saved_ms:.2f}ms)")
+
+        return elapsed
+
     def get_metrics(self) -> dict:
         """Get handler metrics.
 
@@ -1,15 +1,58 @@
 """Ultra-fast button clicking logic."""
 
+import asyncio
 import time
-from typing import Optional, List
+from typing import Dict, NamedTuple, Optional, List, Sequence
 from telethon.tl.types import Message, KeyboardButtonCallback
 from telethon.tl.functions.messages import GetBotCallbackAnswerRequest
 
 from ..utils.logger import get_logger
 from ..utils.metrics import MetricsCollector
+from ..utils.tracing import span
+from .button_matcher import ButtonMatcher
+from .shipment_parser import ShipmentButton, ShipmentSelector, build_rules
 
 logger = get_logger(__name__)
 
+CONFIRM_PATTERNS = ("подтвердить", "confirm", "✅")
+
+
+class HedgePolicy(NamedTuple):
+    """When to send a duplicate of a slow callback request."""
+    percentile: float = 95.0
+    min_samples: int = 5
+    rtt_factor: float = 2.0
+    fallback_delay_ms: Optional[float] = None
+    max_hedges: int = 1
+
+    def delay_ms(
+        self,
+        metrics: MetricsCollector,
+        action_name: str,
+        rtt_metrics: Optional[MetricsCollector] = None
+    ) -> Optional[float]:
+        """Get the wait before hedging an action.
+
+        Uses the action's own latency history; until it has ``min_samples``
+        entries, falls back to ``rtt_factor`` times the ping RTT percentile,
+        then to ``fallback_delay_ms``.
+
+        Args:
+            metrics: Collector with the action's latency history
+            action_name: Action to hedge
+            rtt_metrics: Collector with ``ping_rtt`` samples (optional)
+
+        Returns:
+            Delay in milliseconds, or None if the action should not be hedged
+        """
+        if len(metrics.metrics.get(action_name, ())) >= self.min_samples:
+            return metrics.get_percentile(action_name, self.percentile)
+
+        if rtt_metrics is not None and len(rtt_metrics.metrics.get("ping_rtt", ())) >= self.min_samples:
+            return rtt_metrics.get_percentile("ping_rtt", self.percentile) * self.rtt_factor
+
+        return self.fallback_delay_ms
+
 
 class ButtonClicker:
     """Handles ultra-fast clicking of inline buttons."""
@@ -24,6 +67,97 @@ class ButtonClicker:
         self.client = client
         self.bot_username = bot_username
         self.metrics = MetricsCollector()
+        self._matchers: Dict[tuple, ButtonMatcher] = {}
+        self._selectors: Dict[tuple, ShipmentSelector] = {}
+        self.templates = None
+        self.hedge_policy: Optional[HedgePolicy] = None
+        self.rtt_metrics: Optional[MetricsCollector] = None
+
+    def compile_targets(self, patterns: Sequence[str]) -> ButtonMatcher:
+        """Get a precompiled matcher for patterns.
+
+        Matchers are cached, so compiling the same patterns again is a
+        dictionary lookup.
+
+        Args:
+            patterns: Text patterns in priority order
+
+        Returns:
+            Compiled button matcher
+        """
+        key = tuple(patterns)
+        matcher = self._matchers.get(key)
+
+        if matcher is None:
+            matcher = ButtonMatcher(key)
+            self._matchers[key] = matcher
+
+        return matcher
+
+    def compile_selector(self, targets: Sequence) -> ShipmentSelector:
+        """Get a precompiled shipment selector for targets.
+
+        Args:
+            targets: City patterns or target configurations
+
+        Returns:
+            Compiled shipment selector
+        """
+        rules = tuple(build_rules(targets))
+        selector = self._selectors.get(rules)
+
+        if selector is None:
+            selector = ShipmentSelector(rules)
+            self._selectors[rules] = selector
+
+        return selector
+
+    async def select_shipment(
+        self,
+        message: Message,
+        selector: ShipmentSelector,
+        allow_fallback: bool = True
+    ) -> Optional[ShipmentButton]:
+        """Select an available shipment button.
+
+        Booked shipments and shipments rejected by target rules are
+        never returned.
+
+        Args:
+            message: Message with shipment keyboard
+            selector: Compiled shipment selector
+            allow_fallback: Whether to fall back to any available shipment
+
+        Returns:
+            Selected shipment or None
+        """
+        with span("match.select_shipment", message_id=message.id) as match:
+            shipment = selector.select(message)
+
+            if shipment is None and allow_fallback:
+                shipment = selector.fallback(message)
+                if shipment is not None:
+                    logger.warning(f"Using fallback shipment: {shipment.text}")
+
+            match.set(selected=shipment.text if shipment else None)
+
+        return shipment
+
+    async def find_best_button(
+        self,
+        message: Message,
+        patterns: Sequence[str]
+    ) -> Optional[tuple]:
+        """Find the button matching the highest priority pattern.
+
+        Args:
+            message: Message with inline keyboard
+            patterns: Text patterns in priority order
+
+        Returns:
+            Tuple of (button_text, button_data) or None
+        """
+        return self.compile_targets(patterns).best_button(message)
 
     async def ultra_fast_click(
         self,
@@ -44,27 +178,146 @@ class ButtonClicker:
         start_time = time.perf_counter()
 
         try:
-            bot_entity = await self.client.get_entity(self.bot_username)
+            return await self.click_by_id(message.id, button_data, action_name)
 
-            await self.client(
-                GetBotCallbackAnswerRequest(
-                    peer=bot_entity,
-                    msg_id=message.id,
-                    data=button_data
-                )
+        except Exception as e:
+            elapsed = (time.perf_counter() - start_time) * 1000
+            logger.error(f"Failed to click button: {e} (after {elapsed:.2f}ms)")
+            raise
+
+    async def click_by_id(
+        self,
+        message_id: int,
+        button_data: bytes,
+        action_name: str = "click"
+    ) -> float:
+        """Click a button of a message known only by its ID.
+
+        Errors are propagated without logging, so callers can treat a
+        rejected callback as an expected outcome. Uses pre-built requests
+        when ``templates`` has been prepared.
+
+        Args:
+            message_id: ID of the message containing the button
+            button_data: Button callback data
+            action_name: Name for logging
+
+        Returns:
+            Reaction time in milliseconds
+        """
+        start_time = time.perf_counter()
+
+        if self.templates is not None:
+            request = self.templates.callback_request(message_id, button_data)
+        else:
+            with span("rpc.resolve_peer"):
+                bot_entity = await self.client.get_entity(self.bot_username)
+            request = GetBotCallbackAnswerRequest(
+                peer=bot_entity,
+                msg_id=message_id,
+                data=button_data
             )
 
-            elapsed = (time.perf_counter() - start_time) * 1000
-            self.metrics.record_action(action_name, elapsed)
+        with span("rpc.callback", action=action_name, message_id=message_id, data=button_data):
+            await self.client(request)
 
-            logger.debug(f"{action_name} completed in {elapsed:.2f}ms")
-            return elapsed
+        elapsed = (time.perf_counter() - start_time) * 1000
+        self.metrics.record_action(action_name, elapsed)
 
-        except Exception as e:
-            elapsed = (time.perf_counter() - start_time) * 1000
-            logger.error(f"Failed to click button: {e} (after {elapsed:.2f}ms)")
+        logger.debug(f"{action_name} completed in {elapsed:.2f}ms")
+        return elapsed
+
+    async def hedged_click(
+        self,
+        message_id: int,
+        button_data: bytes,
+        action_name: str = "click"
+    ) -> float:
+        """Click a button, duplicating the request if the answer is slow.
+
+        If no answer arrives within the delay from ``hedge_policy`` (a
+        percentile of the action's latency history), an identical callback request is sent
+        and the first successful answer wins. The losing request is left
+        to finish; when the hedge wins, the time it saved is recorded as
+        ``hedge_saved_ms`` once the original is answered or rejected. If the
+        caller cancels the click, all requests in flight are cancelled. Only safe for
+        idempotent callbacks such as booking confirmation.
+
+        Args:
+            message_id: ID of the message containing the button
+            button_data: Button callback data
+            action_name: Name for logging and latency history
+
+        Returns:
+            Reaction time in milliseconds, measured from the first request
+        """
+        policy = self.hedge_policy
+        delay_ms = policy.delay_ms(self.metrics, action_name, self.rtt_metrics) if policy else None
+
+        if delay_ms is None:
+            return await self.click_by_id(message_id, button_data, action_name)
+
+        start_time = time.perf_counter()
+        primary = asyncio.ensure_future(self.click_by_id(message_id, button_data, action_name))
+        pending = {primary}
+        hedges = 0
+        first_error = None
+
+        try:
+            while pending:
+                timeout = delay_ms / 1000.0 if hedges < policy.max_hedges else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedges += 1
+                    self.metrics.increment_counter(f"{action_name}_hedged")
+                    logger.info(f"{action_name}: no answer after {delay_ms:.2f}ms, hedging")
+                    pending.add(asyncio.ensure_future(
+                        self.click_by_id(message_id, button_data, f"{action_name}_hedge")
+                    ))
+                    continue
+
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+
+                    elapsed = (time.perf_counter() - start_time) * 1000
+
+                    if task is not primary:
+                        self.metrics.increment_counter(f"{action_name}_hedge_won")
+                        primary.add_done_callback(self._hedge_saved_recorder(start_time, elapsed))
+
+                    for loser in pending:
+                        loser.add_done_callback(_consume_result)
+
+                    return elapsed
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. a stage deadline); nobody awaits these any more
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_consume_result)
             raise
 
+        raise first_error
+
+    def _hedge_saved_recorder(self, start_time: float, won_ms: float):
+        """Build a callback recording the latency a winning hedge saved."""
+        def record(task: asyncio.Future) -> None:
+            if task.cancelled():
+                return
+
+            # A late original is usually rejected because the hedge already
+            # changed the keyboard; the rejection still marks its arrival
+            task.exception()
+
+            saved_ms = (time.perf_counter() - start_time) * 1000 - won_ms
+            self.metrics.record_action("hedge_saved_ms", saved_ms)
+
+        return record
+
     async def find_button_by_text(
         self,
         message: Message,
@@ -104,18 +357,7 @@ class ButtonClicker:
         Returns:
             Tuple of (button_text, button_data) or None
         """
-        if not message.reply_markup:
-            return None
-
-        for row in message.reply_markup.rows:
-            for button in row.buttons:
-                if hasattr(button, 'text'):
-                    for pattern in patterns:
-                        if pattern.lower() in button.text.lower():
-                            if hasattr(button, 'data'):
-                                return (button.text, button.data)
-
-        return None
+        return self.compile_targets(patterns).first_button(message)
 
     async def get_all_buttons(self, message: Message) -> List[tuple]:
         """Get all buttons from a message.
@@ -173,12 +415,15 @@ class ButtonClicker:
         Returns:
             Reaction time in ms or None if button not found
         """
-        confirm_patterns = ["подтвердить", "confirm", "✅"]
-
-        button_info = await self.find_button_by_pattern(message, confirm_patterns)
+        with span("match.confirm_button", message_id=message.id):
+            button_info = await self.find_button_by_pattern(message, CONFIRM_PATTERNS)
 
         if button_info:
             button_text, button_data = button_info
+
+            if self.hedge_policy is not None:
+                return await self.hedged_click(message.id, button_data, "confirm_booking")
+
             return await self.ultra_fast_click(
                 message,
                 button_data,
@@ -195,3 +440,9 @@ class ButtonClicker:
             Dictionary with metrics
         """
         return self.metrics.get_statistics()
+
+
+def _consume_result(task: asyncio.Future) -> None:
+    """Retrieve the outcome of an abandoned request so it is not reported."""
+    if not task.cancelled():
+        task.exception()
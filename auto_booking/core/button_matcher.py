@@ -0,0 +1,142 @@
+"""Precompiled multi-pattern matching of inline keyboard buttons."""
+
+from typing import List, Optional, Sequence, Tuple
+
+from telethon.tl.types import KeyboardButtonCallback, Message
+
+# Separator between button texts in the keyboard index; never part of a text
+_SEPARATOR = "\x00"
+
+
+class ButtonMatcher:
+    """Ranks inline buttons by target priority in a single keyboard pass.
+
+    Patterns are lower-cased and deduplicated once, in priority order. For
+    each keyboard the callback buttons are collected in one pass over
+    ``reply_markup.rows`` into a single lower-cased index string, and every
+    pattern is then located with one C-level substring search over that
+    index instead of a Python loop over all buttons per pattern. The button
+    owning a match is the number of separators before the match position.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        """Compile patterns into a matcher.
+
+        Args:
+            patterns: Text patterns in priority order (first is best)
+        """
+        self.patterns = tuple(patterns)
+        self._keys: List[str] = []
+
+        for pattern in self.patterns:
+            key = pattern.lower().replace(_SEPARATOR, "")
+            if key and key not in self._keys:
+                self._keys.append(key)
+
+    @staticmethod
+    def _index(message: Message) -> Tuple[str, list]:
+        """Collect callback buttons of a message into a searchable index.
+
+        Args:
+            message: Message with inline keyboard
+
+        Returns:
+            Tuple of (lower-cased button texts joined by separator,
+            list of callback buttons in keyboard order)
+        """
+        if not message.reply_markup:
+            return "", []
+
+        buttons = [
+            button
+            for row in message.reply_markup.rows
+            for button in row.buttons
+            if isinstance(button, KeyboardButtonCallback)
+        ]
+
+        return _SEPARATOR.join([button.text for button in buttons]).lower(), buttons
+
+    def rank(self, text: str) -> Optional[int]:
+        """Get the best pattern rank found in a text.
+
+        Args:
+            text: Button text
+
+        Returns:
+            Rank of the best matching pattern (0 is best) or None
+        """
+        if not text:
+            return None
+
+        lowered = text.lower()
+        for rank, key in enumerate(self._keys):
+            if key in lowered:
+                return rank
+
+        return None
+
+    def rank_buttons(self, message: Message) -> List[Tuple[int, str, bytes]]:
+        """Rank all matching buttons of a message.
+
+        Args:
+            message: Message with inline keyboard
+
+        Returns:
+            List of (rank, button_text, button_data) ordered by rank,
+            keyboard order breaking ties
+        """
+        blob, buttons = self._index(message)
+        ranks = {}
+
+        for rank, key in enumerate(self._keys):
+            position = blob.find(key)
+            while position >= 0:
+                ranks.setdefault(blob.count(_SEPARATOR, 0, position), rank)
+                position = blob.find(key, position + 1)
+
+        return [
+            (rank, buttons[index].text, buttons[index].data)
+            for index, rank in sorted(ranks.items(), key=lambda item: (item[1], item[0]))
+        ]
+
+    def best_button(self, message: Message) -> Optional[Tuple[str, bytes]]:
+        """Find the highest priority button of a message.
+
+        Args:
+            message: Message with inline keyboard
+
+        Returns:
+            Tuple of (button_text, button_data) or None
+        """
+        blob, buttons = self._index(message)
+
+        for key in self._keys:
+            position = blob.find(key)
+            if position >= 0:
+                button = buttons[blob.count(_SEPARATOR, 0, position)]
+                return button.text, button.data
+
+        return None
+
+    def first_button(self, message: Message) -> Optional[Tuple[str, bytes]]:
+        """Find the first button matching any pattern.
+
+        Args:
+            message: Message with inline keyboard
+
+        Returns:
+            Tuple of (button_text, button_data) or None
+        """
+        blob, buttons = self._index(message)
+        first = len(blob)
+
+        for key in self._keys:
+            position = blob.find(key, 0, first + len(key))
+            if 0 <= position < first:
+                first = position
+
+        if first == len(blob):
+            return None
+
+        button = buttons[blob.count(_SEPARATOR, 0, first)]
+        return button.text, button.data
@@ -1,15 +1,21 @@
 """Telegram client for automated booking."""
 
 import asyncio
+import random
+import time
 from typing import Optional
 from datetime import datetime
 
 from telethon import TelegramClient
 from telethon.errors import SessionPasswordNeededError
+from telethon.tl.functions import PingRequest
 from telethon.tl.types import User
 
 from ..utils.logger import get_logger
 from ..utils.metrics import MetricsCollector
+from ..utils.recorder import RecordingClient, SessionRecorder
+from ..utils.tracing import span
+from .request_templates import RequestTemplates, extract_sent_message_id
 
 logger = get_logger(__name__)
 
@@ -22,7 +28,8 @@ class BookingClient:
         api_id: int,
         api_hash: str,
         phone: str,
-        session_name: str = "auto_booking_session"
+        session_name: str = "auto_booking_session",
+        session=None
     ):
         """Initialize the booking client.
 
@@ -31,13 +38,18 @@ class BookingClient:
             api_hash: Telegram API hash
             phone: Phone number for authentication
             session_name: Session file name
+            session: Telethon session object used instead of the session
+                file, e.g. an in-memory session (optional)
         """
         self.api_id = api_id
         self.api_hash = api_hash
         self.phone = phone
         self.session_name = session_name
+        self.session = session
         self.client: Optional[TelegramClient] = None
         self.metrics = MetricsCollector()
+        self.templates: Optional[RequestTemplates] = None
+        self.recorder: Optional[SessionRecorder] = None
         self._authorized = False
 
     async def initialize(self) -> bool:
@@ -49,7 +61,7 @@ class BookingClient:
         try:
             logger.info("Initializing Telegram client...")
             self.client = TelegramClient(
-                self.session_name,
+                self.session if self.session is not None else self.session_name,
                 self.api_id,
                 self.api_hash,
                 connection_retries=3,
@@ -107,26 +119,98 @@ class BookingClient:
             message: Message text
 
         Returns:
-            Message ID of sent message
+            Message ID of sent message, or None if it could not be found
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
 
         if not bot_username.startswith('@'):
             bot_username = f'@{bot_username}'
 
-        result = await self.client.send_message(bot_username, message)
-
-        elapsed_ms = (datetime.now() - start_time).total_seconds() * 1000
+        templates = self.templates
+        if (
+            templates is not None
+            and templates.bot_username == bot_username
+            and templates.supports_text(message)
+        ):
+            with span("rpc.send_message", text=message, path="template"):
+                request = templates.send_request(message)
+                result = await self.client(request)
+            message_id = extract_sent_message_id(result, request.random_id)
+            if message_id is None:
+                message_id = await self._find_sent_message_id(bot_username, message)
+        else:
+            with span("rpc.send_message", text=message, path="high_level"):
+                result = await self.client.send_message(bot_username, message)
+            message_id = result.id
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
         self.metrics.record_action("send_message", elapsed_ms)
         logger.debug(f"Message sent in {elapsed_ms:.2f}ms")
 
-        return result.id
+        return message_id
+
+    async def _find_sent_message_id(self, bot_username: str, message: str) -> Optional[int]:
+        """Look up a message sent through the raw path in the chat history.
+
+        Used when the raw result carries no message ID (e.g. a bare
+        ``Updates`` container without the sent message).
+
+        Args:
+            bot_username: Bot username (with @)
+            message: Text of the sent message
+
+        Returns:
+            ID of the newest outgoing message with that text, or None
+        """
+        with span("rpc.get_messages", path="sent_message_lookup"):
+            messages = await self.client.get_messages(bot_username, limit=5)
+
+        for sent in messages:
+            if sent.out and sent.message == message:
+                return sent.id
+
+        logger.warning(f"Sent message {message!r} not found in chat history")
+        return None
+
+    async def prepare_fast_path(
+        self,
+        bot_username: str,
+        texts: tuple = ("/start",),
+        pool_size: int = 16
+    ) -> RequestTemplates:
+        """Pre-build raw requests for the booking click path.
+
+        Resolves the bot peer once and prepares pools of send and callback
+        requests, so that ``send_message`` for the prepared texts and
+        callback clicks skip Telethon's high-level message building.
+
+        Args:
+            bot_username: Bot username
+            texts: Message texts to prepare
+            pool_size: Number of requests prepared per kind
+
+        Returns:
+            Prepared request templates
+        """
+        if not bot_username.startswith('@'):
+            bot_username = f'@{bot_username}'
+
+        if self.templates is not None and self.templates.bot_username == bot_username:
+            self.templates.refill()
+            return self.templates
+
+        input_peer = await self.client.get_input_entity(bot_username)
+        self.templates = RequestTemplates(bot_username, input_peer, texts, pool_size)
+        logger.info(f"Fast path prepared for {bot_username} ({pool_size} requests per kind)")
+
+        return self.templates
 
     async def get_latest_messages(
         self,
         bot_username: str,
         limit: int = 1,
-        min_id: int = 0
+        min_id: int = 0,
+        max_id: int = 0
     ) -> list:
         """Get latest messages from a bot.
 
@@ -134,6 +218,7 @@ class BookingClient:
             bot_username: Bot username
             limit: Number of messages to fetch
             min_id: Minimum message ID (for filtering)
+            max_id: Maximum message ID, exclusive (0 for no limit)
 
         Returns:
             List of messages
@@ -141,14 +226,186 @@ class BookingClient:
         if not bot_username.startswith('@'):
             bot_username = f'@{bot_username}'
 
-        messages = await self.client.get_messages(
-            bot_username,
-            limit=limit,
-            min_id=min_id
-        )
+        start_time = time.perf_counter()
+
+        with span("rpc.get_messages", limit=limit, min_id=min_id, max_id=max_id) as fetch:
+            messages = await self.client.get_messages(
+                bot_username,
+                limit=limit,
+                min_id=min_id,
+                max_id=max_id
+            )
+            fetch.set(received=len(messages))
+
+        self.metrics.record_action("get_messages", (time.perf_counter() - start_time) * 1000)
 
         return messages
 
+    async def ping(self) -> float:
+        """Send a ping request and measure round-trip time.
+
+        Returns:
+            Round-trip time in milliseconds
+        """
+        start_time = time.perf_counter()
+
+        with span("rpc.ping"):
+            await self.client(PingRequest(ping_id=random.getrandbits(63)))
+
+        rtt_ms = (time.perf_counter() - start_time) * 1000
+        self.metrics.record_action("ping_rtt", rtt_ms)
+
+        return rtt_ms
+
+    async def reconnect(self) -> None:
+        """Drop the current connection and establish a fresh one."""
+        logger.warning("Reconnecting Telegram client...")
+        start_time = time.perf_counter()
+
+        await self.client.disconnect()
+        await self.client.connect()
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.metrics.record_action("reconnect", elapsed_ms)
+        logger.info(f"Reconnected in {elapsed_ms:.2f}ms")
+
+    async def keep_warm(
+        self,
+        until: datetime,
+        interval_ms: int = 1000,
+        degradation_factor: float = 2.0,
+        baseline_samples: int = 5
+    ) -> dict:
+        """Keep the connection warm with periodic pings until a deadline.
+
+        RTT samples are recorded in the ``ping_rtt`` metric. The first
+        ``baseline_samples`` pings establish a baseline; when the median of
+        the last three pings exceeds ``baseline * degradation_factor`` the
+        connection is re-established early, before the booking window opens.
+
+        Args:
+            until: Moment when warm-up should stop
+            interval_ms: Interval between pings in milliseconds
+            degradation_factor: RTT growth factor that triggers a reconnect
+            baseline_samples: Number of pings used to establish the baseline
+
+        Returns:
+            Latency report (see ``get_latency_report``)
+        """
+        logger.info(f"Connection warm-up started (ping every {interval_ms}ms)")
+
+        interval = interval_ms / 1000.0
+        samples = []
+        baseline_ms = None
+
+        while datetime.now() < until:
+            try:
+                if not self.client.is_connected():
+                    await self.reconnect()
+
+                samples.append(await self.ping())
+
+                if baseline_ms is None:
+                    if len(samples) >= baseline_samples:
+                        baseline_ms = sorted(samples)[len(samples) // 2]
+                        logger.info(f"RTT baseline: {baseline_ms:.2f}ms")
+                else:
+                    recent_ms = sorted(samples[-3:])[1] if len(samples) >= 3 else samples[-1]
+                    if recent_ms > baseline_ms * degradation_factor:
+                        logger.warning(
+                            f"RTT degraded: {recent_ms:.2f}ms vs baseline {baseline_ms:.2f}ms"
+                        )
+                        await self.reconnect()
+                        self.metrics.increment_counter("rtt_degradation_reconnects")
+                        samples.clear()
+                        baseline_ms = None
+
+            except Exception as e:
+                logger.error(f"Warm-up ping failed: {e}")
+                self.metrics.increment_counter("ping_failures")
+
+            remaining = (until - datetime.now()).total_seconds()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(interval, remaining))
+
+        report = self.get_latency_report()
+        logger.info(
+            f"Connection warm-up finished: {report['samples']} pings, "
+            f"p50={report['rtt_p50_ms']}ms, p90={report['rtt_p90_ms']}ms"
+        )
+
+        return report
+
+    def get_latency_report(self) -> dict:
+        """Summarise measured RTT and expected per-stage latency.
+
+        Every booking stage costs one request/response round trip to
+        Telegram, so the expected stage latency is derived from the RTT
+        distribution collected by ``ping``.
+
+        Returns:
+            Dictionary with RTT percentiles, histogram and stage estimates
+        """
+        p50 = self.metrics.get_percentile("ping_rtt", 50)
+        p90 = self.metrics.get_percentile("ping_rtt", 90)
+        p99 = self.metrics.get_percentile("ping_rtt", 99)
+
+        def _round(value):
+            return round(value, 2) if value is not None else None
+
+        expected = {
+            stage: _round(p50)
+            for stage in ("sms_to_start_ms", "start_to_select_ms", "select_to_confirm_ms")
+        }
+
+        return {
+            "samples": len(self.metrics.metrics.get("ping_rtt", [])),
+            "rtt_p50_ms": _round(p50),
+            "rtt_p90_ms": _round(p90),
+            "rtt_p99_ms": _round(p99),
+            "rtt_histogram": self.metrics.get_histogram("ping_rtt"),
+            "reconnects": self.metrics.counters.get("rtt_degradation_reconnects", 0),
+            "expected_stages_ms": expected,
+            "expected_total_ms": _round(p50 * len(expected)) if p50 is not None else None,
+        }
+
+    def start_recording(self, path: str) -> SessionRecorder:
+        """Record all calls and incoming updates to a file.
+
+        Must be called before components that keep a reference to the
+        underlying Telethon client (e.g. BotHandler) are created.
+
+        Args:
+            path: Recording file path
+
+        Returns:
+            Active recorder
+        """
+        self.recorder = SessionRecorder(path)
+        self.client = RecordingClient(self.client, self.recorder)
+        logger.info(f"Recording Telegram traffic to {path}")
+
+        return self.recorder
+
+    def mark(self, name: str) -> None:
+        """Put a named mark into the recording, if recording.
+
+        Args:
+            name: Mark name (e.g. ``monitoring_start``)
+        """
+        if self.recorder is not None:
+            self.recorder.mark(name)
+
+    def stop_recording(self) -> None:
+        """Stop recording and flush the file."""
+        if self.recorder is None:
+            return
+
+        self.client = self.client.unwrap()
+        self.recorder.close()
+        self.recorder = None
+
     async def is_connected(self) -> bool:
         """Check if client is connected.
 
@@ -159,6 +416,8 @@ class BookingClient:
 
     async def disconnect(self) -> None:
         """Disconnect the client."""
+        self.stop_recording()
+
         if self.client:
             await self.client.disconnect()
             logger.info("Client disconnected")
@@ -0,0 +1,178 @@
+"""Gap-free tracking of new messages in the bot chat."""
+
+import asyncio
+from typing import List, Optional
+
+from telethon.tl import types
+from telethon.tl.functions.updates import GetStateRequest
+from telethon.tl.types import Message
+
+from ..utils.logger import get_logger
+from ..utils.tracing import span
+
+logger = get_logger(__name__)
+
+# Updates numbered by a channel's own pts sequence, not the account's
+CHANNEL_UPDATES = (
+    types.UpdateNewChannelMessage,
+    types.UpdateEditChannelMessage,
+    types.UpdateDeleteChannelMessages,
+    types.UpdateChannelWebPage,
+    types.UpdatePinnedChannelMessages,
+)
+
+
+class MessageTracker:
+    """Delivers every new bot message exactly once, oldest first.
+
+    Polling fetches everything newer than ``last_message_id`` in one
+    request (paging back with ``max_id`` if a burst exceeds the batch).
+    In event-driven mode raw updates are fed to ``handle_update``; their
+    account-wide ``pts`` sequence reveals lost updates, which are
+    recovered with the same batched fetch.
+    """
+
+    def __init__(self, client, bot_username: str, batch_limit: int = 20):
+        """Initialize tracker.
+
+        Args:
+            client: BookingClient instance
+            bot_username: Bot username
+            batch_limit: Messages requested per fetch
+        """
+        self.client = client
+        self.bot_username = bot_username
+        self.batch_limit = batch_limit
+        self.last_message_id = 0
+        self.pts: Optional[int] = None
+        self.bot_id: Optional[int] = None
+        self.gaps = 0
+        self.recovered = 0
+        self._lock = asyncio.Lock()
+
+    async def resolve_bot(self) -> int:
+        """Resolve the bot's user ID used to filter pushed updates.
+
+        Returns:
+            Bot user ID
+        """
+        if self.bot_id is None:
+            peer = await self.client.client.get_input_entity(self.bot_username)
+            self.bot_id = peer.user_id
+
+        return self.bot_id
+
+    async def sync_state(self) -> int:
+        """Take the current account ``pts`` as the gap detection baseline.
+
+        Call after registering the update handler and before the catch-up
+        fetch, so every later message is either fetched or pushed in order.
+
+        Returns:
+            Current pts
+        """
+        state = await self.client.client(GetStateRequest())
+
+        async with self._lock:
+            self.pts = max(self.pts or 0, state.pts)
+
+        return self.pts
+
+    async def fetch_new(self) -> List[Message]:
+        """Fetch all messages newer than the last delivered one.
+
+        Returns:
+            New messages in chronological order
+        """
+        async with self._lock:
+            return await self._fetch_new()
+
+    async def _fetch_new(self) -> List[Message]:
+        with span("track.fetch_new", after=self.last_message_id) as fetch:
+            batch = await self.client.get_latest_messages(
+                self.bot_username,
+                limit=self.batch_limit,
+                min_id=self.last_message_id
+            )
+            collected = list(batch)
+
+            # A full batch may hide older unseen messages behind it
+            while len(batch) == self.batch_limit:
+                batch = await self.client.get_latest_messages(
+                    self.bot_username,
+                    limit=self.batch_limit,
+                    min_id=self.last_message_id,
+                    max_id=min(message.id for message in batch)
+                )
+                collected.extend(batch)
+
+            fetch.set(received=len(collected))
+
+        return self._accept(collected)
+
+    def _accept(self, messages: List[Message]) -> List[Message]:
+        """Order messages and drop the ones already delivered."""
+        fresh = {
+            message.id: message for message in messages
+            if message.id > self.last_message_id
+        }
+        ordered = [fresh[message_id] for message_id in sorted(fresh)]
+
+        if ordered:
+            self.last_message_id = ordered[-1].id
+
+        return ordered
+
+    async def handle_update(self, update) -> List[Message]:
+        """Process a raw update pushed by Telegram.
+
+        Args:
+            update: Raw Telethon update
+
+        Returns:
+            New bot messages in chronological order (including recovered ones)
+        """
+        pts = getattr(update, "pts", None)
+        pts_count = getattr(update, "pts_count", None)
+
+        if pts is None or pts_count is None or isinstance(update, CHANNEL_UPDATES):
+            return []
+
+        async with self._lock:
+            if self.pts is not None and pts <= self.pts:
+                return []
+
+            gap = self.pts is not None and pts - pts_count > self.pts
+            self.pts = pts
+
+            if gap:
+                self.gaps += 1
+                logger.warning(f"Update gap before pts {pts}, recovering missed messages")
+                messages = await self._fetch_new()
+                self.recovered += len(messages)
+                return messages
+
+            message = self._bot_message(update)
+            return self._accept([message]) if message is not None else []
+
+    def _bot_message(self, update) -> Optional[Message]:
+        """Extract an incoming bot message from an update."""
+        if isinstance(update, types.UpdateNewMessage):
+            message = update.message
+            peer = getattr(message, "peer_id", None)
+
+            if not getattr(message, "out", False) and getattr(peer, "user_id", None) == self.bot_id:
+                return message
+
+        elif isinstance(update, types.UpdateShortMessage):
+            if not update.out and update.user_id == self.bot_id:
+                return types.Message(
+                    id=update.id,
+                    peer_id=types.PeerUser(update.user_id),
+                    date=update.date,
+                    message=update.message,
+                    out=False,
+                    entities=update.entities
+                )
+
+        return None
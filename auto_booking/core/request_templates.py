@@ -0,0 +1,149 @@
+"""Pre-built MTProto requests for the booking click path."""
+
+import os
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+from telethon.tl import types
+from telethon.tl.functions.messages import GetBotCallbackAnswerRequest, SendMessageRequest
+
+
+def _random_id() -> int:
+    """Generate a random message ID the way Telethon does."""
+    return int.from_bytes(os.urandom(8), 'big', signed=True)
+
+
+class RequestTemplates:
+    """Pools of ready-to-send requests for one bot.
+
+    Requests are constructed during the preparation phase with the peer
+    already resolved and a unique ``random_id`` assigned, so on the hot
+    path only the message ID or callback data is patched in. Every request
+    object is sent at most once: Telethon serializes requests lazily in its
+    send loop, so a shared mutable template could change while in flight.
+    """
+
+    def __init__(
+        self,
+        bot_username: str,
+        input_peer,
+        texts: Iterable[str] = ("/start",),
+        pool_size: int = 16
+    ):
+        """Build request pools.
+
+        Args:
+            bot_username: Bot username the peer belongs to
+            input_peer: Resolved input peer of the bot
+            texts: Message texts to prepare send requests for
+            pool_size: Number of requests prepared per kind
+        """
+        self.bot_username = bot_username
+        self.input_peer = input_peer
+        self.pool_size = pool_size
+        self.misses = 0
+
+        self._send_pools: Dict[str, Deque[SendMessageRequest]] = {
+            text: deque() for text in texts
+        }
+        self._callback_pool: Deque[GetBotCallbackAnswerRequest] = deque()
+
+        self.refill()
+
+    def refill(self) -> None:
+        """Top up all pools to ``pool_size``; call outside the hot path."""
+        for text, pool in self._send_pools.items():
+            while len(pool) < self.pool_size:
+                pool.append(self._build_send(text))
+
+        while len(self._callback_pool) < self.pool_size:
+            self._callback_pool.append(self._build_callback())
+
+    def _build_send(self, text: str) -> SendMessageRequest:
+        """Construct a send request for a text."""
+        return SendMessageRequest(
+            peer=self.input_peer,
+            message=text,
+            no_webpage=True,
+            random_id=_random_id()
+        )
+
+    def _build_callback(self) -> GetBotCallbackAnswerRequest:
+        """Construct a callback request with placeholder fields."""
+        return GetBotCallbackAnswerRequest(
+            peer=self.input_peer,
+            msg_id=0,
+            data=b""
+        )
+
+    def supports_text(self, text: str) -> bool:
+        """Check if send requests are prepared for a text.
+
+        Args:
+            text: Message text
+
+        Returns:
+            True if a pool exists for the text
+        """
+        return text in self._send_pools
+
+    def send_request(self, text: str) -> SendMessageRequest:
+        """Take a prepared send request.
+
+        Args:
+            text: Message text (must be supported)
+
+        Returns:
+            Request ready to be sent
+        """
+        pool = self._send_pools[text]
+
+        if pool:
+            return pool.popleft()
+
+        self.misses += 1
+        return self._build_send(text)
+
+    def callback_request(self, message_id: int, data: bytes) -> GetBotCallbackAnswerRequest:
+        """Take a prepared callback request and patch in its target.
+
+        Args:
+            message_id: ID of the message containing the button
+            data: Button callback data
+
+        Returns:
+            Request ready to be sent
+        """
+        if self._callback_pool:
+            request = self._callback_pool.popleft()
+        else:
+            self.misses += 1
+            request = self._build_callback()
+
+        request.msg_id = message_id
+        request.data = data
+        return request
+
+
+def extract_sent_message_id(result, random_id: int) -> Optional[int]:
+    """Get the ID of a sent message from a raw SendMessageRequest result.
+
+    Args:
+        result: Result of the request
+        random_id: ``random_id`` the request was sent with
+
+    Returns:
+        Message ID or None if the result does not contain it
+    """
+    if isinstance(result, types.UpdateShortSentMessage):
+        return result.id
+
+    new_message_id = None
+
+    for update in getattr(result, 'updates', ()):
+        if isinstance(update, types.UpdateMessageID) and update.random_id == random_id:
+            return update.id
+        if isinstance(update, types.UpdateNewMessage) and new_message_id is None:
+            new_message_id = update.message.id
+
+    return new_message_id
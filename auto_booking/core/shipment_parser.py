@@ -0,0 +1,220 @@
+"""Structured parsing and rule-based selection of shipment buttons."""
+
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+from telethon.tl.types import KeyboardButtonCallback, Message
+
+from .button_matcher import ButtonMatcher
+
+# Bot renders shipment buttons as "{city}_{quantity}" plus " ❌" when booked
+SHIPMENT_TEXT_RE = re.compile(r"^(?P<city>.+)_(?P<quantity>\d+)(?P<booked>\s*❌)?\s*$")
+SHIPMENT_DATA_RE = re.compile(rb"^shipment:(?P<id>\d+)$")
+CONFIRM_DATA_TEMPLATE = b"confirm:%d"
+
+
+class ShipmentButton(NamedTuple):
+    """Parsed shipment button."""
+    text: str
+    city: str
+    quantity: int
+    booked: bool
+    shipment_id: Optional[int]
+    data: bytes
+
+
+class ShipmentRule(NamedTuple):
+    """Selection rule for one target city."""
+    city: str
+    min_quantity: int = 0
+    max_quantity: Optional[int] = None
+
+    def accepts(self, shipment: ShipmentButton) -> bool:
+        """Check if a shipment satisfies the rule.
+
+        Args:
+            shipment: Parsed shipment button
+
+        Returns:
+            True if city and quantity constraints are met
+        """
+        if self.city.lower() not in shipment.city.lower():
+            return False
+
+        if shipment.quantity < self.min_quantity:
+            return False
+
+        return self.max_quantity is None or shipment.quantity <= self.max_quantity
+
+
+def parse_shipment_button(text: str, data: bytes) -> Optional[ShipmentButton]:
+    """Parse a shipment button into a typed record.
+
+    Args:
+        text: Button text
+        data: Button callback data
+
+    Returns:
+        ShipmentButton or None if the button is not a shipment
+    """
+    match = SHIPMENT_TEXT_RE.match(text)
+    if match is None:
+        return None
+
+    data_match = SHIPMENT_DATA_RE.match(data)
+
+    return ShipmentButton(
+        text=text,
+        city=match.group("city"),
+        quantity=int(match.group("quantity")),
+        booked=match.group("booked") is not None,
+        shipment_id=int(data_match.group("id")) if data_match else None,
+        data=data
+    )
+
+
+def predict_confirm_data(shipment: ShipmentButton) -> Optional[bytes]:
+    """Predict callback data of the confirm button for a shipment.
+
+    The bot renders the detail keyboard with ``confirm:<id>`` for the
+    ``shipment:<id>`` it was opened from.
+
+    Args:
+        shipment: Parsed shipment button
+
+    Returns:
+        Predicted callback data or None if the shipment ID is unknown
+    """
+    if shipment.shipment_id is None:
+        return None
+
+    return CONFIRM_DATA_TEMPLATE % shipment.shipment_id
+
+
+def parse_shipment_buttons(message: Message) -> List[ShipmentButton]:
+    """Parse all shipment buttons of a message.
+
+    Args:
+        message: Message with inline keyboard
+
+    Returns:
+        List of parsed shipments in keyboard order
+    """
+    shipments = []
+
+    if not message.reply_markup:
+        return shipments
+
+    for row in message.reply_markup.rows:
+        for button in row.buttons:
+            if isinstance(button, KeyboardButtonCallback):
+                shipment = parse_shipment_button(button.text, button.data)
+                if shipment is not None:
+                    shipments.append(shipment)
+
+    return shipments
+
+
+def build_rules(targets: Sequence) -> List[ShipmentRule]:
+    """Build selection rules in priority order.
+
+    Args:
+        targets: Either plain city patterns or target configurations
+            with ``cities``, ``priority`` and optional quantity limits
+
+    Returns:
+        List of rules, best first
+    """
+    rules = []
+
+    if all(isinstance(target, str) for target in targets):
+        return [ShipmentRule(city=target) for target in targets]
+
+    for target in sorted(targets, key=lambda item: item.priority):
+        for city in target.cities:
+            rules.append(ShipmentRule(
+                city=city,
+                min_quantity=getattr(target, "min_quantity", 0),
+                max_quantity=getattr(target, "max_quantity", None)
+            ))
+
+    return rules
+
+
+class ShipmentSelector:
+    """Selects the best available shipment according to target rules.
+
+    Candidate buttons are located with a precompiled ButtonMatcher over
+    the rule cities; only candidates are parsed, and booked shipments or
+    shipments violating every matching rule are never selected.
+    """
+
+    def __init__(self, rules: Sequence[ShipmentRule]):
+        """Compile selection rules.
+
+        Args:
+            rules: Rules in priority order
+        """
+        self.rules = tuple(rules)
+        self.matcher = ButtonMatcher([rule.city for rule in self.rules])
+
+    def _rule_rank(self, shipment: ShipmentButton) -> Optional[int]:
+        """Get the best rule accepting a shipment.
+
+        Args:
+            shipment: Parsed shipment
+
+        Returns:
+            Rule index or None if no rule accepts it
+        """
+        for rank, rule in enumerate(self.rules):
+            if rule.accepts(shipment):
+                return rank
+
+        return None
+
+    def select(self, message: Message) -> Optional[ShipmentButton]:
+        """Select the highest priority available shipment.
+
+        Args:
+            message: Message with shipment keyboard
+
+        Returns:
+            Selected shipment or None
+        """
+        best = None
+        best_rank = None
+
+        for _, text, data in self.matcher.rank_buttons(message):
+            shipment = parse_shipment_button(text, data)
+            if shipment is None or shipment.booked:
+                continue
+
+            rank = self._rule_rank(shipment)
+            if rank is not None and (best_rank is None or rank < best_rank):
+                best, best_rank = shipment, rank
+                if rank == 0:
+                    break
+
+        return best
+
+    def fallback(self, message: Message) -> Optional[ShipmentButton]:
+        """Select the first available shipment no rule rejects.
+
+        Shipments of a target city that fail its quantity rules are
+        considered unwanted and skipped along with booked ones.
+
+        Args:
+            message: Message with shipment keyboard
+
+        Returns:
+            Fallback shipment or None
+        """
+        for shipment in parse_shipment_buttons(message):
+            if shipment.booked:
+                continue
+
+            if self.matcher.rank(shipment.city) is None:
+                return shipment
+
+        return None
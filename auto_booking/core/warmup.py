@@ -0,0 +1,199 @@
+"""Pre-window warm-up of the booking code paths."""
+
+import asyncio
+import gc
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+from telethon.extensions import BinaryReader
+from telethon.tl import types
+from telethon.tl.functions.messages import GetBotCallbackAnswerRequest, SendMessageRequest
+
+from ..utils.logger import get_logger, logger as root_logger
+
+logger = get_logger(__name__)
+
+WARMUP_BOT_USERNAME = "warmup_booking_bot"
+
+# Re-enables collection if the attempt outlives the freeze window
+_release_timer: Optional[asyncio.TimerHandle] = None
+
+
+@contextmanager
+def _quiet_client_logs():
+    """Keep the offline runs' booking and SMS messages out of the log."""
+    root_logger.disable("auto_booking")
+    try:
+        yield
+    finally:
+        root_logger.enable("auto_booking")
+
+
+def _synthetic_shipments(targets: Sequence) -> list:
+    """Build a menu offering every target plus a shipment nobody wants."""
+    shipments = [("Склад", 1)]
+
+    for target in targets:
+        if isinstance(target, str):
+            shipments.append((target, 1))
+        else:
+            quantity = max(target.min_quantity, 1)
+            shipments.extend((city, quantity) for city in target.cities)
+
+    return shipments
+
+
+def _exercise_serialization() -> None:
+    """Serialize and parse the TL objects of the click path once."""
+    peer = types.InputPeerUser(user_id=1, access_hash=1)
+    requests = (
+        SendMessageRequest(peer=peer, message="/start", random_id=1),
+        GetBotCallbackAnswerRequest(peer=peer, msg_id=1, data=b"shipment:1"),
+    )
+    for request in requests:
+        bytes(request)
+
+    message = types.Message(
+        id=1,
+        peer_id=types.PeerUser(1),
+        date=None,
+        message="warm-up",
+        reply_markup=types.ReplyInlineMarkup([
+            types.KeyboardButtonRow([types.KeyboardButtonCallback("warm-up", b"shipment:1")])
+        ])
+    )
+    BinaryReader(bytes(message)).tgread_object()
+
+
+async def warm_up(
+    targets: Sequence,
+    rounds: int = 3,
+    speculative_mode: bool = False,
+    fast_path: bool = True,
+    fallback_to_any: bool = True,
+    sms_trigger_text: str = "Появились новые перевозки",
+    performance=None
+) -> dict:
+    """Run the booking pipeline against an in-process fake Telegram.
+
+    Pays the one-time costs (imports, caches, first allocations) of
+    message parsing, button matching and request building before the
+    real attempt. Nothing is sent to Telegram, and the client
+    logs are silenced while the offline runs pretend to book.
+
+    Args:
+        targets: Booking targets, as configured for the real attempt
+        rounds: Number of offline booking runs
+        speculative_mode: Exercise the speculative select/confirm path
+        fast_path: Exercise pre-built request templates
+        fallback_to_any: Book any free shipment if no target is available
+        sms_trigger_text: Text identifying the SMS notification
+        performance: PerformanceConfig of the real attempt (optional)
+
+    Returns:
+        Report with first-run and warm booking latency
+    """
+    from ..testing import FakeTelegramClient, NetworkProfile, run_offline_booking
+
+    shipments = _synthetic_shipments(targets)
+    totals = []
+    cpu_times = []
+    errors = []
+
+    with _quiet_client_logs():
+        for _ in range(max(rounds, 1)):
+            cpu_start = time.process_time()
+            _exercise_serialization()
+
+            fake = FakeTelegramClient(
+                shipments,
+                bot_username=WARMUP_BOT_USERNAME,
+                network=NetworkProfile(latency_ms=0),
+                bot_processing_ms=0
+            )
+            stats = await run_offline_booking(
+                fake,
+                targets,
+                sms_delay_ms=0,
+                polling_interval_ms=1,
+                speculative_mode=speculative_mode,
+                fast_path=fast_path,
+                fallback_to_any=fallback_to_any,
+                sms_trigger_text=sms_trigger_text,
+                performance=performance
+            )
+
+            if not stats["success"]:
+                errors.append(stats["error"])
+
+            cpu_times.append((time.process_time() - cpu_start) * 1000)
+            totals.append(stats.get("total_time_ms"))
+
+    for error in errors:
+        logger.warning(f"Warm-up run did not book: {error}")
+
+    # Wall time includes the handler's fixed waits; CPU time isolates the
+    # one-time costs the warm-up is meant to absorb
+    measured = [total for total in totals[1:] if total is not None]
+    warm_ms = round(statistics.median(measured), 2) if measured else None
+    warm_cpu_ms = round(statistics.median(cpu_times[1:]), 2) if len(cpu_times) > 1 else None
+
+    report = {
+        "rounds": len(totals),
+        "first_run_ms": totals[0],
+        "warm_ms": warm_ms,
+        "first_run_cpu_ms": round(cpu_times[0], 2),
+        "warm_cpu_ms": warm_cpu_ms,
+    }
+
+    logger.info(
+        f"Warm-up: first run {report['first_run_ms']}ms "
+        f"({report['first_run_cpu_ms']}ms CPU), warm {warm_ms}ms "
+        f"({warm_cpu_ms}ms CPU) over {report['rounds']} rounds"
+    )
+    return report
+
+
+def freeze_gc(max_seconds: Optional[float] = None) -> None:
+    """Move surviving objects out of GC tracking and stop automatic collection.
+
+    Call after the warm-up so collections cannot pause the booking attempt.
+    Pair with ``release_gc``; with ``max_seconds`` collection is re-enabled
+    after that long even if ``release_gc`` has not been called yet.
+
+    Args:
+        max_seconds: Longest time to keep automatic collection off (optional)
+    """
+    global _release_timer
+
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+    logger.info(f"GC frozen ({gc.get_freeze_count()} objects), automatic collection disabled")
+
+    if max_seconds is not None:
+        _release_timer = asyncio.get_running_loop().call_later(max_seconds, _expire_freeze, max_seconds)
+
+
+def _expire_freeze(max_seconds: float) -> None:
+    """Re-enable collection once the freeze window is over."""
+    logger.warning(f"GC frozen for {max_seconds:.0f}s without an attempt, re-enabling collection")
+    release_gc()
+
+
+def release_gc() -> None:
+    """Re-enable automatic collection after the attempt."""
+    global _release_timer
+
+    if _release_timer is not None:
+        _release_timer.cancel()
+        _release_timer = None
+
+    if gc.isenabled() and not gc.get_freeze_count():
+        return
+
+    gc.enable()
+    gc.unfreeze()
+    logger.info("GC re-enabled")
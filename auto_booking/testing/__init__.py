@@ -0,0 +1,15 @@
+"""Offline stand-ins for exercising the booking client without Telegram."""
+
+from .fake_telegram import Competitor, FakeTelegramClient, NetworkProfile
+from .harness import create_offline_client, run_offline_booking
+from .replay import ReplayTelegramClient, replay_booking
+
+__all__ = [
+    'Competitor',
+    'FakeTelegramClient',
+    'NetworkProfile',
+    'ReplayTelegramClient',
+    'create_offline_client',
+    'run_offline_booking',
+    'replay_booking',
+]
@@ -0,0 +1,551 @@
+"""In-process stand-in for Telegram and the booking bot.
+
+``FakeTelegramClient`` implements the subset of the Telethon client API
+used by the booking client (``get_messages``, ``send_message``, raw
+requests via ``__call__``, entity resolution) and emulates the ``bot.py``
+conversation behind it: SMS notification, shipment menu, shipment detail
+and confirmation, rendered as edits of the menu message like the real bot.
+Network latency, jitter and packet loss come from a seeded RNG, so a
+scenario can be replayed with the same timings. With ``push_updates``
+the chat's raw updates are delivered to event handlers, numbered by an
+account ``pts`` sequence in which ``lose_updates`` can leave gaps.
+"""
+
+import asyncio
+import random
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from telethon.errors import DataInvalidError, MessageIdInvalidError
+from telethon.tl import types
+from telethon.tl.functions import PingRequest
+from telethon.tl.functions.messages import GetBotCallbackAnswerRequest, SendMessageRequest
+from telethon.tl.functions.updates import GetStateRequest
+
+SMS_TEXT = "Появились новые перевозки.\n\nНажмите /start для вызова меню"
+MENU_TEXT = "Выберите перевозку:"
+WELCOME_TEXT = "Пришлем сообщение как только будут назначены перевозки"
+BOOKED_SUFFIX = "\n\n❌ Эта перевозка уже забронирована"
+BOOKING_SUCCESS = "✅ Перевозка успешно забронирована!"
+BOOKING_TAKEN = "❌ К сожалению, перевозка уже забронирована"
+
+BACK_ROW = (("◀️ Назад в меню", b"back_to_menu"),)
+
+Keyboard = Tuple[Tuple[Tuple[str, bytes], ...], ...]
+
+
+class NetworkProfile(NamedTuple):
+    """Emulated network conditions between client and Telegram."""
+    latency_ms: float = 20.0
+    jitter_ms: float = 0.0
+    drop_rate: float = 0.0
+    retransmit_ms: float = 200.0
+
+
+class Competitor(NamedTuple):
+    """Another client booking the first free shipment of a city."""
+    city: str
+    delay_ms: float
+    user_id: int = 2000
+
+
+class FakeShipment:
+    """Shipment state kept by the fake bot."""
+
+    def __init__(self, shipment_id: int, city: str, quantity: int, booked_by: Optional[int] = None):
+        """Create a shipment.
+
+        Args:
+            shipment_id: Shipment ID used in callback data
+            city: City name
+            quantity: Number of places
+            booked_by: ID of the user who booked it, if any
+        """
+        self.id = shipment_id
+        self.city = city
+        self.quantity = quantity
+        self.booked_by = booked_by
+
+    @property
+    def is_booked(self) -> bool:
+        """Whether the shipment is already booked."""
+        return self.booked_by is not None
+
+
+class FakeTelegramClient:
+    """Telethon client stand-in talking to an emulated booking bot."""
+
+    def __init__(
+        self,
+        shipments: Sequence[Tuple[str, int]],
+        bot_username: str = "booking_test_bot",
+        network: NetworkProfile = NetworkProfile(),
+        bot_processing_ms: float = 5.0,
+        competitors: Sequence[Competitor] = (),
+        seed: int = 0,
+        user_id: int = 1000,
+        bot_id: int = 777000,
+        push_updates: bool = False
+    ):
+        """Initialize the fake client and bot state.
+
+        Args:
+            shipments: ``(city, quantity)`` pairs offered in the menu
+            bot_username: Username the bot is reachable by
+            network: Emulated network conditions
+            bot_processing_ms: Time the bot needs to handle an update
+            competitors: Other clients racing for shipments after the SMS
+            seed: Seed for latency jitter and drops
+            user_id: ID of the emulated account
+            bot_id: ID of the emulated bot
+            push_updates: Deliver raw updates to registered event handlers
+        """
+        self.bot_username = bot_username.lstrip('@')
+        self.network = network
+        self.bot_processing_ms = bot_processing_ms
+        self.competitors = tuple(competitors)
+        self.user_id = user_id
+        self.bot_id = bot_id
+        self.push_updates = push_updates
+        self.parse_mode = None
+
+        self.shipments: Dict[int, FakeShipment] = {
+            index: FakeShipment(index, city, quantity)
+            for index, (city, quantity) in enumerate(shipments, start=1)
+        }
+
+        self._rng = random.Random(seed)
+        self._messages: Dict[int, dict] = {}
+        self._last_id = 0
+        self._connected = True
+        self._bot_tasks: List[asyncio.Task] = []
+        self._handlers: List = []
+        self._updates_to_lose = 0
+        self.pts = 0
+
+        self.requests: List[str] = []
+        self.saved_messages: List[str] = []
+        self.dropped = 0
+
+    # ------------------------------------------------------------------
+    # Telethon client API
+    # ------------------------------------------------------------------
+
+    def is_connected(self) -> bool:
+        """Check if the emulated connection is up."""
+        return self._connected
+
+    async def connect(self) -> None:
+        """Establish the emulated connection."""
+        await self._transit()
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        """Drop the emulated connection and stop pending bot work."""
+        self._connected = False
+
+        for task in self._bot_tasks:
+            task.cancel()
+        self._bot_tasks.clear()
+
+    async def is_user_authorized(self) -> bool:
+        """The emulated account is always authorized."""
+        return True
+
+    async def get_me(self) -> types.User:
+        """Get the emulated account."""
+        return types.User(id=self.user_id, first_name="Test", username="test_user")
+
+    async def get_input_entity(self, entity) -> types.InputPeerUser:
+        """Resolve the bot to an input peer."""
+        self._check_bot(entity)
+        await self._round_trip("resolve_username")
+        return types.InputPeerUser(user_id=self.bot_id, access_hash=self.bot_id)
+
+    async def get_entity(self, entity) -> types.User:
+        """Resolve the bot to a user."""
+        self._check_bot(entity)
+        await self._round_trip("resolve_username")
+        return types.User(
+            id=self.bot_id, access_hash=self.bot_id, bot=True, bot_info_version=1,
+            username=self.bot_username
+        )
+
+    def add_event_handler(self, callback, event=None) -> None:
+        """Register a handler receiving raw updates of the chat."""
+        self._handlers.append(callback)
+
+    def remove_event_handler(self, callback, event=None) -> None:
+        self._handlers.remove(callback)
+
+    async def get_messages(self, entity, limit: int = 1, min_id: int = 0, max_id: int = 0) -> list:
+        """Fetch chat history, newest first.
+
+        Args:
+            entity: Chat to fetch from (the bot)
+            limit: Maximum number of messages
+            min_id: Only return messages with a greater ID
+            max_id: Only return messages with a lower ID (0 for no limit)
+
+        Returns:
+            List of message snapshots as seen when the request arrived
+        """
+        self._check_bot(entity)
+        await self._transit("get_messages")
+
+        ids = [
+            message_id for message_id in sorted(self._messages, reverse=True)
+            if message_id > min_id and (not max_id or message_id < max_id)
+        ]
+        messages = [self._render(message_id) for message_id in ids[:limit]]
+
+        await self._transit()
+        return messages
+
+    async def send_message(self, entity, message: str) -> types.Message:
+        """Send a text message.
+
+        Messages to ``"me"`` are kept in ``saved_messages``.
+
+        Args:
+            entity: Recipient (the bot or ``"me"``)
+            message: Message text
+
+        Returns:
+            The sent message
+        """
+        if entity == "me":
+            self.saved_messages.append(message)
+            return self._render(0, text=message)
+
+        self._check_bot(entity)
+        await self._transit("send_message")
+        message_id = self._user_says(message)
+        await self._transit()
+
+        return self._render(message_id)
+
+    async def __call__(self, request, ordered: bool = False):
+        """Invoke a raw request.
+
+        Supports the requests used on the booking click path.
+
+        Args:
+            request: Telethon request object
+            ordered: Ignored
+
+        Returns:
+            Raw result like Telegram would return it
+        """
+        if isinstance(request, PingRequest):
+            await self._round_trip("ping")
+            return types.Pong(msg_id=0, ping_id=request.ping_id)
+
+        if isinstance(request, SendMessageRequest):
+            await self._transit("send_message")
+            message_id = self._user_says(request.message)
+            await self._transit()
+            return types.UpdateShortSentMessage(
+                id=message_id, pts=self._messages[message_id]["pts"], pts_count=1,
+                date=datetime.now(), out=True
+            )
+
+        if isinstance(request, GetBotCallbackAnswerRequest):
+            return await self._callback(request)
+
+        if isinstance(request, GetStateRequest):
+            await self._transit("get_state")
+            state = types.updates.State(
+                pts=self.pts, qts=0, date=datetime.now(), seq=0, unread_count=0
+            )
+            await self._transit()
+            return state
+
+        raise NotImplementedError(f"{type(request).__name__} is not emulated")
+
+    # ------------------------------------------------------------------
+    # Scenario control
+    # ------------------------------------------------------------------
+
+    def publish_sms(self) -> int:
+        """Send the SMS notification and start the competitors.
+
+        Returns:
+            ID of the notification message
+        """
+        message_id = self._add_message(SMS_TEXT, out=False)
+
+        for competitor in self.competitors:
+            self._spawn(self._compete(competitor))
+
+        return message_id
+
+    def publish_message(self, text: str) -> int:
+        """Send an arbitrary bot message, such as a status notice.
+
+        Args:
+            text: Message text
+
+        Returns:
+            ID of the message
+        """
+        return self._add_message(text, out=False)
+
+    def lose_updates(self, count: int = 1) -> None:
+        """Drop the next pushed updates, leaving a gap in the pts sequence.
+
+        Args:
+            count: Number of updates to lose
+        """
+        self._updates_to_lose += count
+
+    def booked_by(self, city: str) -> Dict[int, Optional[int]]:
+        """Get who booked the shipments of a city.
+
+        Args:
+            city: City name
+
+        Returns:
+            Mapping of shipment ID to booking user ID (None if free)
+        """
+        return {
+            shipment.id: shipment.booked_by
+            for shipment in self.shipments.values() if shipment.city == city
+        }
+
+    def bookings(self, user_id: Optional[int] = None) -> List[FakeShipment]:
+        """Get shipments booked by a user.
+
+        Args:
+            user_id: Booking user, the emulated account when omitted
+
+        Returns:
+            List of booked shipments
+        """
+        user_id = self.user_id if user_id is None else user_id
+        return [shipment for shipment in self.shipments.values() if shipment.booked_by == user_id]
+
+    # ------------------------------------------------------------------
+    # Network emulation
+    # ------------------------------------------------------------------
+
+    def _delay(self) -> float:
+        """Draw a one-way delay in seconds."""
+        network = self.network
+        delay = network.latency_ms
+
+        if network.jitter_ms:
+            delay += self._rng.uniform(-network.jitter_ms, network.jitter_ms)
+
+        if network.drop_rate and self._rng.random() < network.drop_rate:
+            self.dropped += 1
+            delay += network.retransmit_ms
+
+        return max(delay, 0.0) / 1000.0
+
+    async def _transit(self, name: Optional[str] = None) -> None:
+        """Emulate one packet crossing the network.
+
+        Args:
+            name: Request name to log when this is an uplink packet
+        """
+        if name is not None:
+            self.requests.append(name)
+
+        await asyncio.sleep(self._delay())
+
+    async def _round_trip(self, name: str) -> None:
+        """Emulate a request with an immediate response."""
+        await self._transit(name)
+        await self._transit()
+
+    # ------------------------------------------------------------------
+    # Chat state
+    # ------------------------------------------------------------------
+
+    def _check_bot(self, entity) -> None:
+        """Reject chats other than the emulated bot."""
+        name = getattr(entity, 'username', None) or str(entity)
+
+        if name.lstrip('@') != self.bot_username and not isinstance(entity, types.InputPeerUser):
+            raise ValueError(f"Cannot find any entity corresponding to \"{entity}\"")
+
+    def _add_message(self, text: str, keyboard: Optional[Keyboard] = None, out: bool = False) -> int:
+        """Append a message to the chat.
+
+        Returns:
+            ID of the new message
+        """
+        self._last_id += 1
+        self.pts += 1
+        self._messages[self._last_id] = {
+            "text": text,
+            "keyboard": keyboard,
+            "out": out,
+            "date": datetime.now(),
+            "edit_date": None,
+            "pts": self.pts,
+        }
+
+        if not out:
+            self._push(types.UpdateNewMessage(self._render(self._last_id), self.pts, 1))
+
+        return self._last_id
+
+    def _edit_message(self, message_id: int, text: str, keyboard: Optional[Keyboard]) -> None:
+        """Edit a bot message in place."""
+        self.pts += 1
+        self._messages[message_id].update(
+            text=text, keyboard=keyboard, edit_date=datetime.now()
+        )
+        self._push(types.UpdateEditMessage(self._render(message_id), self.pts, 1))
+
+    def _push(self, update) -> None:
+        """Deliver an update to the registered handlers after the downlink delay."""
+        if not self.push_updates or not self._handlers:
+            return
+
+        if self._updates_to_lose:
+            self._updates_to_lose -= 1
+            return
+
+        async def deliver():
+            await self._transit()
+            for handler in list(self._handlers):
+                await handler(update)
+
+        self._spawn(deliver())
+
+    def _render(self, message_id: int, text: Optional[str] = None) -> types.Message:
+        """Build a Telethon message snapshot of the chat state."""
+        state = self._messages.get(message_id, {"text": text, "keyboard": None, "out": True})
+        keyboard = state["keyboard"]
+
+        markup = None
+        if keyboard:
+            markup = types.ReplyInlineMarkup([
+                types.KeyboardButtonRow([
+                    types.KeyboardButtonCallback(button_text, data)
+                    for button_text, data in row
+                ])
+                for row in keyboard
+            ])
+
+        message = types.Message(
+            id=message_id,
+            peer_id=types.PeerUser(self.bot_id),
+            date=state.get("date") or datetime.now(),
+            message=state["text"],
+            out=state["out"],
+            reply_markup=markup,
+            edit_date=state.get("edit_date")
+        )
+        message.text = state["text"]
+
+        return message
+
+    def _menu_keyboard(self) -> Keyboard:
+        """Render the shipment menu like ``keyboards.get_shipments_keyboard``."""
+        rows = []
+
+        for shipment in self.shipments.values():
+            text = f"{shipment.city}_{shipment.quantity}"
+            if shipment.is_booked:
+                text += " ❌"
+            rows.append(((text, f"shipment:{shipment.id}".encode()),))
+
+        rows.append(BACK_ROW)
+        return tuple(rows)
+
+    # ------------------------------------------------------------------
+    # Bot behaviour
+    # ------------------------------------------------------------------
+
+    def _spawn(self, coro) -> None:
+        """Run bot-side work in the background."""
+        self._bot_tasks.append(asyncio.ensure_future(coro))
+
+    def _user_says(self, text: str) -> int:
+        """Store an outgoing message and let the bot react to it.
+
+        Returns:
+            ID of the stored message
+        """
+        message_id = self._add_message(text, out=True)
+
+        if text.startswith("/start"):
+            self._spawn(self._answer_start())
+
+        return message_id
+
+    async def _answer_start(self) -> None:
+        """Answer /start with the shipment menu."""
+        await asyncio.sleep(self.bot_processing_ms / 1000.0)
+        self._add_message(MENU_TEXT, self._menu_keyboard())
+
+    async def _callback(self, request: GetBotCallbackAnswerRequest) -> types.messages.BotCallbackAnswer:
+        """Handle a callback query like the bot's callback handlers."""
+        await self._transit("callback")
+
+        state = self._messages.get(request.msg_id)
+        if state is None or state["out"]:
+            await self._transit()
+            raise MessageIdInvalidError(request=request)
+
+        datas = {data for row in state["keyboard"] or () for _, data in row}
+        if request.data not in datas:
+            await self._transit()
+            raise DataInvalidError(request=request)
+
+        # The bot answers shipment: only after the detail keyboard is shown
+        await asyncio.sleep(self.bot_processing_ms / 1000.0)
+        alert = self._handle_callback(request.msg_id, request.data)
+        await self._transit()
+
+        return types.messages.BotCallbackAnswer(cache_time=0, message=alert, alert=alert is not None)
+
+    def _handle_callback(self, message_id: int, data: bytes) -> Optional[str]:
+        """Apply a callback to the chat state.
+
+        Returns:
+            Alert text shown to the user, if any
+        """
+        action, _, argument = data.decode().partition(":")
+
+        if action == "back_to_menu":
+            self._edit_message(message_id, WELCOME_TEXT, None)
+            return None
+
+        shipment = self.shipments.get(int(argument)) if argument.isdigit() else None
+        if shipment is None:
+            return "Перевозка не найдена"
+
+        info = f"🚚 {shipment.city}\n📦 Количество: {shipment.quantity}"
+
+        if action == "shipment":
+            if shipment.is_booked:
+                self._edit_message(message_id, info + BOOKED_SUFFIX, (BACK_ROW,))
+            else:
+                self._edit_message(message_id, info, (
+                    (("✅ Подтвердить", f"confirm:{shipment.id}".encode()),),
+                    (("◀️ Возврат в меню", b"back_to_menu"),),
+                ))
+
+        elif action == "confirm":
+            if shipment.is_booked and shipment.booked_by != self.user_id:
+                text = BOOKING_TAKEN
+            else:
+                shipment.booked_by = self.user_id
+                text = BOOKING_SUCCESS
+            self._edit_message(message_id, text, (BACK_ROW,))
+
+        return None
+
+    async def _compete(self, competitor: Competitor) -> None:
+        """Book the first free shipment of a city after a delay."""
+        await asyncio.sleep(competitor.delay_ms / 1000.0)
+
+        for shipment in self.shipments.values():
+            if shipment.city == competitor.city and not shipment.is_booked:
+                shipment.booked_by = competitor.user_id
+                return
@@ -0,0 +1,118 @@
+"""Offline end-to-end run of the booking flow against the fake Telegram."""
+
+import asyncio
+from typing import Optional, Sequence
+
+from ..core.bot_handler import BotHandler
+from ..core.client import BookingClient
+from .fake_telegram import FakeTelegramClient
+
+
+def create_offline_client(fake) -> BookingClient:
+    """Create a booking client wired to a Telegram client stand-in.
+
+    Args:
+        fake: Fake or replaying Telegram client
+
+    Returns:
+        Booking client that needs no initialization
+    """
+    client = BookingClient(api_id=0, api_hash="", phone="", session_name="offline")
+    client.client = fake
+    return client
+
+
+async def run_offline_booking(
+    fake: FakeTelegramClient,
+    targets: Sequence,
+    sms_delay_ms: float = 50.0,
+    polling_interval_ms: int = 5,
+    timeout_seconds: float = 5.0,
+    speculative_mode: bool = False,
+    fast_path: bool = False,
+    fallback_to_any: bool = True,
+    sms_trigger_text: str = "Появились новые перевозки",
+    client: Optional[BookingClient] = None,
+    trace_dir: Optional[str] = None,
+    performance=None,
+    event_driven: bool = False
+) -> dict:
+    """Run monitoring and the booking sequence like the scheduled mode does.
+
+    The preparation phase sends /start (and takes a menu snapshot in
+    speculative mode), then monitoring starts and the SMS is published
+    ``sms_delay_ms`` later.
+
+    Args:
+        fake: Fake Telegram client with the scenario
+        targets: City patterns or target configurations
+        sms_delay_ms: Delay between monitoring start and the SMS
+        polling_interval_ms: SMS polling interval
+        timeout_seconds: Monitoring timeout
+        speculative_mode: Use speculative select/confirm
+        fast_path: Use pre-built request templates
+        fallback_to_any: Book any free shipment if no target is available
+        sms_trigger_text: Text identifying the SMS notification
+        client: Booking client to use (created when omitted)
+        trace_dir: Directory for the attempt trace (optional)
+        performance: PerformanceConfig with stage budgets (optional)
+        event_driven: Wait for the SMS via pushed updates instead of polling
+
+    Returns:
+        Booking statistics with ``sms_detected`` and ``booked`` added
+    """
+    client = client or create_offline_client(fake)
+    targets = list(targets)
+    target_cities = [
+        target if isinstance(target, str) else city
+        for target in targets
+        for city in ([target] if isinstance(target, str) else target.cities)
+    ]
+
+    handler = BotHandler(
+        client=client,
+        bot_username=fake.bot_username,
+        sms_trigger_text=sms_trigger_text,
+        target_cities=target_cities,
+        targets=targets,
+        fallback_to_any=fallback_to_any,
+        speculative_mode=speculative_mode,
+        trace_dir=trace_dir,
+        performance=performance
+    )
+
+    # Preparation phase
+    await client.send_message(fake.bot_username, "/start")
+    await asyncio.sleep((fake.network.latency_ms * 2 + fake.bot_processing_ms) / 1000.0)
+
+    if fast_path:
+        await handler.prepare_fast_path()
+
+    if speculative_mode:
+        await handler.snapshot_menu()
+
+    await handler.initialize()
+
+    # Booking window
+    client.mark("monitoring_start")
+    loop = asyncio.get_running_loop()
+    loop.call_later(sms_delay_ms / 1000.0, fake.publish_sms)
+
+    sms_message = await handler.monitor_sms(
+        polling_interval_ms=polling_interval_ms,
+        timeout_seconds=timeout_seconds,
+        event_driven=event_driven
+    )
+
+    if sms_message is None:
+        stats = {"success": False, "error": "SMS not detected", "stages": {}}
+    else:
+        stats = await handler.execute_booking_sequence(sms_message)
+
+    stats["sms_detected"] = sms_message is not None
+    stats["booked"] = [f"{shipment.city}_{shipment.quantity}" for shipment in fake.bookings()]
+    stats["requests"] = list(fake.requests)
+    stats["handler_metrics"] = handler.get_metrics()
+
+    await fake.disconnect()
+    return stats
@@ -0,0 +1,382 @@
+"""Replay of recorded booking sessions against BotHandler."""
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Sequence
+
+from telethon import errors
+from telethon.tl import types
+
+from ..core.bot_handler import BotHandler
+from ..core.request_templates import extract_sent_message_id
+from ..utils.recorder import CALL, ERROR, MARK, OPERATIONS, RESULT, UPDATE, read_recording
+from .harness import create_offline_client
+
+ACTIONS = ("send", "callback")
+
+
+class RecordedCall:
+    """A call and its outcome as captured in a recording."""
+
+    def __init__(self, meta: dict, t_ns: int, request=None):
+        self.method = meta["method"]
+        self.op = meta["op"]
+        self.args = meta["args"]
+        self.request = request
+        self.t_call_ns = t_ns
+        self.t_done_ns = t_ns
+        self.result = None
+        self.error: Optional[dict] = None
+
+    @property
+    def duration_ns(self) -> int:
+        """Time the call took when it was recorded."""
+        return self.t_done_ns - self.t_call_ns
+
+    @property
+    def arrival_ns(self) -> int:
+        """Estimated time the call reached Telegram."""
+        return self.t_call_ns + self.duration_ns // 2
+
+
+class ReplayTelegramClient:
+    """Telethon client stand-in answering from a recording.
+
+    ``get_messages`` returns every message version observed up to the
+    corresponding point of the recording, so a different polling pattern
+    still sees messages appear and change at their original times. Changes
+    observed after an action of the recorded client (a sent message or a
+    callback) appear only once the replayed client has taken the same
+    action, delayed by the originally observed reaction time. Other calls
+    are answered in order per logical operation (send, callback, ping,
+    resolve) with the recorded latency and outcome. The replay clock runs
+    ``speed`` times faster than real time.
+
+    Only what the recorded client observed can be replayed: a menu that
+    was never fetched (e.g. in speculative mode) does not appear.
+    """
+
+    def __init__(self, records, speed: float = 1.0, start_mark: Optional[str] = "monitoring_start"):
+        """Index a recording.
+
+        Args:
+            records: Records from ``read_recording``
+            speed: Replay speed factor (2.0 replays twice as fast)
+            start_mark: Mark to start the replay at; the recording start
+                is used if the mark is absent
+        """
+        self.speed = speed
+        self.parse_mode = None
+        self.calls: Dict[int, RecordedCall] = {}
+        self.updates: List[tuple] = []
+        self.marks: Dict[str, int] = {}
+
+        for record in records:
+            if record.kind == CALL:
+                self.calls[record.meta["id"]] = RecordedCall(record.meta, record.t_ns, record.body)
+            elif record.kind in (RESULT, ERROR):
+                call = self.calls[record.meta["id"]]
+                call.t_done_ns = record.t_ns
+                call.result = record.body
+                call.error = record.meta if record.kind == ERROR else None
+            elif record.kind == UPDATE:
+                self.updates.append((record.t_ns, record.body))
+            elif record.kind == MARK:
+                self.marks.setdefault(record.meta["name"], record.t_ns)
+
+        self.offset_ns = self.marks.get(start_mark, 0)
+        self.end_ns = max((call.t_done_ns for call in self.calls.values()), default=0)
+
+        self._snapshots = [
+            call for call in self.calls.values()
+            if call.method == "get_messages" and call.error is None
+        ]
+        self._pending: Dict[str, Deque[RecordedCall]] = defaultdict(deque)
+        for call in self.calls.values():
+            if call.op not in ("get_messages", "resolve") and call.t_call_ns >= self.offset_ns:
+                self._pending[call.op].append(call)
+
+        # Actions of the recorded client after the start; chat changes seen
+        # after the k-th action are attributed to it
+        self._actions = sorted(
+            (call.t_call_ns for op in ACTIONS for call in self._pending[op])
+        )
+        self._issued_ns: List[int] = []
+        self._observations = self._index_observations()
+
+        self._handlers = []
+        self._update_task: Optional[asyncio.Task] = None
+        self._start_ns: Optional[int] = None
+        self.unmatched = 0
+
+    def _index_observations(self) -> List[tuple]:
+        """Estimate when each observed message version became visible.
+
+        A version first seen by a fetch appeared between that fetch and the
+        previous one (or the action it is attributed to, if later); the
+        midpoint of that interval is used, so a replayed fetch at the
+        originally recorded moment always sees it.
+
+        Returns:
+            Sorted list of (visible_ns, epoch, message)
+        """
+        observations = []
+        seen = set()
+        previous_ns = 0
+
+        for call in sorted(self._snapshots, key=lambda call: call.arrival_ns):
+            epoch = bisect_left(self._actions, call.arrival_ns)
+            since_ns = max(previous_ns, self._actions[epoch - 1] if epoch else 0)
+            previous_ns = call.arrival_ns
+
+            for message in call.result.messages if call.result is not None else ():
+                key = (message.id, message.message, message.edit_date)
+                if key not in seen:
+                    seen.add(key)
+                    observations.append(((since_ns + call.arrival_ns) // 2, epoch, message))
+
+        observations.sort(key=lambda item: item[0])
+        return observations
+
+    @property
+    def duration_s(self) -> float:
+        """Real-time length of the replayed window in seconds."""
+        return max(self.end_ns - self.offset_ns, 0) / 1e9 / self.speed
+
+    def now_ns(self) -> int:
+        """Current position on the recording timeline."""
+        if self._start_ns is None:
+            self._start_ns = time.monotonic_ns()
+
+        return self.offset_ns + int((time.monotonic_ns() - self._start_ns) * self.speed)
+
+    def start(self) -> None:
+        """(Re)start the replay clock at the start mark and dispatch updates.
+
+        Calls made before ``start`` see the chat as of the start mark.
+        """
+        self._start_ns = time.monotonic_ns()
+
+        if self._handlers and self._update_task is None:
+            self._update_task = asyncio.ensure_future(self._dispatch_updates())
+
+    async def _sleep_ns(self, duration_ns: int) -> None:
+        await asyncio.sleep(duration_ns / 1e9 / self.speed)
+
+    # ------------------------------------------------------------------
+    # Telethon client API
+    # ------------------------------------------------------------------
+
+    def is_connected(self) -> bool:
+        return True
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        if self._update_task is not None:
+            self._update_task.cancel()
+            self._update_task = None
+
+    def add_event_handler(self, callback, event=None) -> None:
+        """Register a handler receiving recorded raw updates."""
+        self._handlers.append(callback)
+
+    def remove_event_handler(self, callback, event=None) -> None:
+        self._handlers.remove(callback)
+
+    async def get_messages(self, entity, limit: int = 1, min_id: int = 0, max_id: int = 0, **kwargs) -> list:
+        """Return the chat as observed at the current replay time."""
+        call_ns = self.now_ns()
+        latency_ns = self._typical_latency_ns(call_ns)
+        await self._sleep_ns(latency_ns)
+
+        arrival_ns = call_ns + latency_ns // 2
+        chat = {}
+
+        for observed_ns, epoch, message in self._observations:
+            if epoch:
+                if epoch > len(self._issued_ns):
+                    continue
+                observed_ns = self._issued_ns[epoch - 1] + observed_ns - self._actions[epoch - 1]
+
+            if observed_ns <= arrival_ns:
+                chat[message.id] = message
+
+        messages = []
+        for message_id in sorted(chat, reverse=True):
+            if message_id > min_id and (not max_id or message_id < max_id):
+                message = chat[message_id]
+                message.text = message.message
+                messages.append(message)
+
+        return messages[:limit]
+
+    async def send_message(self, entity, message: str, **kwargs):
+        if entity == "me":
+            return None
+
+        call = await self._replay("send")
+
+        if isinstance(call.result, types.Message):
+            message_id = call.result.id
+        else:
+            message_id = extract_sent_message_id(call.result, getattr(call.request, "random_id", 0))
+
+        return types.Message(id=message_id, peer_id=None, date=datetime.now(), message=message, out=True)
+
+    async def get_entity(self, entity):
+        return await self._resolve(types.User, types.User(id=0, access_hash=0, bot=True))
+
+    async def get_input_entity(self, entity):
+        return await self._resolve(types.InputPeerUser, types.InputPeerUser(0, 0))
+
+    async def __call__(self, request, ordered: bool = False):
+        op = OPERATIONS.get(type(request).__name__, "invoke")
+        result = (await self._replay(op)).result
+
+        if op == "send" and isinstance(result, types.Message):
+            return types.UpdateShortSentMessage(
+                id=result.id, pts=0, pts_count=0, date=result.date, out=True
+            )
+
+        return result
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _typical_latency_ns(self, at_ns: int) -> int:
+        """Latency of the recorded fetch closest to a point in time."""
+        if not self._snapshots:
+            return 0
+
+        closest = min(self._snapshots, key=lambda call: abs(call.t_call_ns - at_ns))
+        return closest.duration_ns
+
+    async def _resolve(self, result_type, default):
+        """Answer an entity lookup from any recorded lookup.
+
+        Lookups are idempotent, so they are not consumed and may have been
+        recorded before the replayed window.
+        """
+        lookups = [call for call in self.calls.values() if call.op == "resolve"]
+
+        if lookups:
+            await self._sleep_ns(lookups[0].duration_ns)
+
+        for call in lookups:
+            if isinstance(call.result, result_type):
+                return call.result
+
+        return default
+
+    async def _replay(self, op: str) -> RecordedCall:
+        """Answer the next recorded call of an operation.
+
+        Returns:
+            The recorded call, after its recorded latency has passed
+        """
+        pending = self._pending.get(op)
+
+        if not pending:
+            self.unmatched += 1
+            raise RuntimeError(f"No recorded '{op}' call left to replay")
+
+        call = pending.popleft()
+        if op in ACTIONS:
+            self._issued_ns.append(self.now_ns())
+
+        await self._sleep_ns(call.duration_ns)
+
+        if call.error is not None:
+            error_class = getattr(errors, call.error["error"], None)
+            if error_class is not None and issubclass(error_class, errors.RPCError):
+                raise error_class(request=call.request)
+            raise RuntimeError(call.error["message"])
+
+        return call
+
+    async def _dispatch_updates(self) -> None:
+        """Deliver recorded updates at their original times."""
+        for t_ns, update in self.updates:
+            if t_ns < self.offset_ns:
+                continue
+
+            delay_ns = t_ns - self.now_ns()
+            if delay_ns > 0:
+                await self._sleep_ns(delay_ns)
+
+            for handler in list(self._handlers):
+                await handler(update)
+
+
+async def replay_booking(
+    path: str,
+    targets: Sequence,
+    bot_username: str,
+    speed: float = 1.0,
+    polling_interval_ms: int = 30,
+    speculative_mode: bool = False,
+    fast_path: bool = False,
+    fallback_to_any: bool = True,
+    sms_trigger_text: str = "Появились новые перевозки",
+    start_mark: Optional[str] = "monitoring_start"
+) -> dict:
+    """Replay a recorded booking window through BotHandler.
+
+    Args:
+        path: Recording file path
+        targets: City patterns or target configurations
+        bot_username: Bot username used in the recording
+        speed: Replay speed factor
+        polling_interval_ms: SMS polling interval
+        speculative_mode: Use speculative select/confirm
+        fast_path: Use pre-built request templates
+        fallback_to_any: Book any free shipment if no target is available
+        sms_trigger_text: Text identifying the SMS notification
+        start_mark: Mark the replay starts at
+
+    Returns:
+        Booking statistics with ``replay`` details added
+    """
+    replay = ReplayTelegramClient(read_recording(path), speed=speed, start_mark=start_mark)
+    client = create_offline_client(replay)
+    targets = list(targets)
+
+    handler = BotHandler(
+        client=client,
+        bot_username=bot_username,
+        sms_trigger_text=sms_trigger_text,
+        target_cities=[target for target in targets if isinstance(target, str)],
+        targets=targets,
+        fallback_to_any=fallback_to_any,
+        speculative_mode=speculative_mode
+    )
+
+    # Preparation happens before the replayed window, like in scheduled mode
+    if fast_path:
+        await handler.prepare_fast_path()
+
+    if speculative_mode:
+        await handler.snapshot_menu()
+
+    replay.start()
+    await handler.initialize()
+
+    sms_message = await handler.monitor_sms(
+        polling_interval_ms=polling_interval_ms,
+        timeout_seconds=replay.duration_s + 1
+    )
+
+    if sms_message is None:
+        stats = {"success": False, "error": "SMS not detected", "stages": {}}
+    else:
+        stats = await handler.execute_booking_sequence(sms_message)
+
+    stats["replay"] = {"speed": speed, "unmatched_calls": replay.unmatched}
+    await replay.disconnect()
+    return stats
@@ -3,10 +3,16 @@
 from .logger import get_logger, setup_logging
 from .metrics import MetricsCollector
 from .notifier import Notifier
+from .recorder import SessionRecorder, read_recording
+from .tracing import Tracer, span
 
 __all__ = [
     'get_logger',
     'setup_logging',
     'MetricsCollector',
     'Notifier',
+    'SessionRecorder',
+    'read_recording',
+    'Tracer',
+    'span',
 ]
@@ -2,7 +2,7 @@
 
 import time
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 from datetime import datetime
 
 
@@ -115,6 +115,56 @@ class MetricsCollector:
             "recorded": True
         }
 
+    def get_percentile(self, action_name: str, percentile: float) -> Optional[float]:
+        """Get a percentile of recorded durations for an action.
+
+        Args:
+            action_name: Name of the action
+            percentile: Percentile in range 0-100
+
+        Returns:
+            Duration in milliseconds or None if nothing was recorded
+        """
+        durations = self.metrics.get(action_name)
+
+        if not durations:
+            return None
+
+        ordered = sorted(durations)
+        rank = (len(ordered) - 1) * min(max(percentile, 0.0), 100.0) / 100.0
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+    def get_histogram(
+        self,
+        action_name: str,
+        bucket_edges_ms: Sequence[float] = (10, 20, 50, 100, 200, 500, 1000)
+    ) -> Dict[str, int]:
+        """Build a histogram of recorded durations for an action.
+
+        Args:
+            action_name: Name of the action
+            bucket_edges_ms: Upper bucket bounds in milliseconds (ascending)
+
+        Returns:
+            Dictionary mapping bucket label to number of samples
+        """
+        histogram = {f"<={edge:g}ms": 0 for edge in bucket_edges_ms}
+        overflow_label = f">{bucket_edges_ms[-1]:g}ms"
+        histogram[overflow_label] = 0
+
+        for duration in self.metrics.get(action_name, []):
+            for edge in bucket_edges_ms:
+                if duration <= edge:
+                    histogram[f"<={edge:g}ms"] += 1
+                    break
+            else:
+                histogram[overflow_label] += 1
+
+        return histogram
+
     def reset(self) -> None:
         """Reset all metrics."""
         self.metrics.clear()
@@ -1,6 +1,15 @@
-"""User notification system."""
+"""User notification system.
 
+Terminal rendering and sound playback are handed to a background thread,
+and Telegram self-notifications run as detached tasks, so nothing the
+notifier does can delay the event loop during preparation and monitoring.
+"""
+
+import asyncio
+import queue
 import sys
+import threading
+import time
 from typing import Optional
 from datetime import datetime
 
@@ -8,6 +17,8 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+_STOP = object()
+
 
 class Notifier:
     """Handles user notifications about booking results."""
@@ -16,7 +27,8 @@ class Notifier:
         self,
         client,
         notify_user_id: Optional[int] = None,
-        sound_alert: bool = True
+        sound_alert: bool = True,
+        countdown_interval_ms: int = 250
     ):
         """Initialize notifier.
 
@@ -24,10 +36,18 @@ class Notifier:
             client: Telegram client for sending messages
             notify_user_id: User ID to send notifications to
             sound_alert: Whether to play sound alerts
+            countdown_interval_ms: Minimum interval between countdown redraws
         """
         self.client = client
         self.notify_user_id = notify_user_id
         self.sound_alert = sound_alert
+        self.countdown_interval = countdown_interval_ms / 1000.0
+
+        self._output_queue: queue.Queue = queue.Queue()
+        self._countdown_lock = threading.Lock()
+        self._countdown_line: Optional[str] = None
+        self._worker: Optional[threading.Thread] = None
+        self._pending_sends: set = set()
 
     async def notify_booking_result(self, stats: dict) -> None:
         """Send notification about booking result.
@@ -66,19 +86,12 @@ class Notifier:
             message += f"\nПозиция: #{stats['position_in_queue']} в очереди 🏆"
 
         logger.info(message)
-        self._print_colored_box(message, "green")
+        self._submit(self._print_colored_box, message, "green")
 
         if self.sound_alert:
-            self._play_sound_alert()
+            self._submit(self._play_sound_alert)
 
-        if self.notify_user_id and self.client:
-            try:
-                await self.client.client.send_message(
-                    self.notify_user_id,
-                    message
-                )
-            except Exception as e:
-                logger.error(f"Failed to send Telegram notification: {e}")
+        self._schedule_telegram_notification(message)
 
     async def _notify_failure(self, stats: dict) -> None:
         """Send failure notification.
@@ -96,16 +109,38 @@ class Notifier:
         )
 
         logger.error(message)
-        self._print_colored_box(message, "red")
+        self._submit(self._print_colored_box, message, "red")
 
-        if self.notify_user_id and self.client:
-            try:
-                await self.client.client.send_message(
-                    self.notify_user_id,
-                    message
-                )
-            except Exception as e:
-                logger.error(f"Failed to send Telegram notification: {e}")
+        self._schedule_telegram_notification(message)
+
+    def _schedule_telegram_notification(self, message: str) -> None:
+        """Send Telegram self-notification in a detached task.
+
+        Args:
+            message: Notification text
+        """
+        if not (self.notify_user_id and self.client):
+            return
+
+        task = asyncio.get_running_loop().create_task(
+            self._send_telegram_notification(message)
+        )
+        self._pending_sends.add(task)
+        task.add_done_callback(self._pending_sends.discard)
+
+    async def _send_telegram_notification(self, message: str) -> None:
+        """Deliver notification to the configured Telegram user.
+
+        Args:
+            message: Notification text
+        """
+        try:
+            await self.client.client.send_message(
+                self.notify_user_id,
+                message
+            )
+        except Exception as e:
+            logger.error(f"Failed to send Telegram notification: {e}")
 
     def notify_status(self, message: str) -> None:
         """Print status notification.
@@ -114,7 +149,7 @@ class Notifier:
             message: Status message
         """
         logger.info(message)
-        print(f"\n📊 {message}")
+        self._submit(print, f"\n📊 {message}")
 
     def print_startup_banner(self, config: dict) -> None:
         """Print startup banner with configuration.
@@ -137,6 +172,9 @@ class Notifier:
     def print_countdown(self, seconds_remaining: int, phase: str) -> None:
         """Print countdown timer.
 
+        Only the latest value is kept; the output worker redraws it at most
+        once per ``countdown_interval``, so this is safe to call at a high rate.
+
         Args:
             seconds_remaining: Seconds until target time
             phase: Current phase name
@@ -154,11 +192,83 @@ class Notifier:
 
         emoji = status_emoji.get(phase, "⏱️")
 
-        print(
-            f"\r{emoji} До {phase}: {hours:02d}:{minutes:02d}:{seconds:02d}",
-            end="",
-            flush=True
-        )
+        with self._countdown_lock:
+            self._countdown_line = f"\r{emoji} До {phase}: {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+        self._ensure_worker()
+
+    def end_countdown(self) -> None:
+        """Finish the countdown line so that further output starts on a new line."""
+        self._submit(print)
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Wait for pending notifications and stop the output worker.
+
+        Args:
+            timeout: Maximum time to wait in seconds
+        """
+        if self._pending_sends:
+            await asyncio.wait(list(self._pending_sends), timeout=timeout)
+
+        if self._worker is not None and self._worker.is_alive():
+            self._output_queue.put(_STOP)
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._worker.join, timeout
+            )
+
+        self._worker = None
+
+    def _submit(self, func, *args) -> None:
+        """Queue a rendering call for the output worker.
+
+        Args:
+            func: Callable to run on the worker thread
+            *args: Arguments for the callable
+        """
+        self._ensure_worker()
+        self._output_queue.put((func, args))
+
+    def _ensure_worker(self) -> None:
+        """Start the output worker thread if it is not running."""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run_output_worker,
+                name="notifier-output",
+                daemon=True
+            )
+            self._worker.start()
+
+    def _run_output_worker(self) -> None:
+        """Render queued output and throttled countdown updates."""
+        rendered_line = None
+        last_render = 0.0
+
+        while True:
+            try:
+                item = self._output_queue.get(timeout=self.countdown_interval)
+            except queue.Empty:
+                item = None
+
+            with self._countdown_lock:
+                line = self._countdown_line
+
+            now = time.monotonic()
+            if line != rendered_line and (item is not None or now - last_render >= self.countdown_interval):
+                print(line, end="", flush=True)
+                rendered_line = line
+                last_render = now
+
+            if item is None:
+                continue
+
+            if item is _STOP:
+                break
+
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                logger.debug(f"Notifier output failed: {e}")
 
     def _print_colored_box(self, message: str, color: str) -> None:
         """Print message in a colored box.
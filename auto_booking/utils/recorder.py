@@ -0,0 +1,311 @@
+"""Recording of Telegram traffic for deterministic replay.
+
+A recording is an append-only binary file: a magic header followed by
+records of the form ``<kind:u8><t_ns:u64><meta_len:u16><body_len:u32>``,
+JSON metadata and a TL-serialized body. ``t_ns`` is a monotonic timestamp
+relative to the start of the recording.
+
+Records are captured as objects on the hot path; full buffers are encoded
+and written by a background thread, so recording adds a list append per
+event and never touches the file on the event loop.
+"""
+
+import json
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from telethon import events
+from telethon.extensions import BinaryReader
+from telethon.tl.tlobject import TLObject
+from telethon.tl.types import messages as message_types
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"ABREC1\n"
+HEADER = struct.Struct("<BQHI")
+
+UPDATE, CALL, RESULT, ERROR, MARK = 1, 2, 3, 4, 5
+
+_STOP = object()
+
+# Logical operations, so that high-level and raw calls replay each other
+OPERATIONS = {
+    "SendMessageRequest": "send",
+    "GetBotCallbackAnswerRequest": "callback",
+    "PingRequest": "ping",
+    "ResolveUsernameRequest": "resolve",
+}
+
+
+class Record(NamedTuple):
+    """Decoded recording entry."""
+    kind: int
+    t_ns: int
+    meta: dict
+    body: Optional[object]
+
+
+def _encode_body(obj) -> Tuple[bytes, Optional[str]]:
+    """Serialize a record body.
+
+    Lists of messages are wrapped into ``messages.Messages``; objects that
+    cannot be serialized are stored as ``repr`` in the metadata instead.
+
+    Returns:
+        Tuple of (TL bytes, repr fallback)
+    """
+    if obj is None:
+        return b"", None
+
+    if isinstance(obj, list):
+        obj = message_types.Messages(messages=list(obj), chats=[], users=[])
+
+    if isinstance(obj, TLObject):
+        try:
+            return bytes(obj), None
+        except Exception:
+            pass
+
+    return b"", repr(obj)
+
+
+class SessionRecorder:
+    """Append-only recorder of updates, requests and results."""
+
+    def __init__(self, path: str, flush_every: int = 1000):
+        """Open a recording file.
+
+        Args:
+            path: Output file path
+            flush_every: Number of buffered records that triggers a flush
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+        self._start_ns = time.monotonic_ns()
+        self._buffer: List[tuple] = []
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._next_call_id = 0
+        self.records = 0
+
+    def _append(self, kind: int, meta: dict, body=None) -> None:
+        """Buffer a record with the current timestamp."""
+        self._buffer.append((kind, time.monotonic_ns() - self._start_ns, meta, body))
+        self.records += 1
+
+        if len(self._buffer) >= self.flush_every:
+            self._submit_buffer()
+
+    def call(self, method: str, args: dict, request=None) -> int:
+        """Record an outgoing call.
+
+        Args:
+            method: Client method name
+            args: JSON-serializable call arguments
+            request: Raw request object, if any
+
+        Returns:
+            Call ID to pass to ``result`` or ``error``
+        """
+        self._next_call_id += 1
+        operation = OPERATIONS.get(type(request).__name__, method) if request else method
+        self._append(CALL, {"id": self._next_call_id, "method": method, "op": operation, "args": args}, request)
+        return self._next_call_id
+
+    def result(self, call_id: int, result) -> None:
+        """Record the result of a call."""
+        self._append(RESULT, {"id": call_id}, result)
+
+    def error(self, call_id: int, error: BaseException) -> None:
+        """Record a failed call."""
+        self._append(ERROR, {"id": call_id, "error": type(error).__name__, "message": str(error)})
+
+    def update(self, update) -> None:
+        """Record an incoming update."""
+        self._append(UPDATE, {}, update)
+
+    def mark(self, name: str) -> None:
+        """Record a named point in time (e.g. monitoring start)."""
+        self._append(MARK, {"name": name})
+
+    def flush(self) -> None:
+        """Write buffered records to disk and wait until they are written.
+
+        Blocks, so it belongs outside the booking attempt.
+        """
+        # Submitted buffers go first, the writer is idle afterwards
+        self._write_queue.join()
+        self._write(self._take_buffer())
+
+    def _take_buffer(self) -> List[tuple]:
+        """Detach the current buffer."""
+        buffer, self._buffer = self._buffer, []
+        return buffer
+
+    def _submit_buffer(self) -> None:
+        """Hand the buffer to the writer thread."""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._run_writer, name="recorder-writer", daemon=True)
+            self._writer.start()
+
+        self._write_queue.put(self._take_buffer())
+
+    def _run_writer(self) -> None:
+        """Write submitted buffers in order."""
+        while True:
+            buffer = self._write_queue.get()
+            try:
+                if buffer is _STOP:
+                    break
+                self._write(buffer)
+            except Exception as e:
+                logger.error(f"Failed to write recording: {e}")
+            finally:
+                self._write_queue.task_done()
+
+    def _write(self, buffer: List[tuple]) -> None:
+        """Encode records and append them to the file."""
+        chunks = []
+
+        for kind, t_ns, meta, body in buffer:
+            data, fallback = _encode_body(body)
+            if fallback is not None:
+                meta = dict(meta, repr=fallback)
+            meta_bytes = json.dumps(meta, ensure_ascii=False, default=repr).encode("utf-8")
+            chunks.append(HEADER.pack(kind, t_ns, len(meta_bytes), len(data)))
+            chunks.append(meta_bytes)
+            chunks.append(data)
+
+        if not chunks:
+            return
+
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the recording."""
+        if self._file.closed:
+            return
+
+        if self._writer is not None and self._writer.is_alive():
+            self._write_queue.put(_STOP)
+            self._writer.join()
+        self._writer = None
+
+        self.flush()
+        self._file.close()
+        logger.info(f"Recording saved: {self.path} ({self.records} records)")
+
+
+def read_recording(path: str) -> Iterator[Record]:
+    """Read a recording file.
+
+    Args:
+        path: Recording file path
+
+    Yields:
+        Decoded records in recording order
+    """
+    data = Path(path).read_bytes()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f"Not a booking recording: {path}")
+
+    offset = len(MAGIC)
+
+    while offset < len(data):
+        kind, t_ns, meta_len, body_len = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        meta = json.loads(data[offset:offset + meta_len].decode("utf-8"))
+        offset += meta_len
+        body = data[offset:offset + body_len]
+        offset += body_len
+
+        yield Record(kind, t_ns, meta, BinaryReader(body).tgread_object() if body else None)
+
+
+class RecordingClient:
+    """Telethon client proxy that records calls and incoming updates.
+
+    Calls not used on the booking path are forwarded unrecorded.
+    """
+
+    def __init__(self, client, recorder: SessionRecorder):
+        """Wrap a client.
+
+        Args:
+            client: Telethon client (or a compatible stand-in)
+            recorder: Recorder to write to
+        """
+        self._client = client
+        self.recorder = recorder
+
+        if hasattr(client, "add_event_handler"):
+            client.add_event_handler(self._on_update, events.Raw)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def unwrap(self):
+        """Stop recording updates and return the wrapped client."""
+        if hasattr(self._client, "remove_event_handler"):
+            self._client.remove_event_handler(self._on_update, events.Raw)
+
+        return self._client
+
+    async def _on_update(self, update) -> None:
+        """Record a raw update."""
+        self.recorder.update(update)
+
+    async def _recorded(self, method: str, args: dict, coro, request=None):
+        """Await a call, recording it and its outcome."""
+        call_id = self.recorder.call(method, args, request)
+
+        try:
+            result = await coro
+        except Exception as e:
+            self.recorder.error(call_id, e)
+            raise
+
+        self.recorder.result(call_id, result)
+        return result
+
+    async def get_messages(self, entity, limit: int = 1, min_id: int = 0, **kwargs):
+        args = {"entity": str(entity), "limit": limit, "min_id": min_id, **kwargs}
+        return await self._recorded(
+            "get_messages", args,
+            self._client.get_messages(entity, limit=limit, min_id=min_id, **kwargs)
+        )
+
+    async def send_message(self, entity, message, **kwargs):
+        if entity == "me":
+            return await self._client.send_message(entity, message, **kwargs)
+
+        return await self._recorded(
+            "send", {"entity": str(entity), "message": message},
+            self._client.send_message(entity, message, **kwargs)
+        )
+
+    async def get_entity(self, entity):
+        return await self._recorded("resolve", {"entity": str(entity)}, self._client.get_entity(entity))
+
+    async def get_input_entity(self, entity):
+        return await self._recorded(
+            "resolve", {"entity": str(entity)}, self._client.get_input_entity(entity)
+        )
+
+    async def __call__(self, request, ordered: bool = False):
+        return await self._recorded(
+            "invoke", {"request": type(request).__name__}, self._client(request), request
+        )
@@ -0,0 +1,214 @@
+"""Lightweight span tracing with Chrome Trace Event export.
+
+Spans are recorded with ``time.perf_counter_ns`` into the tracer active in
+the current context. Without an active tracer ``span`` returns a shared
+no-op object, so instrumented code costs a context variable lookup.
+
+Usage:
+    tracer = Tracer("booking_attempt")
+    token = tracer.activate()
+    with span("get_messages", limit=1):
+        ...
+    tracer.deactivate(token)
+    tracer.export("traces/attempt.json")  # open in ui.perfetto.dev
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("booking_tracer", default=None)
+
+
+class _Span:
+    """Context manager recording one complete span."""
+
+    __slots__ = ("tracer", "name", "args", "start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Optional[dict]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end_ns = time.perf_counter_ns()
+        args = self.args
+
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+
+        self.tracer.complete(self.name, self.start_ns, end_ns, args)
+        return False
+
+    def set(self, **args) -> None:
+        """Attach arguments known only inside the span."""
+        self.args = dict(self.args or {}, **args)
+
+
+class _NullSpan:
+    """No-op span used when tracing is inactive."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans of one booking attempt."""
+
+    def __init__(self, name: str = "booking_attempt"):
+        """Initialize tracer.
+
+        Args:
+            name: Process name shown in the trace viewer
+        """
+        self.name = name
+        self.origin_ns = time.perf_counter_ns()
+        self.events: List[tuple] = []
+        self._tracks: Dict[int, tuple] = {}
+
+    def activate(self):
+        """Make this tracer current for the running context.
+
+        Tasks created afterwards inherit it.
+
+        Returns:
+            Token for ``deactivate``
+        """
+        return _current_tracer.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        """Restore the tracer that was current before ``activate``."""
+        _current_tracer.reset(token)
+
+    def _track(self) -> int:
+        """Get the track (Chrome ``tid``) of the current asyncio task."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        key = id(task)
+        track = self._tracks.get(key)
+
+        if track is None:
+            name = task.get_name() if task is not None else "main"
+            track = (len(self._tracks) + 1, name)
+            self._tracks[key] = track
+
+        return track[0]
+
+    def complete(self, name: str, start_ns: int, end_ns: int, args: Optional[dict] = None) -> None:
+        """Record a finished span.
+
+        Args:
+            name: Span name
+            start_ns: Start timestamp from ``time.perf_counter_ns``
+            end_ns: End timestamp from ``time.perf_counter_ns``
+            args: Span arguments
+        """
+        self.events.append(("X", name, start_ns, end_ns - start_ns, self._track(), args))
+
+    def instant(self, name: str, **args) -> None:
+        """Record a point-in-time event.
+
+        Args:
+            name: Event name
+            **args: Event arguments
+        """
+        self.events.append(("i", name, time.perf_counter_ns(), 0, self._track(), args or None))
+
+    def to_chrome_trace(self) -> dict:
+        """Convert recorded spans to the Chrome Trace Event format.
+
+        Returns:
+            Trace dictionary with ``traceEvents``
+        """
+        pid = os.getpid()
+        trace_events = [
+            {"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": self.name}}
+        ]
+
+        for tid, task_name in self._tracks.values():
+            trace_events.append(
+                {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": task_name}}
+            )
+
+        for phase, name, start_ns, duration_ns, tid, args in self.events:
+            event = {
+                "ph": phase,
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ts": (start_ns - self.origin_ns) / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if phase == "X":
+                event["dur"] = duration_ns / 1000
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> str:
+        """Write the trace as a Chrome Trace / Perfetto JSON file.
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Path of the written file
+        """
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=repr)
+
+        return str(output)
+
+
+def current_tracer() -> Optional[Tracer]:
+    """Get the tracer active in the current context."""
+    return _current_tracer.get()
+
+
+def span(name: str, **args):
+    """Open a span in the active tracer.
+
+    Args:
+        name: Span name; the part before the first dot is the category
+        **args: Span arguments
+
+    Returns:
+        Context manager recording the span (no-op without a tracer)
+    """
+    tracer = _current_tracer.get()
+
+    if tracer is None:
+        return NULL_SPAN
+
+    return _Span(tracer, name, args or None)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Microbenchmark: per-pattern keyboard scans vs precompiled ButtonMatcher.
+
+Usage:
+    python benchmarks/bench_button_matcher.py
+"""
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telethon.tl.types import (
+    KeyboardButtonCallback,
+    KeyboardButtonRow,
+    Message,
+    ReplyInlineMarkup,
+)
+
+from auto_booking.core.button_matcher import ButtonMatcher
+
+CITIES = [
+    "Москва", "Санкт-Петербург", "Казань", "Краснодар", "Челябинск",
+    "Екатеринбург", "Новосибирск", "Омск", "Самара", "Уфа", "Пермь",
+    "Воронеж", "Волгоград", "Тюмень", "Иркутск", "Хабаровск",
+]
+
+TARGETS = ["Челябинск", "Екатеринбург", "Москва", "Казань"]
+
+
+def build_keyboard(size: int, present_targets: list, seed: int = 42) -> Message:
+    """Build a shipment menu with ``size`` buttons.
+
+    Target cities only appear in the last rows, which is the worst case
+    for a per-pattern scan.
+    """
+    rng = random.Random(seed)
+    others = [city for city in CITIES if city not in TARGETS]
+    rows = []
+
+    for index in range(size):
+        city = (
+            present_targets[index % len(present_targets)]
+            if index >= size - len(present_targets) else rng.choice(others)
+        )
+        text = f"{city}_{rng.randint(1, 20)}"
+        if rng.random() < 0.3:
+            text += " ❌"
+        rows.append(KeyboardButtonRow([
+            KeyboardButtonCallback(text, f"shipment:{index}".encode())
+        ]))
+
+    rows.append(KeyboardButtonRow([
+        KeyboardButtonCallback("◀️ Назад в меню", b"back_to_menu")
+    ]))
+
+    return Message(id=1, message="menu", reply_markup=ReplyInlineMarkup(rows))
+
+
+def legacy_select(message: Message, patterns: list):
+    """Selection as done before ButtonMatcher: one full scan per pattern."""
+    for pattern in patterns:
+        for row in message.reply_markup.rows:
+            for button in row.buttons:
+                if hasattr(button, 'text'):
+                    if pattern.lower() in button.text.lower():
+                        if hasattr(button, 'data'):
+                            return (button.text, button.data)
+    return None
+
+
+def main():
+    print("=" * 60)
+    print("BUTTON MATCHER MICROBENCHMARK")
+    print("=" * 60)
+
+    matcher = ButtonMatcher(TARGETS)
+    scenarios = [
+        ("all targets present", TARGETS),
+        ("only lowest priority present", TARGETS[-1:]),
+        ("no target present", []),
+    ]
+
+    for title, present in scenarios:
+        print(f"\n{title}:")
+        print(f"{'buttons':>8} | {'legacy µs':>10} | {'matcher µs':>10} | {'speedup':>7}")
+        print("-" * 60)
+
+        for size in (50, 200, 500, 1000):
+            message = build_keyboard(size, present)
+            assert legacy_select(message, TARGETS) == matcher.best_button(message)
+
+            number = max(20, 20000 // size)
+            legacy = min(timeit.repeat(
+                lambda: legacy_select(message, TARGETS), number=number, repeat=5
+            )) / number * 1e6
+            compiled = min(timeit.repeat(
+                lambda: matcher.best_button(message), number=number, repeat=5
+            )) / number * 1e6
+
+            print(f"{size:>8} | {legacy:>10.1f} | {compiled:>10.1f} | {legacy / compiled:>6.1f}x")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
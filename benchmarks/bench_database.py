@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark: database operations of the bot per backend.
+
+Concurrent users run the queries behind one booking flow — ``add_user`` and
+``add_log`` on /start, the shipment list, a shipment card and a booking —
+against every configured backend:
+
+* SQLite on a temporary file (on tmpfs with ``--tmpfs``);
+* PostgreSQL at DATABASE_TEST_URL when set and asyncpg is installed. Its
+  tables are dropped first, so point it at a scratch database.
+
+Usage:
+    python benchmarks/bench_database.py [--users 200] [--pool-size 10] [--tmpfs]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_backends import DatabaseBackend, PostgresBackend, SQLiteBackend
+
+OPERATIONS = ("add_user", "add_log", "get_shipments", "get_shipment", "book_shipment")
+
+
+async def user_flow(backend: DatabaseBackend, user_id: int, shipment_ids: list, samples: dict) -> None:
+    async def timed(name, coro):
+        start = time.perf_counter()
+        result = await coro
+        samples[name].append((time.perf_counter() - start) * 1000)
+        return result
+
+    shipment_id = shipment_ids[user_id % len(shipment_ids)]
+    await timed("add_user", backend.add_user(user_id, f"user{user_id}", f"User{user_id}"))
+    await timed("add_log", backend.add_log(user_id, "start", 1.0))
+    await timed("get_shipments", backend.get_shipments("direct"))
+    await timed("get_shipment", backend.get_shipment(shipment_id))
+    await timed("book_shipment", backend.book_shipment(shipment_id, user_id))
+
+
+async def measure(backend: DatabaseBackend, users: int) -> dict:
+    await backend.init_db()
+    await backend.initialize_default_shipments()
+    await backend.reset_bookings()
+    shipment_ids = [s["id"] for s in await backend.get_shipments("direct")]
+
+    samples = defaultdict(list)
+    start = time.perf_counter()
+    await asyncio.gather(*(user_flow(backend, user_id, shipment_ids, samples) for user_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - start
+
+    booked = (await backend.get_stats())["bookings_count"]
+    assert booked == len(shipment_ids), f"{booked} bookings for {len(shipment_ids)} shipments"
+
+    return {
+        "flows_per_s": users / elapsed,
+        "p50": {name: statistics.median(samples[name]) for name in OPERATIONS},
+        "p99": {name: sorted(samples[name])[int(len(samples[name]) * 0.99)] for name in OPERATIONS},
+    }
+
+
+async def run_backend(backend: DatabaseBackend, users: int) -> dict:
+    try:
+        if isinstance(backend, PostgresBackend):
+            await (await backend.pool()).execute("DROP TABLE IF EXISTS logs, test_sessions, shipments, users")
+        return await measure(backend, users)
+    finally:
+        await backend.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200, help="Concurrent users")
+    parser.add_argument("--pool-size", type=int, default=10, help="Connections of server backends")
+    parser.add_argument("--tmpfs", action="store_true", help="Put the SQLite file on /dev/shm")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if args.tmpfs else None) as tmp:
+        results["sqlite"] = asyncio.run(run_backend(SQLiteBackend(os.path.join(tmp, "bench.db")), args.users))
+
+    url = os.getenv("DATABASE_TEST_URL")
+    if url:
+        backend = PostgresBackend(url, min_size=min(2, args.pool_size), max_size=args.pool_size)
+        results["postgresql"] = asyncio.run(run_backend(backend, args.users))
+    else:
+        print("PostgreSQL skipped: DATABASE_TEST_URL is not set")
+
+    print("=" * 72)
+    print(f"DATABASE BACKEND BENCHMARK ({args.users} concurrent users)")
+    print("=" * 72)
+    for label, result in results.items():
+        print(f"{label}: {result['flows_per_s']:.1f} flows/s")
+        print(f"  {'operation':<16} | {'p50 ms':>8} | {'p99 ms':>8}")
+        for name in OPERATIONS:
+            print(f"  {name:<16} | {result['p50'][name]:>8.2f} | {result['p99'][name]:>8.2f}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
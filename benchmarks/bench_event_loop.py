@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark: asyncio vs uvloop event loop for the bot and the client.
+
+For every loop implementation installed here it measures
+
+* bot update throughput: concurrent users send /start and open a shipment
+  list, fed through ``BotHarness`` (real handlers and database, Bot API
+  answered in-process);
+* client per-stage booking latency: ``run_offline_booking`` against
+  ``FakeTelegramClient`` with a zero-latency network.
+
+Each loop runs in its own ``asyncio.run`` after ``install_event_loop``, the
+same way ``bot.py --loop`` and ``main.py --loop`` start.
+
+Usage:
+    python benchmarks/bench_event_loop.py [--users 200] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot_harness import BotHarness
+from event_loop import available_event_loops, install_event_loop
+
+from auto_booking.testing import FakeTelegramClient, NetworkProfile, run_offline_booking
+from auto_booking.utils.logger import setup_logging
+
+SHIPMENTS = [("Москва", 1), ("Казань", 1), ("Пермь", 2), ("Самара", 1)]
+STAGES = ("sms_to_start_ms", "start_to_select_ms", "select_to_confirm_ms")
+
+
+async def bot_throughput(users: int) -> dict:
+    """Feed /start and a shipment list request for every user concurrently."""
+    harness = BotHarness()
+    await harness.start()
+
+    async def session(user_id: int) -> None:
+        await harness.send(user_id, "/start")
+        await harness.press(user_id, "direct_shipments")
+
+    try:
+        await asyncio.gather(*(session(user_id) for user_id in range(1, 21)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(user_id) for user_id in range(1000, 1000 + users)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await harness.close()
+
+    return {"updates_per_s": users * 2 / elapsed, "elapsed_ms": elapsed * 1000}
+
+
+async def client_stages(rounds: int) -> dict:
+    """Median per-stage latency of offline booking runs."""
+    samples = {stage: [] for stage in STAGES}
+    samples["total_time_ms"] = []
+
+    for _ in range(rounds):
+        fake = FakeTelegramClient(
+            SHIPMENTS, network=NetworkProfile(latency_ms=0), bot_processing_ms=0
+        )
+        stats = await run_offline_booking(
+            fake, ["Пермь"], sms_delay_ms=0, polling_interval_ms=1, fast_path=True
+        )
+        if not stats["success"]:
+            raise RuntimeError(f"Offline booking failed: {stats['error']}")
+
+        for stage in STAGES:
+            samples[stage].append(stats["stages"][stage])
+        samples["total_time_ms"].append(stats["total_time_ms"])
+
+    return {stage: statistics.median(values) for stage, values in samples.items()}
+
+
+async def run(users: int, rounds: int) -> dict:
+    return {
+        "bot": await bot_throughput(users),
+        "client": await client_stages(rounds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200, help="Concurrent bot users")
+    parser.add_argument("--rounds", type=int, default=20, help="Offline booking runs")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    setup_logging(log_level="WARNING")
+
+    loops = available_event_loops()
+    results = {}
+    for preference in loops:
+        install_event_loop(preference)
+        results[preference] = asyncio.run(run(args.users, args.rounds))
+
+    print("=" * 72)
+    print(f"EVENT LOOP BENCHMARK ({args.users} bot users, {args.rounds} booking runs)")
+    print("=" * 72)
+    print(f"{'metric':<24} | " + " | ".join(f"{loop:>12}" for loop in loops))
+    print("-" * 72)
+    print(
+        f"{'bot updates/s':<24} | "
+        + " | ".join(f"{results[loop]['bot']['updates_per_s']:>12.0f}" for loop in loops)
+    )
+    for stage in STAGES + ("total_time_ms",):
+        print(
+            f"{stage:<24} | "
+            + " | ".join(f"{results[loop]['client'][stage]:>12.2f}" for loop in loops)
+        )
+    print("-" * 72)
+    if "uvloop" not in loops:
+        print("uvloop is not installed; only the asyncio loop was measured")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
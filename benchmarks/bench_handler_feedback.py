@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark: time to first feedback of every callback handler.
+
+Each callback is fed through ``BotHarness`` with every Bot API request
+delayed by ``--api-latency`` milliseconds. For every handler it reports the
+median time until
+
+* ``answer``: answerCallbackQuery reached Telegram, i.e. the button spinner
+  stopped;
+* ``first``: the first request of any kind reached Telegram;
+* ``done``: the handler returned.
+
+Usage:
+    python benchmarks/bench_handler_feedback.py [--rounds 20] [--api-latency 30]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot_harness import BotHarness
+
+# Handlers and the callback that leads to each one; test_mode sleeps a second
+CALLBACKS = (
+    "back_to_menu",
+    "direct_shipments",
+    "main_shipments",
+    "my_shipments",
+    "settings",
+    "shipment:{shipment}",
+    "confirm:{shipment}",
+    "test_mode",
+)
+
+
+async def measure(rounds: int, api_latency_ms: float, db_dir: str) -> dict:
+    harness = BotHarness(db_path=os.path.join(db_dir, "bench.db"), api_latency_ms=api_latency_ms)
+    await harness.start()
+
+    samples = {data: {"answer": [], "first": [], "done": []} for data in CALLBACKS}
+    try:
+        for round_index in range(rounds):
+            user_id = 1000 + round_index
+            await harness.send(user_id, "/start")
+            for data in CALLBACKS:
+                if data == "test_mode" and round_index >= 2:
+                    continue
+                callback = data.format(shipment=round_index % 5 + 1)
+                calls_before = len(harness.session.calls)
+
+                start = time.perf_counter()
+                await harness.press(user_id, callback)
+                done = time.perf_counter()
+
+                calls = harness.session.calls[calls_before:]
+                answers = [call.at for call in calls if call.method == "AnswerCallbackQuery"]
+                result = samples[data]
+                result["answer"].append((min(answers) - start) * 1000)
+                result["first"].append((min(call.at for call in calls) - start) * 1000)
+                result["done"].append((done - start) * 1000)
+    finally:
+        await harness.close()
+
+    return {
+        data: {key: statistics.median(values) for key, values in result.items()}
+        for data, result in samples.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Presses of every callback")
+    parser.add_argument("--api-latency", type=float, default=30.0, help="Bot API round trip in ms")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    db_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=db_root) as db_dir:
+        results = asyncio.run(measure(args.rounds, args.api_latency, db_dir))
+
+    print("=" * 64)
+    print(f"CALLBACK FEEDBACK BENCHMARK (API latency {args.api_latency:.0f}ms, medians)")
+    print("=" * 64)
+    print(f"{'callback':<20} | {'answer ms':>10} | {'first ms':>10} | {'done ms':>10}")
+    print("-" * 64)
+    for data, result in results.items():
+        print(f"{data:<20} | {result['answer']:>10.1f} | {result['first']:>10.1f} | {result['done']:>10.1f}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark: client-side CPU time per stage with and without request templates.
+
+The Telegram transport is replaced by an in-process ``_call`` that resolves
+and serializes the request exactly like Telethon's sender would, and returns
+a canned result. Only client-side work is measured (thread CPU time); network
+latency and MTProto encryption are the same for both paths.
+
+Usage:
+    python benchmarks/bench_request_templates.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telethon import TelegramClient, utils
+from telethon.sessions import MemorySession
+from telethon.tl import types
+from telethon.tl.functions.contacts import ResolveUsernameRequest
+from telethon.tl.functions.messages import SendMessageRequest
+
+from auto_booking.core.button_clicker import ButtonClicker
+from auto_booking.core.client import BookingClient
+
+BOT_ID = 777000
+BOT_USERNAME = "booking_test_bot"
+ITERATIONS = 2000
+
+
+class OfflineTelegramClient(TelegramClient):
+    """TelegramClient whose transport is an in-process canned responder."""
+
+    def __init__(self):
+        super().__init__(MemorySession(), api_id=1, api_hash="0" * 32)
+        self._next_id = 1
+        self.rpc_calls = 0
+        bot = types.User(
+            id=BOT_ID, access_hash=1234567890, bot=True, username=BOT_USERNAME
+        )
+        self._resolved = types.contacts.ResolvedPeer(
+            peer=types.PeerUser(BOT_ID), chats=[], users=[bot]
+        )
+        self.session.process_entities(self._resolved)
+
+    async def _call(self, sender, request, ordered=False, flood_sleep_threshold=None):
+        await request.resolve(self, utils)
+        bytes(request)  # serialization done by the sender loop
+        self.rpc_calls += 1
+
+        if isinstance(request, ResolveUsernameRequest):
+            return self._resolved
+
+        if isinstance(request, SendMessageRequest):
+            self._next_id += 1
+            return types.UpdateShortSentMessage(
+                id=self._next_id, pts=1, pts_count=1, date=datetime.now(), out=True
+            )
+
+        return types.messages.BotCallbackAnswer(cache_time=0)
+
+    def is_connected(self):
+        return True
+
+
+async def measure(telegram: OfflineTelegramClient, coro_factory) -> tuple:
+    """Median thread CPU time of a coroutine and RPCs it issued per call."""
+    samples = []
+    calls_before = telegram.rpc_calls
+
+    for _ in range(ITERATIONS):
+        start = time.thread_time_ns()
+        await coro_factory()
+        samples.append((time.thread_time_ns() - start) / 1000)
+
+    return statistics.median(samples), (telegram.rpc_calls - calls_before) / ITERATIONS
+
+
+async def run() -> None:
+    telegram = OfflineTelegramClient()
+    client = BookingClient(api_id=1, api_hash="0" * 32, phone="")
+    client.client = telegram
+    clicker = ButtonClicker(telegram, BOT_USERNAME)
+
+    stages = {
+        "send /start": lambda: client.send_message(BOT_USERNAME, "/start"),
+        "callback click": lambda: clicker.click_by_id(42, b"shipment:1", "bench"),
+    }
+
+    baseline = {stage: await measure(telegram, factory) for stage, factory in stages.items()}
+
+    templates = await client.prepare_fast_path(BOT_USERNAME, pool_size=ITERATIONS)
+    clicker.templates = templates
+
+    fast = {stage: await measure(telegram, factory) for stage, factory in stages.items()}
+
+    print("=" * 72)
+    print("REQUEST TEMPLATES BENCHMARK (client CPU per call, median)")
+    print("=" * 72)
+    print(
+        f"{'stage':<16} | {'high-level µs':>13} | {'templates µs':>12} | "
+        f"{'speedup':>7} | {'RPCs/call':>9}"
+    )
+    print("-" * 72)
+
+    for stage in stages:
+        (base_us, base_rpcs), (fast_us, fast_rpcs) = baseline[stage], fast[stage]
+        print(
+            f"{stage:<16} | {base_us:>13.1f} | {fast_us:>12.1f} | "
+            f"{base_us / fast_us:>6.1f}x | {base_rpcs:>3.0f} -> {fast_rpcs:<3.0f}"
+        )
+
+    print("-" * 72)
+    print(f"Template pool misses: {templates.misses}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
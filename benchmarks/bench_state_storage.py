@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark: per-update overhead of Redis state storage vs MemoryStorage.
+
+Users go through /start, the shipment list, a shipment card and a booking
+confirmation, fed one update at a time through ``BotHarness``. The Redis
+variant runs against ``FakeRedis`` with no network delay, which isolates the
+client-side cost of the Redis storage and counts its round trips; the cost of
+a real server is projected from the round trips for a few typical RTTs
+(timer-based simulation is too coarse below a millisecond). The database is
+placed on tmpfs when available to keep SQLite commits from hiding the
+difference.
+
+Usage:
+    python benchmarks/bench_state_storage.py [--users 100]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot_harness import BotHarness, FakeRedis
+
+# Round-trip times used for the projection: same host, same rack, remote
+PROJECTED_RTT_MS = (0.1, 0.5, 1.0)
+
+
+async def measure(users: int, use_redis: bool, db_dir: str) -> dict:
+    redis = FakeRedis() if use_redis else None
+    harness = BotHarness(db_path=os.path.join(db_dir, f"bench-{time.monotonic_ns()}.db"), redis=redis)
+    await harness.start()
+
+    samples = []
+    try:
+        for user_id in range(1, users + 1):
+            shipment = f"{user_id % 5 + 1}"
+            updates = [
+                harness.message_update(user_id, "/start"),
+                harness.callback_update(user_id, "direct_shipments"),
+                harness.callback_update(user_id, f"shipment:{shipment}"),
+                harness.callback_update(user_id, f"confirm:{shipment}"),
+            ]
+            for update in updates:
+                start = time.perf_counter()
+                await harness.feed(update)
+                samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await harness.close()
+
+    return {
+        "p50_ms": statistics.median(samples),
+        "p99_ms": sorted(samples)[int(len(samples) * 0.99)],
+        "round_trips": redis.round_trips / len(samples) if redis else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100, help="Users going through the flow")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    db_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+    with tempfile.TemporaryDirectory(dir=db_root) as db_dir:
+        results = {
+            "memory": asyncio.run(measure(args.users, False, db_dir)),
+            "redis": asyncio.run(measure(args.users, True, db_dir)),
+        }
+
+    baseline = results["memory"]["p50_ms"]
+    redis = results["redis"]
+
+    print("=" * 72)
+    print(f"STATE STORAGE BENCHMARK ({args.users} users, {args.users * 4} updates)")
+    print("=" * 72)
+    print(f"{'storage':<14} | {'p50 ms':>8} | {'p99 ms':>8} | {'overhead ms':>11} | {'round trips/update':>18}")
+    print("-" * 72)
+    for label, result in results.items():
+        print(
+            f"{label:<14} | {result['p50_ms']:>8.3f} | {result['p99_ms']:>8.3f} | "
+            f"{result['p50_ms'] - baseline:>11.3f} | {result['round_trips']:>18.2f}"
+        )
+    print("-" * 72)
+    for rtt_ms in PROJECTED_RTT_MS:
+        overhead = redis["p50_ms"] - baseline + redis["round_trips"] * rtt_ms
+        print(f"Projected Redis overhead at {rtt_ms}ms RTT: {overhead:.3f} ms/update")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
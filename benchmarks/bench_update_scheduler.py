@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Benchmark: confirm latency under a /start storm, with and without the update scheduler.
+
+A fake Telegram update stream receives a /start from every storm user at a
+fixed rate, with ``confirm:`` presses of other users mixed in. A poller takes
+up to 100 pending updates per getUpdates, like long polling does, and either
+
+* ``direct``: starts a task per update, as ``dp.start_polling`` does;
+* ``scheduled``: submits them to ``UpdateScheduler`` (waiting when its
+  normal queue is full).
+
+Latency is measured from the moment an update reaches the stream, so time
+spent waiting at Telegram under backpressure counts too: for confirms until
+the booking result is sent and until the handler (including its log write)
+finishes, for /start until it is handled. Handlers run through
+``BotHarness`` with the database on tmpfs when available.
+
+Usage:
+    python benchmarks/bench_update_scheduler.py [--storm 600] [--confirms 40] [--rate 1000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot_harness import BotHarness, bot_module
+from update_scheduler import CRITICAL, UpdateScheduler, classify
+
+BATCH_SIZE = 100
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure(args, scheduled: bool, db_dir: str) -> dict:
+    update_scheduler = UpdateScheduler(
+        bot_module.dp,
+        bot_module.bot,
+        critical_workers=args.critical_workers,
+        normal_workers=args.normal_workers,
+        queue_size=args.queue_size
+    ) if scheduled else None
+    harness = BotHarness(db_path=os.path.join(db_dir, f"bench-{time.monotonic_ns()}.db"),
+                         update_scheduler=update_scheduler)
+    await harness.start()
+
+    shipment_ids = [s['id'] for s in await bot_module.get_shipments('direct')]
+    confirm_every = max(1, args.storm // args.confirms)
+    stream = []
+    for i in range(args.storm):
+        stream.append(harness.message_update(10_000 + i, "/start"))
+        if i % confirm_every == 0:
+            user_id = 1 + i // confirm_every
+            stream.append(harness.callback_update(user_id, f"confirm:{shipment_ids[user_id % len(shipment_ids)]}"))
+
+    arrived = {}
+    latencies = {CRITICAL: [], 'normal': []}
+    pending: list = []
+    new_updates = asyncio.Event()
+    tasks = set()
+
+    async def telegram():
+        for update in stream:
+            arrived[update.update_id] = time.perf_counter()
+            pending.append(update)
+            new_updates.set()
+            await asyncio.sleep(1 / args.rate)
+
+    def record(update):
+        lane = classify(update)
+        latencies[lane if lane == CRITICAL else 'normal'].append(
+            (time.perf_counter() - arrived[update.update_id]) * 1000
+        )
+
+    async def handle_direct(update):
+        await harness.dispatcher.feed_update(harness.bot, update)
+        record(update)
+
+    async def poller():
+        fetched = 0
+        while fetched < len(stream):
+            if not pending:
+                new_updates.clear()
+                await new_updates.wait()
+            batch = pending[:BATCH_SIZE]
+            del pending[:BATCH_SIZE]
+            fetched += len(batch)
+            for update in batch:
+                if update_scheduler is None:
+                    task = asyncio.create_task(handle_direct(update))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    future = await update_scheduler.submit(update)
+                    future.add_done_callback(lambda _, update=update: record(update))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(telegram(), poller())
+        while tasks:
+            await asyncio.gather(*tasks)
+        if update_scheduler is not None:
+            await update_scheduler.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        await harness.close()
+
+    # What the user sees: the edited message with the booking result
+    replies = []
+    for update in stream:
+        if classify(update) == CRITICAL:
+            user_id = update.callback_query.from_user.id
+            replies.append((harness.session.sent_to(user_id)[0].at - arrived[update.update_id]) * 1000)
+
+    return {
+        "reply_p50": statistics.median(replies),
+        "reply_p99": percentile(replies, 0.99),
+        "confirm_p99": percentile(latencies[CRITICAL], 0.99),
+        "start_p50": statistics.median(latencies['normal']),
+        "start_p99": percentile(latencies['normal'], 0.99),
+        "updates_per_s": len(stream) / elapsed,
+        "backpressure": update_scheduler.backpressure_waits if update_scheduler else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--storm", type=int, default=600, help="/start updates in the storm")
+    parser.add_argument("--confirms", type=int, default=40, help="confirm: presses mixed into the storm")
+    parser.add_argument("--rate", type=float, default=1000, help="Updates per second reaching Telegram")
+    parser.add_argument("--critical-workers", type=int, default=16)
+    parser.add_argument("--normal-workers", type=int, default=32)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    db_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+    with tempfile.TemporaryDirectory(dir=db_root) as db_dir:
+        results = {
+            "direct": asyncio.run(measure(args, False, db_dir)),
+            "scheduled": asyncio.run(measure(args, True, db_dir)),
+        }
+
+    print("=" * 92)
+    print(f"UPDATE SCHEDULER BENCHMARK ({args.storm} /start + {args.confirms} confirm at {args.rate:.0f}/s)")
+    print("=" * 92)
+    print(f"{'mode':<10} | {'reply p50':>9} | {'reply p99':>9} | {'confirm p99':>11} | {'/start p50':>10} | "
+          f"{'/start p99':>10} | {'updates/s':>9} | {'waits':>5}")
+    print("-" * 92)
+    for label, result in results.items():
+        print(
+            f"{label:<10} | {result['reply_p50']:>7.1f}ms | {result['reply_p99']:>7.1f}ms | "
+            f"{result['confirm_p99']:>9.1f}ms | {result['start_p50']:>8.1f}ms | {result['start_p99']:>8.1f}ms | "
+            f"{result['updates_per_s']:>9.1f} | {result['backpressure']:>5}"
+        )
+    print("=" * 92)
+
+
+if __name__ == "__main__":
+    main()
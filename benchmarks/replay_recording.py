@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Replay a recorded booking window and report per-stage latency.
+
+Without a recording path, a window is first recorded against the offline
+fake Telegram. Stage times are scaled back to recording time; fixed
+delays inside BotHandler are not accelerated, so at speeds above 1x they
+are overstated.
+
+Usage:
+    python benchmarks/replay_recording.py [recording.rec] --bot BOT --targets Челябинск Москва
+    python benchmarks/replay_recording.py --speed 4 --runs 10 --fast-path
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from auto_booking.testing import (
+    FakeTelegramClient,
+    NetworkProfile,
+    create_offline_client,
+    replay_booking,
+    run_offline_booking,
+)
+from auto_booking.utils.logger import setup_logging
+
+STAGES = ("sms_to_start_ms", "start_to_select_ms", "select_to_confirm_ms", "total_time_ms")
+
+
+async def record_sample(path: str, targets: list) -> str:
+    """Record a booking window against the fake Telegram.
+
+    Returns:
+        Bot username used in the recording
+    """
+    fake = FakeTelegramClient(
+        [("Омск", 5), ("Москва", 10), ("Челябинск", 3)],
+        network=NetworkProfile(latency_ms=20, jitter_ms=5),
+        seed=1
+    )
+    client = create_offline_client(fake)
+    client.start_recording(path)
+    await run_offline_booking(fake, targets, client=client)
+    client.stop_recording()
+
+    return fake.bot_username
+
+
+async def run(args) -> None:
+    bot_username = args.bot
+
+    if args.recording is None:
+        args.recording = str(Path(tempfile.mkdtemp()) / "sample.rec")
+        bot_username = await record_sample(args.recording, args.targets)
+
+    samples = {stage: [] for stage in STAGES}
+    failures = 0
+
+    for _ in range(args.runs):
+        stats = await replay_booking(
+            args.recording,
+            args.targets,
+            bot_username,
+            speed=args.speed,
+            speculative_mode=args.speculative,
+            fast_path=args.fast_path
+        )
+
+        if not stats["success"]:
+            failures += 1
+            continue
+
+        for stage in STAGES:
+            value = stats["stages"].get(stage, stats.get(stage))
+            if value is not None:
+                samples[stage].append(value * args.speed)
+
+    print("=" * 60)
+    print(f"REPLAY: {args.recording}")
+    print(f"speed={args.speed}x runs={args.runs} failures={failures}")
+    print("(times scaled back to recording time)")
+    print("=" * 60)
+
+    for stage, values in samples.items():
+        if values:
+            print(
+                f"{stage:<22} median {statistics.median(values):>8.2f}ms  "
+                f"min {min(values):>8.2f}ms  max {max(values):>8.2f}ms"
+            )
+
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded booking window")
+    parser.add_argument("recording", nargs="?", help="Recording file (default: record a sample)")
+    parser.add_argument("--bot", default="booking_test_bot", help="Bot username in the recording")
+    parser.add_argument("--targets", nargs="+", default=["Челябинск", "Москва"])
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--fast-path", action="store_true")
+
+    args = parser.parse_args()
+    setup_logging(log_level="WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""In-memory booking engine with a write-ahead journal.
+
+Shipment ownership is decided in memory, so the winner of a ``confirm:``
+burst is known without touching the database. Every decision is appended to a
+journal which a single writer task flushes and fsyncs in groups; callers are
+answered once their record is durable. ``snapshot`` copies the state into
+the ``shipments`` table and truncates the journal, and ``start`` replays
+whatever the journal still holds after a crash.
+
+A failed journal write (e.g. a full disk) fails the callers waiting on that
+batch with the error; the batch stays pending and the writer retries it
+every ``retry_delay`` seconds, so a caller who asks again is answered once
+the decision is durable.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import database
+from db_backends.base import BOOKED_MESSAGE, NOT_FOUND_MESSAGE, TAKEN_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+
+class BookingEngine:
+    def __init__(self, journal_path: str = 'bookings.journal', group_commit_ms: float = 0.0,
+                 retry_delay: float = 1.0):
+        self.journal_path = journal_path
+        self.group_commit_ms = group_commit_ms
+        self.retry_delay = retry_delay
+
+        # shipment_id -> (booked_by, booked_at, seq of the deciding record)
+        self.owners: Dict[int, Tuple[Optional[int], Optional[str], int]] = {}
+        self.known = set()
+        self.dirty = set()
+
+        self.seq = 0
+        self.durable_seq = 0
+        self.commits = 0
+        self.recovered = 0
+        self.write_errors = 0
+
+        self._pending: List[str] = []
+        self._write_error: Optional[Exception] = None
+        self._torn_tail = False
+        self._wakeup = asyncio.Event()
+        self._durable = asyncio.Condition()
+        self._io_lock = asyncio.Lock()
+        self._journal = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Load shipments, replay the journal and start the writer."""
+        for shipment_id, is_booked, booked_by, booked_at in await database.get_booking_state():
+            self._load_row(shipment_id, is_booked, booked_by, booked_at)
+
+        self.recovered = self._replay()
+        # Unbuffered, so a failed write leaves nothing behind to be flushed later
+        self._journal = open(self.journal_path, 'ab', buffering=0)
+        self._writer = asyncio.create_task(self._write_loop())
+
+        if self.recovered:
+            logger.warning(f"Recovered {self.recovered} bookings from {self.journal_path}")
+            await self.snapshot()
+
+    async def stop(self):
+        """Flush the journal, snapshot the state and stop the writer."""
+        if self._writer is None:
+            return
+
+        await self.snapshot()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        self._journal.close()
+
+    def _load_row(self, shipment_id, is_booked, booked_by, booked_at):
+        self.known.add(shipment_id)
+        if is_booked:
+            self.owners[shipment_id] = (booked_by, booked_at, 0)
+
+    def _replay(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        replayed = 0
+        with open(self.journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn tail of a write interrupted by the crash
+                    logger.warning(f"Skipping unreadable journal record: {line!r}")
+                    continue
+
+                self.seq = max(self.seq, record['seq'])
+                self._apply(record)
+                replayed += 1
+
+        self.durable_seq = self.seq
+        return replayed
+
+    def _apply(self, record: dict):
+        if record['op'] == 'book':
+            shipment_id = record['shipment']
+            self.known.add(shipment_id)
+            self.owners[shipment_id] = (record['user'], record['at'], record['seq'])
+            self.dirty.add(shipment_id)
+        elif record['op'] == 'reset':
+            self.dirty.update(self.owners)
+            self.owners.clear()
+
+    def _append(self, record: dict) -> int:
+        self.seq += 1
+        record['seq'] = self.seq
+        self._apply(record)
+        self._pending.append(json.dumps(record, ensure_ascii=False) + '\n')
+        self._wakeup.set()
+        return self.seq
+
+    def decide(self, shipment_id: int, user_id: int) -> Tuple[bool, str, int]:
+        """Decide a booking in memory.
+
+        Returns:
+            (success, message, seq of the record the answer depends on)
+        """
+        owner = self.owners.get(shipment_id)
+        if owner is not None:
+            booked_by, _, seq = owner
+            if booked_by == user_id:
+                return True, BOOKED_MESSAGE, seq
+            return False, TAKEN_MESSAGE, seq
+
+        seq = self._append({
+            'op': 'book',
+            'shipment': shipment_id,
+            'user': user_id,
+            'at': datetime.now().isoformat(),
+        })
+        return True, BOOKED_MESSAGE, seq
+
+    async def book(self, shipment_id: int, user_id: int) -> Tuple[bool, str]:
+        """Book a shipment, answering once the deciding record is durable."""
+        if shipment_id not in self.known:
+            shipment = await database.get_shipment(shipment_id)
+            if not shipment:
+                return False, NOT_FOUND_MESSAGE
+            if shipment_id not in self.known:
+                self._load_row(shipment_id, shipment['is_booked'], shipment['booked_by'], shipment['booked_at'])
+
+        success, message, seq = self.decide(shipment_id, user_id)
+        await self.wait_durable(seq)
+        return success, message
+
+    async def reset(self):
+        """Release every booking."""
+        await self.wait_durable(self._append({'op': 'reset'}))
+        await self.snapshot()
+
+    async def wait_durable(self, seq: int):
+        """Wait until the record ``seq`` is on disk.
+
+        Raises:
+            OSError: If the journal write carrying the record failed
+        """
+        if seq <= self.durable_seq:
+            return
+        errors = self.write_errors
+        async with self._durable:
+            await self._durable.wait_for(
+                lambda: self.durable_seq >= seq or self.write_errors != errors
+            )
+        if self.durable_seq < seq:
+            raise self._write_error
+
+    def overlay(self, shipment: Optional[Dict]) -> Optional[Dict]:
+        """Apply the in-memory booking state to a row from the database."""
+        if shipment is None or shipment['id'] not in self.known:
+            return shipment
+
+        owner = self.owners.get(shipment['id'])
+        if owner is None:
+            shipment.update(is_booked=0, booked_by=None, booked_at=None)
+        else:
+            shipment.update(is_booked=1, booked_by=owner[0], booked_at=owner[1])
+        return shipment
+
+    async def refresh(self, shipments: List[Dict]):
+        for shipment in shipments:
+            self.overlay(shipment)
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            if self.group_commit_ms:
+                await asyncio.sleep(self.group_commit_ms / 1000)
+            try:
+                async with self._io_lock:
+                    await self._flush()
+            except Exception as e:
+                logger.error(f"Journal write failed, retrying in {self.retry_delay}s: {e!r}")
+                await asyncio.sleep(self.retry_delay)
+                self._wakeup.set()
+
+    async def _flush(self):
+        self._wakeup.clear()
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        seq = self.seq
+        data = ''.join(batch).encode('utf-8')
+        if self._torn_tail:
+            # Start on a fresh line after a partially written batch
+            data = b'\n' + data
+        try:
+            await asyncio.to_thread(self._write_batch, data)
+        except Exception as e:
+            # Records appended meanwhile go after the failed batch
+            self._pending[:0] = batch
+            self._torn_tail = True
+            async with self._durable:
+                self._write_error = e
+                self.write_errors += 1
+                self._durable.notify_all()
+            raise
+        self._torn_tail = False
+        self.commits += 1
+
+        async with self._durable:
+            self.durable_seq = seq
+            self._durable.notify_all()
+
+    def _write_batch(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[self._journal.write(view):]
+        os.fsync(self._journal.fileno())
+
+    async def snapshot(self):
+        """Write the booking state into the shipments table and truncate the journal."""
+        async with self._io_lock:
+            await self._flush()
+            if not self.dirty:
+                return
+
+            dirty, self.dirty = self.dirty, set()
+            rows = []
+            for shipment_id in dirty:
+                owner = self.owners.get(shipment_id)
+                if owner is None:
+                    rows.append((0, None, None, shipment_id))
+                else:
+                    rows.append((1, owner[0], owner[1], shipment_id))
+
+            try:
+                await database.save_booking_state(rows)
+            except Exception:
+                self.dirty |= dirty
+                raise
+
+            # Decisions made while the snapshot was written are still
+            # pending and go to the fresh journal on the next flush
+            self._journal.truncate(0)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+        logger.info(f"Booking snapshot: {len(rows)} shipments written")
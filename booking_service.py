@@ -0,0 +1,367 @@
+"""Booking service shared by bot worker processes.
+
+A single process owns the ``BookingEngine`` and the FSM state of all users
+and serves them over a Unix socket, so bookings stay serialised while
+handlers run in several worker processes (see ``workers.py``).
+
+Every frame is a 4-byte big-endian length followed by the body. Requests
+are ``op (1 byte) | request id (4 bytes) | payload``, responses are
+``request id (4 bytes) | reply status (1 byte) | payload``; a failed request
+is answered with ``REPLY_ERROR`` and the error message as payload. Integers are fixed-width big-endian,
+strings are a 2-byte length followed by UTF-8 (0xFFFF encodes None) and FSM
+data is a 4-byte length followed by JSON. Requests are pipelined: a client
+may send many before reading the answers, which carry the request id.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+
+from booking_engine import (
+    BOOKED_MESSAGE,
+    NOT_FOUND_MESSAGE,
+    TAKEN_MESSAGE,
+    BookingEngine,
+)
+
+logger = logging.getLogger(__name__)
+
+OP_BOOK = 1
+OP_RESET = 2
+OP_SNAPSHOT = 3
+OP_OWNERS = 4
+OP_GET_STATE = 5
+OP_SET_STATE = 6
+OP_GET_DATA = 7
+OP_SET_DATA = 8
+
+STATUS_BOOKED = 0
+STATUS_TAKEN = 1
+STATUS_NOT_FOUND = 2
+
+MESSAGES = {
+    BOOKED_MESSAGE: STATUS_BOOKED,
+    TAKEN_MESSAGE: STATUS_TAKEN,
+    NOT_FOUND_MESSAGE: STATUS_NOT_FOUND,
+}
+STATUS_MESSAGES = {status: message for message, status in MESSAGES.items()}
+
+REPLY_OK = 0
+REPLY_ERROR = 1
+
+FRAME = struct.Struct('!I')
+REQUEST = struct.Struct('!BI')
+RESPONSE = struct.Struct('!IB')
+BOOK = struct.Struct('!qq')
+STATUS = struct.Struct('!B')
+COUNT = struct.Struct('!H')
+SHIPMENT_ID = struct.Struct('!q')
+OWNER = struct.Struct('!qBq')
+NONE_LENGTH = 0xFFFF
+
+CALL_TIMEOUT_SECONDS = 30
+
+
+class BookingServiceError(Exception):
+    """A request failed inside the booking service."""
+
+
+def pack_str(value: Optional[str]) -> bytes:
+    if value is None:
+        return COUNT.pack(NONE_LENGTH)
+    data = value.encode()
+    return COUNT.pack(len(data)) + data
+
+
+def unpack_str(buffer: bytes, offset: int):
+    (length,) = COUNT.unpack_from(buffer, offset)
+    offset += COUNT.size
+    if length == NONE_LENGTH:
+        return None, offset
+    return buffer[offset:offset + length].decode(), offset + length
+
+
+def pack_key(key: StorageKey) -> bytes:
+    return pack_str(f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}")
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(length)
+
+
+def write_frame(writer: asyncio.StreamWriter, body: bytes):
+    writer.write(FRAME.pack(len(body)) + body)
+
+
+class BookingService:
+    """Serves the booking engine and FSM state over a Unix socket."""
+
+    def __init__(self, socket_path: str, engine: BookingEngine):
+        self.socket_path = socket_path
+        self.engine = engine
+        self.states: Dict[str, str] = {}
+        self.data: Dict[str, bytes] = {}
+        self.requests = 0
+        self._server = None
+        self._tasks = set()
+        self._connections = set()
+
+    async def start(self):
+        await self.engine.start()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.socket_path)
+        logger.info(f"Booking service listening on {self.socket_path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections:
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.engine.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                body = await read_frame(reader)
+                # Bookings wait for the journal; keep reading so one
+                # connection's requests share a group commit
+                task = asyncio.create_task(self._respond(body, writer))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _respond(self, body: bytes, writer: asyncio.StreamWriter):
+        op, request_id = REQUEST.unpack_from(body)
+        try:
+            payload = await self._handle(op, body, REQUEST.size)
+            status = REPLY_OK
+        except Exception as e:
+            logger.error(f"Booking service request {op} failed: {e!r}")
+            payload = pack_str(repr(e))
+            status = REPLY_ERROR
+        self.requests += 1
+        write_frame(writer, RESPONSE.pack(request_id, status) + payload)
+
+    async def _handle(self, op: int, body: bytes, offset: int) -> bytes:
+        if op == OP_BOOK:
+            shipment_id, user_id = BOOK.unpack_from(body, offset)
+            _, message = await self.engine.book(shipment_id, user_id)
+            return STATUS.pack(MESSAGES[message])
+
+        if op == OP_OWNERS:
+            (count,) = COUNT.unpack_from(body, offset)
+            offset += COUNT.size
+            answer = bytearray(COUNT.pack(count))
+            for _ in range(count):
+                (shipment_id,) = SHIPMENT_ID.unpack_from(body, offset)
+                offset += SHIPMENT_ID.size
+                if shipment_id not in self.engine.known:
+                    answer += OWNER.pack(shipment_id, 2, 0) + pack_str(None)
+                    continue
+                owner = self.engine.owners.get(shipment_id)
+                if owner is None:
+                    answer += OWNER.pack(shipment_id, 0, 0) + pack_str(None)
+                else:
+                    answer += OWNER.pack(shipment_id, 1, owner[0]) + pack_str(owner[1])
+            return bytes(answer)
+
+        if op == OP_RESET:
+            await self.engine.reset()
+            return b''
+
+        if op == OP_SNAPSHOT:
+            await self.engine.snapshot()
+            return b''
+
+        key, offset = unpack_str(body, offset)
+
+        if op == OP_GET_STATE:
+            return pack_str(self.states.get(key))
+
+        if op == OP_SET_STATE:
+            state, _ = unpack_str(body, offset)
+            if state is None:
+                self.states.pop(key, None)
+            else:
+                self.states[key] = state
+            return b''
+
+        if op == OP_GET_DATA:
+            data = self.data.get(key, b'{}')
+            return FRAME.pack(len(data)) + data
+
+        if op == OP_SET_DATA:
+            (length,) = FRAME.unpack_from(body, offset)
+            offset += FRAME.size
+            data = body[offset:offset + length]
+            if data == b'{}':
+                self.data.pop(key, None)
+            else:
+                self.data[key] = data
+            return b''
+
+        raise ValueError(f"Unknown op {op}")
+
+
+class BookingServiceClient:
+    """Worker-side connection to the booking service.
+
+    Offers the same booking calls as ``BookingEngine`` so ``bot.py`` can use
+    either one. Once the service disconnects every call raises
+    ``ConnectionError`` and ``closed`` is set; the worker exits on it.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = CALL_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.closed = asyncio.Event()
+        self._reader = None
+        self._writer = None
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._read_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def stop(self):
+        self.closed.set()
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _read_loop(self):
+        try:
+            while True:
+                body = await read_frame(self._reader)
+                request_id, status = RESPONSE.unpack_from(body)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == REPLY_OK:
+                    future.set_result(body[RESPONSE.size:])
+                else:
+                    future.set_exception(BookingServiceError(unpack_str(body, RESPONSE.size)[0]))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logger.error(f"Booking service disconnected: {e!r}")
+            self.closed.set()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Booking service disconnected: {e}"))
+            self._pending.clear()
+
+    async def _call(self, op: int, payload: bytes = b'') -> bytes:
+        if self.closed.is_set():
+            raise ConnectionError("Booking service disconnected")
+
+        request_id = next(self._request_ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        write_frame(self._writer, REQUEST.pack(op, request_id) + payload)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def book(self, shipment_id: int, user_id: int):
+        answer = await self._call(OP_BOOK, BOOK.pack(shipment_id, user_id))
+        (status,) = STATUS.unpack(answer)
+        return status == STATUS_BOOKED, STATUS_MESSAGES[status]
+
+    async def reset(self):
+        await self._call(OP_RESET)
+
+    async def snapshot(self):
+        await self._call(OP_SNAPSHOT)
+
+    async def refresh(self, shipments):
+        """Apply the service's booking state to rows from the database."""
+        if not shipments:
+            return
+
+        payload = COUNT.pack(len(shipments)) + b''.join(
+            SHIPMENT_ID.pack(shipment['id']) for shipment in shipments
+        )
+        answer = await self._call(OP_OWNERS, payload)
+
+        rows = {shipment['id']: shipment for shipment in shipments}
+        offset = COUNT.size
+        for _ in range(COUNT.unpack_from(answer)[0]):
+            shipment_id, booked, user_id = OWNER.unpack_from(answer, offset)
+            booked_at, offset = unpack_str(answer, offset + OWNER.size)
+            if booked == 1:
+                rows[shipment_id].update(is_booked=1, booked_by=user_id, booked_at=booked_at)
+            elif booked == 0:
+                rows[shipment_id].update(is_booked=0, booked_by=None, booked_at=None)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = unpack_str(await self._call(OP_GET_STATE, pack_key(key)), 0)
+        return state
+
+    async def set_state(self, key: StorageKey, state: Optional[str]):
+        await self._call(OP_SET_STATE, pack_key(key) + pack_str(state))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        answer = await self._call(OP_GET_DATA, pack_key(key))
+        (length,) = FRAME.unpack_from(answer)
+        return json.loads(answer[FRAME.size:FRAME.size + length])
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]):
+        encoded = json.dumps(data, ensure_ascii=False).encode()
+        await self._call(OP_SET_DATA, pack_key(key) + FRAME.pack(len(encoded)) + encoded)
+
+
+class ServiceStorage(BaseStorage):
+    """FSM storage kept in the booking service and shared by all workers."""
+
+    def __init__(self, client: BookingServiceClient):
+        self.client = client
+
+    async def close(self) -> None:
+        pass
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        await self.client.set_state(key, state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.client.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self.client.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self.client.get_data(key)
+
+
+async def run_service(socket_path: str, journal_path: str, snapshot_seconds: int, group_commit_ms: float = 0.0):
+    service = BookingService(socket_path, BookingEngine(journal_path, group_commit_ms=group_commit_ms))
+    await service.start()
+
+    try:
+        while True:
+            await asyncio.sleep(snapshot_seconds)
+            await service.engine.snapshot()
+    finally:
+        await service.stop()
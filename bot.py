@@ -1,12 +1,12 @@
 import asyncio
 import logging
+import signal
 import sys
 import os
-from datetime import datetime, time as dt_time
+from datetime import datetime, time as dt_time, timedelta
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, CallbackQuery, FSInputFile
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -16,16 +16,108 @@ import config
 import database
 import keyboards
 import utils
+from booking_engine import BookingEngine
+from state_store import create_stores
+from update_scheduler import UpdateScheduler
+from callback_dedup import BY_ACTION, CallbackDeduplicator
+from task_group import TaskGroup
+from render_cache import RenderCache
+from catalog_push import CatalogPush
+from event_loop import LOOP_CHOICES, LoopMonitor, format_report, install_event_loop
 
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 logger = logging.getLogger(__name__)
 
 bot = Bot(token=config.BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+fsm_storage, state_store = create_stores(
+    config.STATE_STORAGE,
+    config.REDIS_URL,
+    state_ttl=config.REDIS_STATE_TTL,
+    session_ttl=config.REDIS_TEST_SESSION_TTL,
+    timer_ttl=config.REDIS_TIMER_TTL
+)
+dp = Dispatcher(storage=fsm_storage)
 router = Router()
 
-user_timers = {}
-test_sessions = {}
+booking_engine = BookingEngine(
+    config.BOOKING_JOURNAL_PATH,
+    group_commit_ms=config.BOOKING_GROUP_COMMIT_MS
+) if config.BOOKING_ENGINE_ENABLED else None
+
+callback_dedup = CallbackDeduplicator(config.CALLBACK_DEDUP_SECONDS)
+render_cache = RenderCache(config.RENDER_CACHE_SIZE)
+
+SHIPMENT_LIST_TITLES = {
+    'direct': "📦 <b>Список прямых перевозок:</b>",
+    'main': "📦 <b>Список магистральных перевозок:</b>",
+}
+
+
+def create_update_scheduler():
+    return UpdateScheduler(
+        dp,
+        bot,
+        critical_workers=config.UPDATE_CRITICAL_WORKERS,
+        normal_workers=config.UPDATE_NORMAL_WORKERS,
+        queue_size=config.UPDATE_QUEUE_SIZE
+    )
+
+
+async def get_shipments(shipment_type: str, is_test: bool = False):
+    shipments = await database.get_shipments(shipment_type, is_test=is_test)
+    if booking_engine:
+        await booking_engine.refresh(shipments)
+    return shipments
+
+
+async def get_shipment(shipment_id: int):
+    shipment = await database.get_shipment(shipment_id)
+    if booking_engine and shipment:
+        await booking_engine.refresh([shipment])
+    return shipment
+
+
+async def render_shipment_list(shipment_type: str):
+    shipments = await get_shipments(shipment_type)
+    return SHIPMENT_LIST_TITLES[shipment_type], keyboards.get_shipments_keyboard(shipments, shipment_type)
+
+
+def booking_burst(now: datetime = None) -> bool:
+    """Whether the confirm burst after BOOKING_TIME is still going on."""
+    now = now or datetime.now()
+    hour, minute = map(int, config.BOOKING_TIME.split(':'))
+    opened = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return (now - opened) % timedelta(days=1) < timedelta(seconds=config.CATALOG_BURST_SECONDS)
+
+
+def create_catalog_push(processes: int = 1):
+    # Every process pushes on the same bot token and shares its rate limit
+    return CatalogPush(
+        bot,
+        render_cache,
+        render_shipment_list,
+        interval=config.CATALOG_PUSH_INTERVAL,
+        view_ttl=config.CATALOG_VIEW_TTL,
+        max_views=config.CATALOG_MAX_VIEWS,
+        max_edits_per_second=config.CATALOG_PUSH_RATE / processes,
+        burst=booking_burst,
+        burst_edits_per_second=config.CATALOG_BURST_PUSH_RATE / processes
+    )
+
+
+catalog_push = create_catalog_push()
+
+
+async def book_shipment(shipment_id: int, user_id: int):
+    if booking_engine:
+        return await booking_engine.book(shipment_id, user_id)
+    return await database.book_shipment(shipment_id, user_id)
+
+
+async def sync_bookings():
+    # Reports query the shipments table directly
+    if booking_engine:
+        await booking_engine.snapshot()
 
 
 class TestState(StatesGroup):
@@ -43,28 +135,32 @@ async def cmd_start(message: Message, state: FSMContext):
     
     current_state = await state.get_state()
     
-    if current_state == TestState.waiting_for_start.state and user_id in test_sessions:
-        test_data = test_sessions[user_id]
-        test_data['start_command_time'] = time.time()
-        stage1_ms = (test_data['start_command_time'] - test_data['test_start_time']) * 1000
-        test_data['stage1_ms'] = stage1_ms
+    test_data = None
+    if current_state == TestState.waiting_for_start.state:
+        test_data = await state_store.get_test_session(user_id)
+    
+    if test_data:
+        start_command_time = time.time()
+        stage1_ms = (start_command_time - test_data['test_start_time']) * 1000
+        await state_store.update_test_session(
+            user_id, start_command_time=start_command_time, stage1_ms=stage1_ms
+        )
         
         await database.update_test_session_start(user_id)
         await database.add_log(user_id, 'test_start_command', stage1_ms, True, True, 'start_pressed')
         
         await state.set_state(TestState.waiting_for_selection)
         
-        test_shipments = await database.get_shipments('test', is_test=True)
+        test_shipments = await get_shipments('test', is_test=True)
         if not test_shipments:
             for shipment in config.TEST_SHIPMENTS:
                 await database.add_shipment('test', shipment['city'], shipment['quantity'], is_test=True)
-            test_shipments = await database.get_shipments('test', is_test=True)
+            test_shipments = await get_shipments('test', is_test=True)
         
-        await message.answer(
-            "🧪 <b>ТЕСТОВЫЙ РЕЖИМ</b>\n\nВыберите перевозку:",
-            reply_markup=keyboards.get_shipments_keyboard(test_shipments, 'test'),
-            parse_mode='HTML'
-        )
+        text = "🧪 <b>ТЕСТОВЫЙ РЕЖИМ</b>\n\nВыберите перевозку:"
+        reply_markup = keyboards.get_shipments_keyboard(test_shipments, 'test')
+        sent = await message.answer(text, reply_markup=reply_markup, parse_mode='HTML')
+        render_cache.remember(sent, text, reply_markup, 'HTML')
         return
     
     await state.clear()
@@ -79,134 +175,143 @@ async def cmd_start(message: Message, state: FSMContext):
             reply_markup=keyboards.get_main_menu()
         )
     else:
-        await message.answer(
+        sent = await message.answer(
             welcome_text,
             reply_markup=keyboards.get_main_menu()
         )
+        render_cache.remember(sent, welcome_text, keyboards.get_main_menu())
     
     await database.add_log(user_id, 'start_command')
 
 
 @router.callback_query(F.data == "back_to_menu")
 async def back_to_menu(callback: CallbackQuery, state: FSMContext):
-    await state.clear()
     welcome_text = "Пришлем сообщение как только будут назначены перевозки"
     
-    if os.path.exists(config.WELCOME_IMAGE_PATH):
-        await callback.message.delete()
-        photo = FSInputFile(config.WELCOME_IMAGE_PATH)
-        await callback.message.answer_photo(
-            photo=photo,
-            caption=welcome_text,
-            reply_markup=keyboards.get_main_menu()
-        )
-    else:
-        await callback.message.edit_text(
-            welcome_text,
-            reply_markup=keyboards.get_main_menu()
-        )
-    
-    await callback.answer()
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.clear())
+        
+        if os.path.exists(config.WELCOME_IMAGE_PATH):
+            render_cache.forget(callback.message)
+            tasks.create_task(callback.message.delete())
+            photo = FSInputFile(config.WELCOME_IMAGE_PATH)
+            await callback.message.answer_photo(
+                photo=photo,
+                caption=welcome_text,
+                reply_markup=keyboards.get_main_menu()
+            )
+        else:
+            await render_cache.edit_text(
+                callback.message,
+                welcome_text,
+                reply_markup=keyboards.get_main_menu()
+            )
 
 
 @router.callback_query(F.data == "direct_shipments")
 async def show_direct_shipments(callback: CallbackQuery, state: FSMContext):
-    await state.clear()
-    shipments = await database.get_shipments('direct')
-    
-    await callback.message.edit_text(
-        "📦 <b>Список прямых перевозок:</b>",
-        reply_markup=keyboards.get_shipments_keyboard(shipments, 'direct'),
-        parse_mode='HTML'
-    )
-    await callback.answer()
-    await database.add_log(callback.from_user.id, 'view_direct_shipments')
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.clear())
+        tasks.create_task(database.add_log(callback.from_user.id, 'view_direct_shipments'))
+        
+        text, reply_markup = await render_shipment_list('direct')
+        await render_cache.edit_text(callback.message, text, reply_markup=reply_markup, parse_mode='HTML')
+        catalog_push.open_view('direct', callback.message.chat.id, callback.message.message_id)
 
 
 @router.callback_query(F.data == "main_shipments")
 async def show_main_shipments(callback: CallbackQuery, state: FSMContext):
-    await state.clear()
-    shipments = await database.get_shipments('main')
-    
-    await callback.message.edit_text(
-        "📦 <b>Список магистральных перевозок:</b>",
-        reply_markup=keyboards.get_shipments_keyboard(shipments, 'main'),
-        parse_mode='HTML'
-    )
-    await callback.answer()
-    await database.add_log(callback.from_user.id, 'view_main_shipments')
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.clear())
+        tasks.create_task(database.add_log(callback.from_user.id, 'view_main_shipments'))
+        
+        text, reply_markup = await render_shipment_list('main')
+        await render_cache.edit_text(callback.message, text, reply_markup=reply_markup, parse_mode='HTML')
+        catalog_push.open_view('main', callback.message.chat.id, callback.message.message_id)
 
 
 @router.callback_query(F.data == "my_shipments")
 async def show_my_shipments(callback: CallbackQuery, state: FSMContext):
-    await state.clear()
     user_id = callback.from_user.id
-    bookings = await database.get_user_bookings(user_id)
     
-    if not bookings:
-        text = "У вас пока нет забронированных перевозок"
-    else:
-        text = "📋 <b>Ваши забронированные перевозки:</b>\n\n"
-        for booking in bookings:
-            shipment_type = "Прямая" if booking['type'] == 'direct' else "Магистральная"
-            text += f"• {shipment_type}: {booking['city']} (кол-во: {booking['quantity']})\n"
-            text += f"  Забронировано: {booking['booked_at']}\n\n"
-    
-    await callback.message.edit_text(
-        text,
-        reply_markup=keyboards.get_back_to_menu_keyboard(),
-        parse_mode='HTML'
-    )
-    await callback.answer()
-    await database.add_log(user_id, 'view_my_shipments')
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.clear())
+        tasks.create_task(database.add_log(user_id, 'view_my_shipments'))
+        
+        await sync_bookings()
+        bookings = await database.get_user_bookings(user_id)
+        
+        if not bookings:
+            text = "У вас пока нет забронированных перевозок"
+        else:
+            text = "📋 <b>Ваши забронированные перевозки:</b>\n\n"
+            for booking in bookings:
+                shipment_type = "Прямая" if booking['type'] == 'direct' else "Магистральная"
+                text += f"• {shipment_type}: {booking['city']} (кол-во: {booking['quantity']})\n"
+                text += f"  Забронировано: {booking['booked_at']}\n\n"
+        
+        await render_cache.edit_text(
+            callback.message,
+            text,
+            reply_markup=keyboards.get_back_to_menu_keyboard(),
+            parse_mode='HTML'
+        )
 
 
 @router.callback_query(F.data == "settings")
 async def show_settings(callback: CallbackQuery, state: FSMContext):
-    await state.clear()
     user_id = callback.from_user.id
-    user = await database.get_user(user_id)
-    
-    text = "⚙️ <b>Настройки</b>\n\n"
-    text += f"👤 User ID: <code>{user_id}</code>\n"
-    text += f"👤 Username: @{user['username'] if user['username'] else 'Не указан'}\n"
-    text += f"📅 Дата регистрации: {user['registration_date']}\n"
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=keyboards.get_back_to_menu_keyboard(),
-        parse_mode='HTML'
-    )
-    await callback.answer()
-    await database.add_log(user_id, 'view_settings')
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.clear())
+        tasks.create_task(database.add_log(user_id, 'view_settings'))
+        
+        user = await database.get_user(user_id)
+        
+        text = "⚙️ <b>Настройки</b>\n\n"
+        text += f"👤 User ID: <code>{user_id}</code>\n"
+        text += f"👤 Username: @{user['username'] if user['username'] else 'Не указан'}\n"
+        text += f"📅 Дата регистрации: {user['registration_date']}\n"
+        
+        await render_cache.edit_text(
+            callback.message,
+            text,
+            reply_markup=keyboards.get_back_to_menu_keyboard(),
+            parse_mode='HTML'
+        )
 
 
 @router.callback_query(F.data == "test_mode")
 async def start_test_mode(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
-    
-    session_id = await database.create_test_session(user_id)
-    
-    test_sessions[user_id] = {
-        'session_id': session_id,
-        'test_start_time': time.time()
-    }
-    
-    await state.set_state(TestState.waiting_for_start)
-    
-    await callback.message.edit_text(
-        "🧪 Тест запущен!\n\nСейчас будет отправлена имитация SMS...",
-        reply_markup=None
-    )
-    await callback.answer()
+    test_start_time = time.time()
+    
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        tasks.create_task(state.set_state(TestState.waiting_for_start))
+        tasks.create_task(render_cache.edit_text(
+            callback.message,
+            "🧪 Тест запущен!\n\nСейчас будет отправлена имитация SMS...",
+            reply_markup=None
+        ))
+        
+        session_id = await database.create_test_session(user_id)
+        await state_store.update_test_session(
+            user_id, session_id=session_id, test_start_time=test_start_time
+        )
     
     await asyncio.sleep(1)
     
-    await callback.message.answer(
-        "Появились новые перевозки.\n\nНажмите /start для вызова меню"
-    )
-    
-    await database.add_log(user_id, 'test_sms_sent', is_test_mode=True, test_stage='sms_sent')
+    async with TaskGroup() as tasks:
+        tasks.create_task(database.add_log(user_id, 'test_sms_sent', is_test_mode=True, test_stage='sms_sent'))
+        await callback.message.answer(
+            "Появились новые перевозки.\n\nНажмите /start для вызова меню"
+        )
 
 
 @router.callback_query(F.data.startswith("shipment:"))
@@ -214,61 +319,72 @@ async def show_shipment_detail(callback: CallbackQuery, state: FSMContext):
     shipment_id = int(callback.data.split(':')[1])
     user_id = callback.from_user.id
     
-    timer = utils.Timer()
-    timer.start()
-    user_timers[f"{user_id}:{shipment_id}"] = timer
-    
-    shipment = await database.get_shipment(shipment_id)
-    
-    if not shipment:
-        await callback.answer("Перевозка не найдена", show_alert=True)
-        return
-    
-    current_state = await state.get_state()
+    _, duplicate = await callback_dedup.run(
+        callback.id,
+        (user_id, 'shipment', shipment_id),
+        lambda: open_shipment(callback, state, shipment_id, user_id)
+    )
+    if duplicate == BY_ACTION:
+        await callback.answer()
+
+
+async def open_shipment(callback: CallbackQuery, state: FSMContext, shipment_id: int, user_id: int):
+    selected_at = time.time()
     
-    if current_state == TestState.waiting_for_selection.state and user_id in test_sessions:
-        test_data = test_sessions[user_id]
-        test_data['selection_time'] = time.time()
-        stage2_ms = (test_data['selection_time'] - test_data['start_command_time']) * 1000
-        test_data['stage2_ms'] = stage2_ms
-        total_ms = test_data['stage1_ms'] + stage2_ms
-        test_data['total_ms'] = total_ms
+    async with TaskGroup() as tasks:
+        tasks.create_task(state_store.start_timer(user_id, shipment_id))
+        current_state = tasks.create_task(state.get_state())
         
-        await database.complete_test_session(user_id, test_data['stage1_ms'], stage2_ms, total_ms)
-        await database.add_log(user_id, 'test_shipment_selected', stage2_ms, True, True, 'shipment_selected')
+        shipment = await get_shipment(shipment_id)
+        if not shipment:
+            await callback.answer("Перевозка не найдена", show_alert=True)
+            return
         
-        result_text = utils.format_test_results(test_data['stage1_ms'], stage2_ms, total_ms)
+        test_data = None
+        if await current_state == TestState.waiting_for_selection.state:
+            test_data = await state_store.get_test_session(user_id)
         
-        await callback.message.edit_text(
-            result_text,
-            reply_markup=keyboards.get_test_result_keyboard(),
-            parse_mode='HTML'
-        )
+        if test_data:
+            stage2_ms = (selected_at - test_data['start_command_time']) * 1000
+            total_ms = test_data['stage1_ms'] + stage2_ms
+            
+            tasks.create_task(database.complete_test_session(user_id, test_data['stage1_ms'], stage2_ms, total_ms))
+            tasks.create_task(database.add_log(user_id, 'test_shipment_selected', stage2_ms, True, True, 'shipment_selected'))
+            tasks.create_task(state.clear())
+            tasks.create_task(state_store.delete_test_session(user_id))
+            
+            result_text = utils.format_test_results(test_data['stage1_ms'], stage2_ms, total_ms)
+            
+            await render_cache.edit_text(
+                callback.message,
+                result_text,
+                reply_markup=keyboards.get_test_result_keyboard(),
+                parse_mode='HTML'
+            )
+            await callback.answer()
+            return
+        
+        tasks.create_task(database.add_log(user_id, f'view_shipment_{shipment_id}'))
+        info_text = utils.format_shipment_info(shipment)
         
-        await state.clear()
-        if user_id in test_sessions:
-            del test_sessions[user_id]
+        if shipment['is_booked']:
+            await render_cache.edit_text(
+                callback.message,
+                info_text + "\n\n❌ Эта перевозка уже забронирована",
+                reply_markup=keyboards.get_back_to_menu_keyboard(),
+                parse_mode='HTML'
+            )
+        else:
+            await render_cache.edit_text(
+                callback.message,
+                info_text,
+                reply_markup=keyboards.get_shipment_detail_keyboard(shipment_id),
+                parse_mode='HTML'
+            )
         
+        # Unlike other buttons, answered only once the detail keyboard is in
+        # place: clients press confirm: as soon as the answer arrives
         await callback.answer()
-        return
-    
-    info_text = utils.format_shipment_info(shipment)
-    
-    if shipment['is_booked']:
-        await callback.message.edit_text(
-            info_text + "\n\n❌ Эта перевозка уже забронирована",
-            reply_markup=keyboards.get_back_to_menu_keyboard(),
-            parse_mode='HTML'
-        )
-    else:
-        await callback.message.edit_text(
-            info_text,
-            reply_markup=keyboards.get_shipment_detail_keyboard(shipment_id),
-            parse_mode='HTML'
-        )
-    
-    await callback.answer()
-    await database.add_log(user_id, f'view_shipment_{shipment_id}')
 
 
 @router.callback_query(F.data.startswith("confirm:"))
@@ -276,27 +392,35 @@ async def confirm_booking(callback: CallbackQuery):
     shipment_id = int(callback.data.split(':')[1])
     user_id = callback.from_user.id
     
-    timer_key = f"{user_id}:{shipment_id}"
-    timer = user_timers.get(timer_key)
-    
-    if timer:
-        response_time_ms = timer.stop()
-        del user_timers[timer_key]
-    else:
-        response_time_ms = 0.0
-    
-    success, message = await database.book_shipment(shipment_id, user_id)
-    
-    result_text = utils.format_booking_result(success, message, response_time_ms)
-    
-    await callback.message.edit_text(
-        result_text,
-        reply_markup=keyboards.get_back_to_menu_keyboard(),
-        parse_mode='HTML'
+    message, duplicate = await callback_dedup.run(
+        callback.id,
+        (user_id, 'confirm', shipment_id),
+        lambda: book_and_reply(callback, shipment_id, user_id)
     )
-    
-    await callback.answer()
-    await database.add_log(user_id, f'confirm_booking_{shipment_id}', response_time_ms, success)
+    if duplicate == BY_ACTION:
+        await callback.answer(message)
+
+
+async def book_and_reply(callback: CallbackQuery, shipment_id: int, user_id: int) -> str:
+    async with TaskGroup() as tasks:
+        tasks.create_task(callback.answer())
+        timer = tasks.create_task(state_store.stop_timer(user_id, shipment_id))
+        
+        success, message = await book_shipment(shipment_id, user_id)
+        if success:
+            catalog_push.notify()
+        response_time_ms = await timer
+        
+        tasks.create_task(database.add_log(user_id, f'confirm_booking_{shipment_id}', response_time_ms, success))
+        
+        result_text = utils.format_booking_result(success, message, response_time_ms)
+        await render_cache.edit_text(
+            callback.message,
+            result_text,
+            reply_markup=keyboards.get_back_to_menu_keyboard(),
+            parse_mode='HTML'
+        )
+    return message
 
 
 @router.message(Command('admin_reset'))
@@ -305,7 +429,11 @@ async def admin_reset(message: Message):
         await message.answer("❌ У вас нет прав администратора")
         return
     
-    await database.reset_bookings()
+    if booking_engine:
+        await booking_engine.reset()
+    else:
+        await database.reset_bookings()
+    catalog_push.notify()
     await message.answer("✅ Все бронирования сброшены")
 
 
@@ -330,6 +458,7 @@ async def admin_add_shipment(message: Message):
             return
         
         shipment_id = await database.add_shipment(shipment_type, city, quantity)
+        catalog_push.notify()
         await message.answer(f"✅ Перевозка добавлена с ID: {shipment_id}")
     except Exception as e:
         await message.answer(f"❌ Ошибка: {str(e)}")
@@ -341,7 +470,11 @@ async def admin_stats(message: Message):
         await message.answer("❌ У вас нет прав администратора")
         return
     
+    await sync_bookings()
     stats = await database.get_stats()
+    stats.update(callback_dedup.stats())
+    stats.update(render_cache.stats())
+    stats.update(catalog_push.stats())
     text = utils.format_stats(stats)
     await message.answer(text, parse_mode='HTML')
 
@@ -414,18 +547,16 @@ async def open_booking_command(message: Message):
 
 
 async def send_booking_notification():
-    async with database.aiosqlite.connect(database.DATABASE_PATH) as db:
-        async with db.execute('SELECT user_id FROM users') as cursor:
-            users = await cursor.fetchall()
+    user_ids = await database.get_user_ids()
     
     notification_text = "Появились новые перевозки.\n\nНажмите /start для вызова меню"
     
-    for user in users:
+    for user_id in user_ids:
         try:
-            await bot.send_message(user[0], notification_text)
+            await bot.send_message(user_id, notification_text)
             await asyncio.sleep(0.05)
         except Exception as e:
-            logger.error(f"Failed to send notification to user {user[0]}: {e}")
+            logger.error(f"Failed to send notification to user {user_id}: {e}")
 
 
 async def scheduled_booking_open():
@@ -433,12 +564,39 @@ async def scheduled_booking_open():
     await send_booking_notification()
 
 
+async def report_loop_health(loop_monitor: LoopMonitor):
+    for line in format_report(loop_monitor.report()):
+        logger.info(line)
+    loop_monitor.reset()
+
+
 async def main():
     await database.init_db()
     await database.initialize_default_shipments()
     
     scheduler = AsyncIOScheduler()
     
+    if booking_engine:
+        await booking_engine.start()
+        scheduler.add_job(
+            booking_engine.snapshot,
+            'interval',
+            seconds=config.BOOKING_SNAPSHOT_SECONDS
+        )
+    
+    if config.LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopMonitor(
+            stall_threshold_ms=config.LOOP_STALL_THRESHOLD_MS,
+            capture_stacks=True
+        )
+        loop_monitor.start()
+        scheduler.add_job(
+            report_loop_health,
+            'interval',
+            seconds=config.LOOP_MONITOR_REPORT_SECONDS,
+            args=[loop_monitor]
+        )
+    
     booking_time_parts = config.BOOKING_TIME.split(':')
     hour = int(booking_time_parts[0])
     minute = int(booking_time_parts[1])
@@ -455,8 +613,49 @@ async def main():
     dp.include_router(router)
     
     logger.info("Bot started")
-    await dp.start_polling(bot)
+    update_scheduler = None
+    if config.CATALOG_PUSH_ENABLED:
+        catalog_push.start()
+    try:
+        if config.UPDATE_SCHEDULER_ENABLED:
+            update_scheduler = create_update_scheduler()
+            update_scheduler.start()
+            await update_scheduler.poll()
+        else:
+            await dp.start_polling(bot)
+    finally:
+        await catalog_push.stop()
+        if update_scheduler:
+            await update_scheduler.stop()
+            await bot.session.close()
+        if booking_engine:
+            await booking_engine.stop()
+        await state_store.close()
+        await database.close()
+        logger.info("Bot stopped")
+
+
+async def run():
+    # docker stop sends SIGTERM; the engine has to take its final snapshot
+    task = asyncio.create_task(main())
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Booking bot")
+    parser.add_argument(
+        "--loop",
+        choices=LOOP_CHOICES,
+        default=config.EVENT_LOOP,
+        help="Event loop implementation (default: EVENT_LOOP or auto)"
+    )
+    args = parser.parse_args()
+    
+    logger.info(f"Event loop: {install_event_loop(args.loop)}")
+    asyncio.run(run())
@@ -0,0 +1,431 @@
+"""Local harness feeding synthetic updates to the bot.
+
+Updates go straight into the bot's dispatcher and every Bot API call is
+answered in-process by ``LocalSession``, so the handlers, the database and
+the keyboards run for real without Telegram:
+
+    harness = BotHarness()
+    await harness.start()
+    await harness.send(1001, "/start")
+    await harness.press(1001, "direct_shipments")
+    print(harness.session.calls[-1].text)
+    await harness.close()
+
+``FakeRedis`` stands in for Redis, so the Redis state storage runs offline:
+
+    harness = BotHarness(redis=FakeRedis(latency_ms=0.2))
+"""
+
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    EditMessageReplyMarkup,
+    EditMessageText,
+    GetMe,
+    SendMessage,
+    SendPhoto,
+)
+from aiogram.types import Message, Update, User
+
+# bot.py creates its Bot at import time and needs a well-formed token
+os.environ.setdefault('BOT_TOKEN', '123456789:LOCAL_HARNESS_TOKEN')
+
+import bot as bot_module  # noqa: E402
+import database  # noqa: E402
+from booking_engine import BookingEngine  # noqa: E402
+from callback_dedup import CallbackDeduplicator  # noqa: E402
+from db_backends import SQLiteBackend  # noqa: E402
+from render_cache import RenderCache  # noqa: E402
+from state_store import create_stores  # noqa: E402
+from update_scheduler import UpdateScheduler  # noqa: E402
+
+BOT_ID = 123456789
+
+
+class ApiCall(NamedTuple):
+    method: str
+    chat_id: Optional[int]
+    message_id: Optional[int]
+    text: Optional[str]
+    reply_markup: Any
+    at: float
+
+
+class LocalSession(BaseSession):
+    """Bot API session answering every request in-process.
+
+    ``latency_ms`` delays every request, like the round trip to Telegram.
+    Like Telegram, an edit that leaves a message as it is fails with
+    "message is not modified".
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.calls: List[ApiCall] = []
+        self.contents: Dict[tuple, tuple] = {}
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def make_request(self, bot: Bot, method, timeout=None):
+        chat_id = getattr(method, 'chat_id', None)
+        message_id = getattr(method, 'message_id', None)
+        text = getattr(method, 'text', None) or getattr(method, 'caption', None)
+        reply_markup = getattr(method, 'reply_markup', None)
+
+        if isinstance(method, (SendMessage, SendPhoto)):
+            message_id = next(self._message_ids)
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        self.calls.append(ApiCall(
+            type(method).__name__, chat_id, message_id, text, reply_markup, time.perf_counter()
+        ))
+
+        if isinstance(method, (SendMessage, SendPhoto, EditMessageText, EditMessageReplyMarkup)):
+            markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else None
+            previous = self.contents.get((chat_id, message_id))
+            if isinstance(method, EditMessageReplyMarkup):
+                # Only the keyboard changes
+                text = previous[0] if previous else None
+                content = (text, markup, previous[2] if previous else None)
+            else:
+                content = (text, markup, getattr(method, 'parse_mode', None))
+            if not isinstance(method, (SendMessage, SendPhoto)) and previous == content:
+                raise TelegramBadRequest(method, "Bad Request: message is not modified")
+            self.contents[(chat_id, message_id)] = content
+
+        if isinstance(method, (SendMessage, SendPhoto, EditMessageText, EditMessageReplyMarkup)):
+            result = {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bot'},
+                'text': text,
+            }
+            return Message.model_validate(result, context={'bot': bot})
+
+        if isinstance(method, GetMe):
+            return User.model_validate(
+                {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bot', 'username': 'local_bot'},
+                context={'bot': bot}
+            )
+
+        # AnswerCallbackQuery, DeleteMessage and the rest return True
+        return True
+
+    def sent_to(self, chat_id: int) -> List[ApiCall]:
+        return [call for call in self.calls if call.chat_id == chat_id]
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakeRedis:
+    """In-process stand-in for ``redis.asyncio.Redis``.
+
+    Implements the commands used by the bot's state storage. Every command,
+    and every executed pipeline, is one round trip and waits ``latency_ms``
+    like a request to a real server would.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.round_trips = 0
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    def _alive(self, name: str) -> bool:
+        expires = self.expires.get(name)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(name, None)
+            self.expires.pop(name, None)
+        return name in self.data
+
+    def _expire(self, name: str, seconds) -> bool:
+        if not self._alive(name):
+            return False
+        if isinstance(seconds, timedelta):
+            seconds = seconds.total_seconds()
+        self.expires[name] = time.monotonic() + seconds
+        return True
+
+    def _set(self, name: str, value, ex=None) -> bool:
+        self.data[name] = _encode(value)
+        self.expires.pop(name, None)
+        if ex is not None:
+            self._expire(name, ex)
+        return True
+
+    def _get(self, name: str) -> Optional[bytes]:
+        return self.data[name] if self._alive(name) else None
+
+    def _getdel(self, name: str) -> Optional[bytes]:
+        value = self._get(name)
+        self._delete(name)
+        return value
+
+    def _delete(self, *names: str) -> int:
+        deleted = 0
+        for name in names:
+            if self._alive(name):
+                deleted += 1
+            self.data.pop(name, None)
+            self.expires.pop(name, None)
+        return deleted
+
+    def _hset(self, name: str, key=None, value=None, mapping=None) -> int:
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        self._alive(name)
+        stored = self.data.setdefault(name, {})
+        added = len(set(map(_encode, fields)) - set(stored))
+        stored.update({_encode(field): _encode(field_value) for field, field_value in fields.items()})
+        return added
+
+    def _hgetall(self, name: str) -> Dict[bytes, bytes]:
+        return dict(self.data[name]) if self._alive(name) else {}
+
+    def _ttl(self, name: str) -> int:
+        if not self._alive(name):
+            return -2
+        expires = self.expires.get(name)
+        return -1 if expires is None else int(expires - time.monotonic())
+
+    async def _command(self, name: str, *args, **kwargs):
+        await self._round_trip()
+        return getattr(self, f"_{name}")(*args, **kwargs)
+
+    async def set(self, name, value, ex=None):
+        return await self._command("set", name, value, ex=ex)
+
+    async def get(self, name):
+        return await self._command("get", name)
+
+    async def getdel(self, name):
+        return await self._command("getdel", name)
+
+    async def delete(self, *names):
+        return await self._command("delete", *names)
+
+    async def hset(self, name, key=None, value=None, mapping=None):
+        return await self._command("hset", name, key, value, mapping=mapping)
+
+    async def hgetall(self, name):
+        return await self._command("hgetall", name)
+
+    async def expire(self, name, seconds):
+        return await self._command("expire", name, seconds)
+
+    async def ttl(self, name):
+        return await self._command("ttl", name)
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    """Queues commands and sends them to ``FakeRedis`` in one round trip."""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __getattr__(self, name: str):
+        if not hasattr(self.redis, f"_{name}"):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> list:
+        commands, self.commands = self.commands, []
+        await self.redis._round_trip()
+        return [getattr(self.redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class BotHarness:
+    """Runs ``bot.py`` handlers against a temporary database.
+
+    When the bot uses the booking engine, the harness gives it a fresh one
+    journaling next to the temporary database; the callback deduplicator,
+    the render cache and the catalog push are replaced with fresh ones as
+    well. The catalog push does not run on its own, ``catalog_push.push()``
+    runs it once. With ``redis`` the FSM state, test
+    sessions and timers are kept in that (fake) Redis. With
+    ``update_scheduler`` fed updates go through its lanes instead of straight
+    to the dispatcher.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, redis=None,
+                 update_scheduler: Optional[UpdateScheduler] = None, api_latency_ms: float = 0.0):
+        self._tmp_dir = None
+        if db_path is None:
+            self._tmp_dir = tempfile.TemporaryDirectory()
+            db_path = os.path.join(self._tmp_dir.name, 'bot.db')
+
+        self.db_path = db_path
+        self.bot = bot_module.bot
+        self.dispatcher = bot_module.dp
+        self.session = LocalSession(api_latency_ms)
+        self._original_session = None
+        self._original_backend = None
+        self._original_engine = None
+        self.engine = None
+        self.redis = redis
+        self._original_stores = None
+        self._original_dedup = None
+        self.callback_dedup = None
+        self._original_render_cache = None
+        self.render_cache = None
+        self._original_catalog_push = None
+        self.catalog_push = None
+        self.update_scheduler = update_scheduler
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    async def start(self) -> None:
+        self._original_backend = database.use_backend(SQLiteBackend(self.db_path))
+
+        self._original_session = self.bot.session
+        self.bot.session = self.session
+
+        if bot_module.router.parent_router is None:
+            self.dispatcher.include_router(bot_module.router)
+
+        if self.redis is not None:
+            self._original_stores = (self.dispatcher.fsm.storage, bot_module.state_store)
+            self.dispatcher.fsm.storage, bot_module.state_store = create_stores('redis', redis=self.redis)
+
+        await database.init_db()
+        await database.initialize_default_shipments()
+
+        self._original_engine = bot_module.booking_engine
+        if self._original_engine is not None:
+            self.engine = BookingEngine(self.db_path + '.journal')
+            bot_module.booking_engine = self.engine
+            await self.engine.start()
+
+        self._original_dedup = bot_module.callback_dedup
+        self.callback_dedup = CallbackDeduplicator(self._original_dedup.ttl_seconds)
+        bot_module.callback_dedup = self.callback_dedup
+
+        self._original_render_cache = bot_module.render_cache
+        self.render_cache = RenderCache(self._original_render_cache.max_entries)
+        bot_module.render_cache = self.render_cache
+
+        self._original_catalog_push = bot_module.catalog_push
+        self.catalog_push = bot_module.create_catalog_push()
+        # Tests run at any time of day, including right after BOOKING_TIME
+        self.catalog_push.burst = None
+        bot_module.catalog_push = self.catalog_push
+
+        if self.update_scheduler is not None:
+            self.update_scheduler.start()
+
+    async def close(self) -> None:
+        if self.update_scheduler is not None:
+            await self.update_scheduler.stop()
+        if self._original_dedup is not None:
+            bot_module.callback_dedup = self._original_dedup
+            bot_module.render_cache = self._original_render_cache
+            bot_module.catalog_push = self._original_catalog_push
+        if self._original_stores is not None:
+            self.dispatcher.fsm.storage, bot_module.state_store = self._original_stores
+        if self.engine is not None:
+            await self.engine.stop()
+            bot_module.booking_engine = self._original_engine
+        if self._original_session is not None:
+            self.bot.session = self._original_session
+        if self._original_backend is not None:
+            await database.close()
+            database.use_backend(self._original_backend)
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+    def _user(self, user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+    def message_update(self, user_id: int, text: str) -> Update:
+        return Update.model_validate({
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': self._user(user_id),
+                'text': text,
+            },
+        }, context={'bot': self.bot})
+
+    def callback_update(self, user_id: int, data: str, message_id: int = 1) -> Update:
+        return Update.model_validate({
+            'update_id': next(self._update_ids),
+            'callback_query': {
+                'id': str(next(self._update_ids)),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bot'},
+                    'text': 'menu',
+                },
+            },
+        }, context={'bot': self.bot})
+
+    async def feed(self, update: Update) -> Any:
+        if self.update_scheduler is not None:
+            return await (await self.update_scheduler.submit(update))
+        return await self.dispatcher.feed_update(self.bot, update)
+
+    async def send(self, user_id: int, text: str) -> Any:
+        return await self.feed(self.message_update(user_id, text))
+
+    async def press(self, user_id: int, data: str, message_id: int = 1) -> Any:
+        return await self.feed(self.callback_update(user_id, data, message_id))
+
+    async def open_booking(self) -> None:
+        await bot_module.send_booking_notification()
+
+    def last_reply(self, user_id: int) -> Optional[ApiCall]:
+        replies = self.session.sent_to(user_id)
+        return replies[-1] if replies else None
@@ -0,0 +1,83 @@
+"""Collapsing of duplicate callback queries.
+
+Impatient users tap a button several times, and Telegram may deliver the
+same callback query again. ``CallbackDeduplicator.run`` keys a handler run by
+the callback query id and by ``(user, action, shipment)``: a duplicate that
+arrives while the first run is in flight, or within ``ttl_seconds`` after it
+finished, waits for that run and gets its result instead of running the
+handler again. Failed runs are forgotten right away so a retry can go
+through.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BY_ID = 'callback_id'
+BY_ACTION = 'action'
+
+
+class CallbackDeduplicator:
+    def __init__(self, ttl_seconds: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.executed = 0
+        self.duplicates: Dict[str, int] = {BY_ID: 0, BY_ACTION: 0}
+        self._entries: Dict[Hashable, asyncio.Future] = {}
+        self._keys: Dict[asyncio.Future, List[Hashable]] = {}
+
+    async def run(self, callback_id: str, action_key: Tuple,
+                  factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, Optional[str]]:
+        """Run ``factory`` unless an equal callback is in flight or just finished.
+
+        Returns the result and ``None`` for the run that did the work, or
+        ``BY_ID``/``BY_ACTION`` for a duplicate answered from that run.
+        """
+        keys = [(BY_ID, callback_id), (BY_ACTION, *action_key)]
+
+        for key in keys:
+            future = self._entries.get(key)
+            if future is not None:
+                kind = key[0]
+                self.duplicates[kind] += 1
+                # A redelivery of this duplicate collapses onto the same run
+                if keys[0] not in self._entries:
+                    self._entries[keys[0]] = future
+                    self._keys[future].append(keys[0])
+                logger.debug(f"Duplicate callback {callback_id} ({kind}) collapsed")
+                return await asyncio.shield(future), kind
+
+        future = asyncio.get_running_loop().create_future()
+        for key in keys:
+            self._entries[key] = future
+        self._keys[future] = keys
+        self.executed += 1
+
+        try:
+            result = await factory()
+        except BaseException as e:
+            self._forget(future)
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiting duplicates re-raise it; nobody else has to
+                future.exception()
+            else:
+                future.cancel()
+            raise
+
+        future.set_result(result)
+        asyncio.get_running_loop().call_later(self.ttl_seconds, self._forget, future)
+        return result, None
+
+    def _forget(self, future: asyncio.Future):
+        for key in self._keys.pop(future, ()):
+            if self._entries.get(key) is future:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'executed': self.executed,
+            'duplicates_by_id': self.duplicates[BY_ID],
+            'duplicates_by_action': self.duplicates[BY_ACTION],
+        }
@@ -0,0 +1,185 @@
+"""Live updates of open shipment lists.
+
+A user who has the direct or main list open keeps seeing a booked shipment
+as available until they tap it. ``CatalogPush`` keeps a bounded registry of
+open list messages, each with a TTL and the fingerprint of the list it
+shows. After ``notify()`` (a booking, a reset, a new shipment), and every
+``interval`` seconds while views are open, it renders each list once and
+replaces the keyboard of every view that shows an older version.
+
+Pushes run at most once per ``interval``, so bookings that land in between
+are coalesced into a single edit per viewer, and each run sends at most
+``max_edits_per_second * interval`` edits, newest views first; the rest
+wait for the next run. A view is dropped when its message shows something
+else (the user moved on), when its TTL expires or when the edit fails.
+Polling also picks up bookings made by other worker processes. While
+``burst()`` is true (the confirm burst after booking opens) pushes drop to
+``burst_edits_per_second``, leaving the rest of Telegram's rate limit to
+confirm edits while lists still catch up.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from render_cache import RenderCache, fingerprint
+
+logger = logging.getLogger(__name__)
+
+PARSE_MODE = 'HTML'
+
+
+class CatalogPush:
+    def __init__(self, bot: Bot, render_cache: RenderCache,
+                 render_list: Callable[[str], Awaitable[Tuple[str, InlineKeyboardMarkup]]],
+                 interval: float = 1.0, view_ttl: float = 120.0, max_views: int = 5000,
+                 max_edits_per_second: float = 25.0, burst: Optional[Callable[[], bool]] = None,
+                 burst_edits_per_second: float = 2.0):
+        self.bot = bot
+        self.render_cache = render_cache
+        self.render_list = render_list
+        self.interval = interval
+        self.view_ttl = view_ttl
+        self.max_views = max_views
+        self.edits_per_run = max(1, int(max_edits_per_second * interval))
+        self.burst = burst
+        self.burst_edits_per_run = burst_edits_per_second * interval
+        self.pushed = 0
+        self.deferred = 0
+        # (chat, message) -> [shipment type, expires at, fingerprint shown]
+        self._views: 'OrderedDict[Tuple[int, int], List]' = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._retry_at = 0.0
+        # Fractional burst edits carried over between runs
+        self._burst_credit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def open_view(self, shipment_type: str, chat_id: int, message_id: int):
+        """Register a list message the bot has just rendered through the render cache."""
+        shown = self.render_cache.current(chat_id, message_id)
+        if shown is None:
+            return
+        key = (chat_id, message_id)
+        if not self._views:
+            # The loop sleeps while there is nothing to watch
+            self._wakeup.set()
+        self._views[key] = [shipment_type, time.monotonic() + self.view_ttl, shown]
+        self._views.move_to_end(key)
+        if len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+
+    def notify(self):
+        """The catalog has changed; push it to open views on the next run."""
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            if not self._views:
+                await self._wakeup.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            started = time.monotonic()
+            try:
+                await self.push()
+            except Exception:
+                logger.exception("Catalog push failed")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    async def push(self) -> int:
+        """Bring open views up to date; return the number of edits sent."""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return 0
+
+        budget = self.edits_per_run
+        in_burst = self.burst is not None and self.burst()
+        if in_burst:
+            self._burst_credit = min(
+                self._burst_credit + self.burst_edits_per_run, max(1.0, self.burst_edits_per_run)
+            )
+            budget = int(self._burst_credit)
+
+        by_type: Dict[str, List[Tuple[int, int]]] = {}
+        for key, view in list(self._views.items()):
+            if view[1] <= now:
+                del self._views[key]
+            else:
+                by_type.setdefault(view[0], []).append(key)
+
+        edits = []
+        for shipment_type, keys in by_type.items():
+            text, reply_markup = await self.render_list(shipment_type)
+            target = fingerprint(text, reply_markup, PARSE_MODE)
+            for key in reversed(keys):
+                view = self._views.get(key)
+                if view is None or view[2] == target:
+                    continue
+                if self.render_cache.current(*key) != view[2]:
+                    del self._views[key]
+                    continue
+                if not budget:
+                    self.deferred += 1
+                    continue
+                budget -= 1
+                edits.append(self._edit(key, view, text, reply_markup, target))
+
+        if in_burst:
+            self._burst_credit -= len(edits)
+        sent = sum(await asyncio.gather(*edits))
+        self.pushed += sent
+        return sent
+
+    async def _edit(self, key: Tuple[int, int], view: List, text: str,
+                    reply_markup: InlineKeyboardMarkup, target: bytes) -> int:
+        try:
+            edited = await self.render_cache.edit_reply_markup(
+                self.bot, *key, text, reply_markup, PARSE_MODE, expected=view[2]
+            )
+        except TelegramRetryAfter as e:
+            # Keep the view, nothing goes out until Telegram allows it
+            self._retry_at = max(self._retry_at, time.monotonic() + e.retry_after)
+            logger.warning(f"Catalog push throttled for {e.retry_after}s")
+            return 0
+        except TelegramAPIError as e:
+            logger.debug(f"Catalog view {key} dropped: {e}")
+            self._views.pop(key, None)
+            return 0
+
+        if not edited:
+            # The message changed while the list was being rendered
+            self._views.pop(key, None)
+            return 0
+        view[2] = target
+        return 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'catalog_views': len(self._views),
+            'catalog_edits': self.pushed,
+            'catalog_deferred': self.deferred,
+        }
@@ -7,9 +7,42 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 ADMIN_IDS = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip()]
 BOOKING_TIME = os.getenv('BOOKING_TIME', '11:30')
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot.db')
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+STATE_STORAGE = os.getenv('STATE_STORAGE', 'memory')
+REDIS_STATE_TTL = int(os.getenv('REDIS_STATE_TTL', '86400'))
+REDIS_TEST_SESSION_TTL = int(os.getenv('REDIS_TEST_SESSION_TTL', '3600'))
+REDIS_TIMER_TTL = int(os.getenv('REDIS_TIMER_TTL', '600'))
 TEST_MODE_ENABLED = os.getenv('TEST_MODE_ENABLED', 'true').lower() == 'true'
 MAX_USERS_PER_SHIPMENT = int(os.getenv('MAX_USERS_PER_SHIPMENT', '1'))
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', 'false').lower() == 'true'
+LOOP_STALL_THRESHOLD_MS = float(os.getenv('LOOP_STALL_THRESHOLD_MS', '20'))
+LOOP_MONITOR_REPORT_SECONDS = int(os.getenv('LOOP_MONITOR_REPORT_SECONDS', '60'))
+EVENT_LOOP = os.getenv('EVENT_LOOP', 'auto')
+BOOKING_ENGINE_ENABLED = os.getenv('BOOKING_ENGINE_ENABLED', 'true').lower() == 'true'
+# Next to the SQLite file by default, so whatever keeps the database keeps the journal too
+_SQLITE_PATH = DATABASE_URL[len('sqlite:///'):] if DATABASE_URL.startswith('sqlite://') else ''
+BOOKING_JOURNAL_PATH = os.getenv(
+    'BOOKING_JOURNAL_PATH',
+    os.path.join(os.path.dirname(_SQLITE_PATH), 'bookings.journal')
+)
+BOOKING_GROUP_COMMIT_MS = float(os.getenv('BOOKING_GROUP_COMMIT_MS', '0'))
+BOOKING_SNAPSHOT_SECONDS = int(os.getenv('BOOKING_SNAPSHOT_SECONDS', '30'))
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', str(os.cpu_count() or 1)))
+BOOKING_SERVICE_SOCKET = os.getenv('BOOKING_SERVICE_SOCKET', 'booking.sock')
+UPDATE_SCHEDULER_ENABLED = os.getenv('UPDATE_SCHEDULER_ENABLED', 'true').lower() == 'true'
+UPDATE_CRITICAL_WORKERS = int(os.getenv('UPDATE_CRITICAL_WORKERS', '16'))
+UPDATE_NORMAL_WORKERS = int(os.getenv('UPDATE_NORMAL_WORKERS', '32'))
+UPDATE_QUEUE_SIZE = int(os.getenv('UPDATE_QUEUE_SIZE', '1000'))
+CALLBACK_DEDUP_SECONDS = float(os.getenv('CALLBACK_DEDUP_SECONDS', '1'))
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '10000'))
+CATALOG_PUSH_ENABLED = os.getenv('CATALOG_PUSH_ENABLED', 'true').lower() == 'true'
+CATALOG_PUSH_INTERVAL = float(os.getenv('CATALOG_PUSH_INTERVAL', '1'))
+CATALOG_VIEW_TTL = float(os.getenv('CATALOG_VIEW_TTL', '120'))
+CATALOG_MAX_VIEWS = int(os.getenv('CATALOG_MAX_VIEWS', '5000'))
+CATALOG_PUSH_RATE = float(os.getenv('CATALOG_PUSH_RATE', '25'))
+CATALOG_BURST_SECONDS = int(os.getenv('CATALOG_BURST_SECONDS', '120'))
+CATALOG_BURST_PUSH_RATE = float(os.getenv('CATALOG_BURST_PUSH_RATE', '2'))
 
 WELCOME_IMAGE_PATH = '5445047061721511293.jpg'
 
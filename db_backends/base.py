@@ -0,0 +1,108 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+
+BOOKED_MESSAGE = "Перевозка успешно забронирована!"
+TAKEN_MESSAGE = "К сожалению, перевозка уже забронирована"
+NOT_FOUND_MESSAGE = "Перевозка не найдена"
+
+
+class DatabaseBackend(ABC):
+    """Storage operations used by the bot.
+
+    Rows are returned as plain dicts with the columns of the SQLite schema,
+    timestamps as ISO strings, so handlers do not depend on the backend.
+    """
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def init_db(self):
+        ...
+
+    @abstractmethod
+    async def add_user(self, user_id: int, username: Optional[str], first_name: Optional[str]):
+        ...
+
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_user_ids(self) -> List[int]:
+        ...
+
+    @abstractmethod
+    async def add_shipment(self, shipment_type: str, city: str, quantity: int, is_test: bool = False) -> int:
+        ...
+
+    @abstractmethod
+    async def get_shipments(self, shipment_type: str, is_test: bool = False) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_shipment(self, shipment_id: int) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def book_shipment(self, shipment_id: int, user_id: int) -> Tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    async def get_user_bookings(self, user_id: int) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_booking_state(self) -> List[Tuple[int, int, Optional[int], Optional[str]]]:
+        """Return (id, is_booked, booked_by, booked_at) of every shipment."""
+
+    @abstractmethod
+    async def save_booking_state(self, rows: Iterable[Tuple[int, Optional[int], Optional[str], int]]):
+        """Write (is_booked, booked_by, booked_at, id) rows in one transaction."""
+
+    @abstractmethod
+    async def add_log(self, user_id: int, action: str, response_time_ms: Optional[float] = None,
+                      success: bool = True, is_test_mode: bool = False, test_stage: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    async def create_test_session(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def update_test_session_start(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def complete_test_session(self, user_id: int, stage1_ms: float, stage2_ms: float, total_ms: float):
+        ...
+
+    @abstractmethod
+    async def get_test_sessions(self, user_id: Optional[int] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def reset_bookings(self):
+        ...
+
+    @abstractmethod
+    async def get_stats(self) -> Dict:
+        ...
+
+    @abstractmethod
+    async def get_user_logs(self, user_id: int, limit: int = 50) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def count_shipments(self, is_test: bool = False) -> int:
+        ...
+
+    async def initialize_default_shipments(self):
+        if await self.count_shipments() == 0:
+            for shipment in config.DEFAULT_SHIPMENTS['direct']:
+                await self.add_shipment('direct', shipment['city'], shipment['quantity'])
+
+            for shipment in config.DEFAULT_SHIPMENTS['main']:
+                await self.add_shipment('main', shipment['city'], shipment['quantity'])
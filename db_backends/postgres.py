@@ -0,0 +1,227 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .base import BOOKED_MESSAGE, NOT_FOUND_MESSAGE, TAKEN_MESSAGE, DatabaseBackend
+
+# Same text format as SQLite's CURRENT_TIMESTAMP
+NOW = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+
+class PostgresBackend(DatabaseBackend):
+    """PostgreSQL server database behind an asyncpg connection pool.
+
+    Requires the ``asyncpg`` package (``pip install asyncpg``).
+    """
+
+    def __init__(self, url: str, min_size: int = 2, max_size: int = 10):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        import asyncpg
+                    except ImportError:
+                        raise RuntimeError("PostgreSQL DATABASE_URL requires asyncpg: pip install asyncpg")
+                    self._pool = await asyncpg.create_pool(
+                        self.url, min_size=self.min_size, max_size=self.max_size
+                    )
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _execute(self, query: str, *args):
+        return await (await self.pool()).execute(query, *args)
+
+    async def _fetch(self, query: str, *args) -> List[Dict]:
+        return [dict(row) for row in await (await self.pool()).fetch(query, *args)]
+
+    async def _fetchrow(self, query: str, *args) -> Optional[Dict]:
+        row = await (await self.pool()).fetchrow(query, *args)
+        return dict(row) if row else None
+
+    async def _fetchval(self, query: str, *args):
+        return await (await self.pool()).fetchval(query, *args)
+
+    async def init_db(self):
+        async with (await self.pool()).acquire() as connection:
+            await connection.execute(f'''
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id BIGINT PRIMARY KEY,
+                    username TEXT,
+                    first_name TEXT,
+                    registration_date TEXT DEFAULT {NOW}
+                );
+
+                CREATE TABLE IF NOT EXISTS shipments (
+                    id SERIAL PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    is_booked INTEGER DEFAULT 0,
+                    booked_by BIGINT,
+                    booked_at TEXT,
+                    is_test INTEGER DEFAULT 0
+                );
+
+                CREATE TABLE IF NOT EXISTS logs (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT,
+                    action TEXT,
+                    timestamp TEXT DEFAULT {NOW},
+                    response_time_ms DOUBLE PRECISION,
+                    success INTEGER,
+                    is_test_mode INTEGER DEFAULT 0,
+                    test_stage TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS test_sessions (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT,
+                    test_start_time TEXT,
+                    start_command_time TEXT,
+                    selection_time TEXT,
+                    total_time_ms DOUBLE PRECISION,
+                    stage1_time_ms DOUBLE PRECISION,
+                    stage2_time_ms DOUBLE PRECISION
+                );
+
+                CREATE INDEX IF NOT EXISTS shipments_type_idx ON shipments (type, is_test, id);
+                CREATE INDEX IF NOT EXISTS shipments_booked_by_idx ON shipments (booked_by);
+                CREATE INDEX IF NOT EXISTS logs_user_idx ON logs (user_id, timestamp);
+                CREATE INDEX IF NOT EXISTS test_sessions_user_idx ON test_sessions (user_id, id);
+            ''')
+
+    async def add_user(self, user_id: int, username: Optional[str], first_name: Optional[str]):
+        await self._execute(
+            'INSERT INTO users (user_id, username, first_name) VALUES ($1, $2, $3) ON CONFLICT DO NOTHING',
+            user_id, username, first_name
+        )
+
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        return await self._fetchrow('SELECT * FROM users WHERE user_id = $1', user_id)
+
+    async def get_user_ids(self) -> List[int]:
+        return [row['user_id'] for row in await self._fetch('SELECT user_id FROM users')]
+
+    async def add_shipment(self, shipment_type: str, city: str, quantity: int, is_test: bool = False) -> int:
+        return await self._fetchval(
+            'INSERT INTO shipments (type, city, quantity, is_test) VALUES ($1, $2, $3, $4) RETURNING id',
+            shipment_type, city, quantity, 1 if is_test else 0
+        )
+
+    async def get_shipments(self, shipment_type: str, is_test: bool = False) -> List[Dict]:
+        return await self._fetch(
+            'SELECT * FROM shipments WHERE type = $1 AND is_test = $2 ORDER BY id',
+            shipment_type, 1 if is_test else 0
+        )
+
+    async def get_shipment(self, shipment_id: int) -> Optional[Dict]:
+        return await self._fetchrow('SELECT * FROM shipments WHERE id = $1', shipment_id)
+
+    async def book_shipment(self, shipment_id: int, user_id: int) -> Tuple[bool, str]:
+        booked = await self._fetchval(
+            '''UPDATE shipments SET is_booked = 1, booked_by = $1, booked_at = $2
+               WHERE id = $3 AND is_booked = 0 RETURNING id''',
+            user_id, datetime.now().isoformat(), shipment_id
+        )
+        if booked is not None:
+            return True, BOOKED_MESSAGE
+
+        row = await self._fetchrow('SELECT booked_by FROM shipments WHERE id = $1', shipment_id)
+        if row is None:
+            return False, NOT_FOUND_MESSAGE
+        if row['booked_by'] == user_id:
+            return True, BOOKED_MESSAGE
+        return False, TAKEN_MESSAGE
+
+    async def get_user_bookings(self, user_id: int) -> List[Dict]:
+        return await self._fetch(
+            'SELECT * FROM shipments WHERE booked_by = $1 ORDER BY booked_at DESC',
+            user_id
+        )
+
+    async def get_booking_state(self) -> List[Tuple[int, int, Optional[int], Optional[str]]]:
+        rows = await (await self.pool()).fetch('SELECT id, is_booked, booked_by, booked_at FROM shipments')
+        return [tuple(row) for row in rows]
+
+    async def save_booking_state(self, rows: Iterable[Tuple[int, Optional[int], Optional[str], int]]):
+        async with (await self.pool()).acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany(
+                    'UPDATE shipments SET is_booked = $1, booked_by = $2, booked_at = $3 WHERE id = $4',
+                    list(rows)
+                )
+
+    async def add_log(self, user_id: int, action: str, response_time_ms: Optional[float] = None,
+                      success: bool = True, is_test_mode: bool = False, test_stage: Optional[str] = None):
+        await self._execute(
+            '''INSERT INTO logs (user_id, action, response_time_ms, success, is_test_mode, test_stage)
+               VALUES ($1, $2, $3, $4, $5, $6)''',
+            user_id, action, response_time_ms, 1 if success else 0, 1 if is_test_mode else 0, test_stage
+        )
+
+    async def create_test_session(self, user_id: int) -> int:
+        return await self._fetchval(
+            'INSERT INTO test_sessions (user_id, test_start_time) VALUES ($1, $2) RETURNING id',
+            user_id, datetime.now().isoformat()
+        )
+
+    async def update_test_session_start(self, user_id: int):
+        await self._execute(
+            '''UPDATE test_sessions
+               SET start_command_time = $1
+               WHERE id = (SELECT id FROM test_sessions WHERE user_id = $2 ORDER BY id DESC LIMIT 1)''',
+            datetime.now().isoformat(), user_id
+        )
+
+    async def complete_test_session(self, user_id: int, stage1_ms: float, stage2_ms: float, total_ms: float):
+        await self._execute(
+            '''UPDATE test_sessions
+               SET selection_time = $1, stage1_time_ms = $2, stage2_time_ms = $3, total_time_ms = $4
+               WHERE id = (SELECT id FROM test_sessions WHERE user_id = $5 ORDER BY id DESC LIMIT 1)''',
+            datetime.now().isoformat(), stage1_ms, stage2_ms, total_ms, user_id
+        )
+
+    async def get_test_sessions(self, user_id: Optional[int] = None) -> List[Dict]:
+        if user_id:
+            return await self._fetch(
+                'SELECT * FROM test_sessions WHERE user_id = $1 ORDER BY id DESC', user_id
+            )
+        return await self._fetch('SELECT * FROM test_sessions ORDER BY id DESC')
+
+    async def reset_bookings(self):
+        await self._execute('UPDATE shipments SET is_booked = 0, booked_by = NULL, booked_at = NULL')
+
+    async def get_stats(self) -> Dict:
+        row = await self._fetchrow('''
+            SELECT
+                (SELECT COUNT(*) FROM users) AS users_count,
+                (SELECT COUNT(*) FROM shipments WHERE is_booked = 1) AS bookings_count,
+                (SELECT AVG(response_time_ms) FROM logs WHERE response_time_ms IS NOT NULL) AS avg_time
+        ''')
+        return {
+            'users_count': row['users_count'],
+            'bookings_count': row['bookings_count'],
+            'avg_response_time': row['avg_time'] or 0
+        }
+
+    async def get_user_logs(self, user_id: int, limit: int = 50) -> List[Dict]:
+        return await self._fetch(
+            'SELECT * FROM logs WHERE user_id = $1 ORDER BY timestamp DESC LIMIT $2',
+            user_id, limit
+        )
+
+    async def count_shipments(self, is_test: bool = False) -> int:
+        return await self._fetchval(
+            'SELECT COUNT(*) FROM shipments WHERE is_test = $1', 1 if is_test else 0
+        )
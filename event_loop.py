@@ -0,0 +1,358 @@
+"""Event loop selection and lag/GC pause monitor shared by the bot and the client.
+
+Only the standard library is required, so both ``bot.py`` and ``main.py`` can
+use it. ``install_event_loop`` switches to uvloop when it is installed:
+
+    install_event_loop("auto")
+    asyncio.run(main())
+
+The monitor runs inside the loop:
+
+    monitor = LoopMonitor(stall_threshold_ms=20, capture_stacks=True)
+    monitor.start()
+    ...
+    report = await monitor.stop()
+    for line in format_report(report):
+        logger.info(line)
+"""
+
+import asyncio
+import bisect
+import gc
+import heapq
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Accepted values of the --loop / EVENT_LOOP option
+LOOP_CHOICES = ("auto", "uvloop", "asyncio")
+
+# Upper bounds of the histogram buckets in milliseconds
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+def install_event_loop(preference: str = "auto") -> str:
+    """Install the event loop policy used by the next ``asyncio.run``.
+
+    Args:
+        preference: "auto" (uvloop if installed), "uvloop" or "asyncio"
+
+    Returns:
+        Name of the installed implementation, "uvloop" or "asyncio"
+    """
+    if preference not in LOOP_CHOICES:
+        raise ValueError(f"Unknown event loop {preference!r}, expected one of {LOOP_CHOICES}")
+
+    if preference != "asyncio":
+        try:
+            import uvloop
+        except ImportError:
+            if preference == "uvloop":
+                logging.getLogger(__name__).warning(
+                    "uvloop is not installed, falling back to the asyncio event loop"
+                )
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            return "uvloop"
+
+    asyncio.set_event_loop_policy(asyncio.DefaultEventLoopPolicy())
+    return "asyncio"
+
+
+def available_event_loops() -> List[str]:
+    """Return the loop implementations that can be installed here."""
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return ["asyncio"]
+    return ["asyncio", "uvloop"]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in milliseconds."""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS, keep_samples: int = 100_000):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.samples: Deque[float] = deque(maxlen=keep_samples)
+        self.total = 0
+        self.max_ms = 0.0
+
+    def add(self, value_ms: float) -> None:
+        """Record one duration.
+
+        Args:
+            value_ms: Duration in milliseconds
+        """
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.samples.append(value_ms)
+        self.total += 1
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Get a percentile of the kept samples.
+
+        Args:
+            percentile: Percentile between 0 and 100
+
+        Returns:
+            Duration in milliseconds, or None if nothing was recorded
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(len(ordered) * percentile / 100), len(ordered) - 1)
+        return round(ordered[index], 3)
+
+    def buckets(self) -> Dict[str, int]:
+        """Get the non-empty histogram buckets.
+
+        Returns:
+            Sample count by bucket label, e.g. ``{"<=1ms": 950}``
+        """
+        labels = [f"<={bound}ms" for bound in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "p999_ms": self.percentile(99.9),
+            "max_ms": round(self.max_ms, 3),
+            "histogram": self.buckets(),
+        }
+
+
+class LoopMonitor:
+    """Measures event loop scheduling lag and GC pauses.
+
+    A sampler task sleeps for ``interval_ms`` and records how late it wakes
+    up. GC pauses are timed through ``gc.callbacks``. Stalls longer than
+    ``stall_threshold_ms`` are kept as worst offenders, tagged with the GC
+    pauses that overlapped them; with ``capture_stacks`` a watchdog thread
+    samples the loop thread's stack while the stall is still in progress.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = 1.0,
+        stall_threshold_ms: float = 50.0,
+        capture_stacks: bool = False,
+        max_stalls: int = 10
+    ):
+        """Initialize the monitor.
+
+        Args:
+            interval_ms: Sampler sleep interval
+            stall_threshold_ms: Lag from which a wake-up counts as a stall
+            capture_stacks: Sample the loop thread's stack during stalls
+            max_stalls: Number of worst stalls kept for the report
+        """
+        self.interval = interval_ms / 1000.0
+        self.stall_threshold_ms = stall_threshold_ms
+        self.capture_stacks = capture_stacks
+        self.max_stalls = max_stalls
+
+        self.lag = LatencyHistogram()
+        self.gc_pauses = LatencyHistogram()
+        self.gc_by_generation: Dict[int, List[float]] = {0: [], 1: [], 2: []}
+        self.stalls: List[tuple] = []
+
+        self._task: Optional[asyncio.Task] = None
+        self._gc_start = 0.0
+        self._gc_log: Deque[tuple] = deque(maxlen=4096)
+        self._heartbeat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._stack: Optional[str] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._running = False
+        self._stall_seq = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        """Start sampling in the running event loop."""
+        if self._running:
+            return
+
+        self._running = True
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        gc.callbacks.append(self._on_gc)
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+
+        if self.capture_stacks:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-monitor-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> dict:
+        """Stop sampling.
+
+        Returns:
+            Report of the monitored period
+        """
+        if self._running:
+            self._running = False
+            gc.callbacks.remove(self._on_gc)
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            if self._watchdog is not None:
+                self._watchdog.join()
+                self._watchdog = None
+
+        return self.report()
+
+    def reset(self) -> None:
+        """Forget collected samples, keeping the monitor running."""
+        self.lag = LatencyHistogram()
+        self.gc_pauses = LatencyHistogram()
+        self.gc_by_generation = {0: [], 1: [], 2: []}
+        self.stalls = []
+
+    def report(self) -> dict:
+        """Build a report of lag, GC pauses and the worst stalls."""
+        worst = [stall for _, _, stall in sorted(self.stalls, reverse=True)]
+
+        return {
+            "loop_lag": self.lag.summary(),
+            "gc": {
+                **self.gc_pauses.summary(),
+                "by_generation": {
+                    generation: {
+                        "count": len(pauses),
+                        "total_ms": round(sum(pauses), 3),
+                        "max_ms": round(max(pauses), 3) if pauses else 0.0,
+                    }
+                    for generation, pauses in self.gc_by_generation.items()
+                },
+            },
+            "stall_threshold_ms": self.stall_threshold_ms,
+            "worst_stalls": worst,
+        }
+
+    async def _sample(self) -> None:
+        interval = self.interval
+        perf_counter = time.perf_counter
+
+        while True:
+            expected = perf_counter() + interval
+            self._heartbeat = expected
+            await asyncio.sleep(interval)
+            woke = perf_counter()
+            lag_ms = max(woke - expected, 0.0) * 1000
+            self.lag.add(lag_ms)
+
+            if lag_ms >= self.stall_threshold_ms:
+                self._record_stall(expected, woke, lag_ms)
+
+            self._stack = None
+
+    def _record_stall(self, expected: float, woke: float, lag_ms: float) -> None:
+        """Keep a stall if it is among the worst ones.
+
+        Args:
+            expected: ``perf_counter`` time the sampler should have woken at
+            woke: ``perf_counter`` time it actually woke at
+            lag_ms: Wake-up lag in milliseconds
+        """
+        gc_ms = [
+            duration_ms for _, end, duration_ms in self._gc_log
+            if end >= expected and end - duration_ms / 1000 <= woke
+        ]
+        stall = {
+            "lag_ms": round(lag_ms, 3),
+            "at": time.strftime("%H:%M:%S"),
+            "gc_pauses": len(gc_ms),
+            "gc_ms": round(sum(gc_ms), 3),
+            "stack": self._stack,
+        }
+
+        self._stall_seq += 1
+        entry = (lag_ms, self._stall_seq, stall)
+        if len(self.stalls) < self.max_stalls:
+            heapq.heappush(self.stalls, entry)
+        else:
+            heapq.heappushpop(self.stalls, entry)
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        """Time a collection (``gc.callbacks`` hook).
+
+        Args:
+            phase: ``"start"`` or ``"stop"``
+            info: Collection details from the interpreter
+        """
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+            return
+
+        end = time.perf_counter()
+        duration_ms = (end - self._gc_start) * 1000
+        generation = info.get("generation", 0)
+
+        self.gc_pauses.add(duration_ms)
+        self.gc_by_generation.setdefault(generation, []).append(duration_ms)
+        self._gc_log.append((generation, end, duration_ms))
+
+    def _watch(self) -> None:
+        """Sample the loop thread's stack while it is stalled.
+
+        Runs in the watchdog thread until the monitor stops; the stack is
+        captured once per stall and cleared by the sampler.
+        """
+        threshold = self.stall_threshold_ms / 1000.0
+        period = max(threshold / 4, 0.001)
+
+        while self._running:
+            time.sleep(period)
+            overdue = time.perf_counter() - self._heartbeat
+
+            if overdue >= threshold and self._stack is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._stack = "".join(traceback.format_stack(frame, limit=12))
+
+
+def format_report(report: dict, top: int = 3) -> List[str]:
+    """Render a monitor report as log lines.
+
+    Args:
+        report: Report from ``LoopMonitor.report``
+        top: Number of worst stalls to include
+
+    Returns:
+        Lines ready for logging
+    """
+    lag = report["loop_lag"]
+    gc_report = report["gc"]
+    lines = [
+        f"Loop lag: p50={lag['p50_ms']}ms, p99={lag['p99_ms']}ms, "
+        f"p99.9={lag['p999_ms']}ms, max={lag['max_ms']}ms ({lag['count']} samples)",
+        f"Loop lag histogram: {lag['histogram']}",
+        f"GC pauses: {gc_report['count']} total, p99={gc_report['p99_ms']}ms, "
+        f"max={gc_report['max_ms']}ms, by generation {gc_report['by_generation']}",
+    ]
+
+    stalls = report["worst_stalls"][:top]
+    if not stalls:
+        lines.append(f"No loop stalls over {report['stall_threshold_ms']}ms")
+
+    for stall in stalls:
+        cause = f", {stall['gc_pauses']} GC pauses ({stall['gc_ms']}ms)" if stall["gc_pauses"] else ""
+        lines.append(f"Loop stall {stall['lag_ms']}ms at {stall['at']}{cause}")
+        if stall["stack"]:
+            lines.append(stall["stack"].rstrip())
+
+    return lines
@@ -17,6 +17,8 @@ from auto_booking import (
     get_logger,
     Notifier
 )
+from auto_booking.core.warmup import freeze_gc, release_gc, warm_up
+from event_loop import LOOP_CHOICES, LoopMonitor, format_report, install_event_loop
 
 
 logger = get_logger(__name__)
@@ -37,8 +39,12 @@ class AutoBookingApp:
         self.bot_handler = None
         self.scheduler = None
         self.notifier = None
+        self.target_patterns = []
         self.session_manager = SessionManager()
         self.session_id = str(uuid.uuid4())
+        self.warm_up_report: Optional[dict] = None
+        self._gc_frozen = False
+        self.loop_monitor: Optional[LoopMonitor] = None
 
     async def initialize(self) -> bool:
         """Initialize all components.
@@ -60,27 +66,48 @@ class AutoBookingApp:
                 self.settings.telegram.session_name
             )
 
+            # The in-memory session keeps Telethon's state writes off the disk
+            session = None
+            if self.settings.telegram.in_memory_session:
+                session = self.session_manager.load_memory_session(
+                    self.settings.telegram.session_name
+                )
+
             self.client = BookingClient(
                 api_id=self.settings.telegram.api_id,
                 api_hash=self.settings.telegram.api_hash,
                 phone=self.settings.telegram.phone,
-                session_name=session_path
+                session_name=session_path,
+                session=session
             )
 
             if not await self.client.initialize():
                 logger.error("Failed to initialize Telegram client")
                 return False
 
-            # Initialize bot handler
-            target_cities = []
-            for target in self.settings.targets:
-                target_cities.extend(target.cities)
+            self.persist_session()
+
+            if self.settings.booking.record_dir:
+                self.client.start_recording(
+                    f"{self.settings.booking.record_dir}/"
+                    f"booking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.rec"
+                )
+
+            # Initialize bot handler; targets are compiled once here
+            self.target_patterns = []
+            for target in sorted(self.settings.targets, key=lambda x: x.priority):
+                self.target_patterns.extend(target.cities)
 
             self.bot_handler = BotHandler(
                 client=self.client,
                 bot_username=self.settings.bot.username,
                 sms_trigger_text=self.settings.bot.sms_trigger_text,
-                target_cities=target_cities
+                target_cities=self.target_patterns,
+                targets=self.settings.targets,
+                fallback_to_any=self.settings.booking.fallback_to_any,
+                speculative_mode=self.settings.booking.speculative_mode,
+                trace_dir=self.settings.booking.trace_dir,
+                performance=self.settings.performance
             )
 
             await self.bot_handler.initialize()
@@ -117,28 +144,28 @@ class AutoBookingApp:
             "polling_interval_ms": self.settings.performance.polling_interval_ms
         })
 
+        await self.bot_handler.prepare_fast_path()
+        await self.warm_up()
+
         # Start monitoring immediately
         logger.info("Monitoring for SMS notification...")
         logger.info("Please trigger the test mode in the bot (send 🧪 Тест button)")
+        self.client.mark("monitoring_start")
+        self.start_loop_monitor()
 
         sms_message = await self.bot_handler.monitor_sms(
             polling_interval_ms=self.settings.performance.polling_interval_ms,
-            timeout_seconds=300  # 5 minutes timeout for testing
+            timeout_seconds=300,  # 5 minutes timeout for testing
+            event_driven=self.settings.booking.event_driven
         )
 
         if sms_message:
             logger.info("SMS notification detected! Starting booking sequence...")
 
-            # Get target shipment patterns
-            target_patterns = []
-            for target in sorted(self.settings.targets, key=lambda x: x.priority):
-                target_patterns.extend(target.cities)
-
             # Execute booking
-            stats = await self.bot_handler.execute_booking_sequence(
-                sms_message,
-                target_patterns
-            )
+            stats = await self.bot_handler.execute_booking_sequence(sms_message)
+            self.release_gc()
+            await self.stop_loop_monitor()
 
             # Notify user
             await self.notifier.notify_booking_result(stats)
@@ -196,47 +223,61 @@ class AutoBookingApp:
 
             await asyncio.sleep(1)
 
-        print()  # New line after countdown
+        self.notifier.end_countdown()
         logger.info("⚡ Preparation phase started!")
 
         # Send initial /start to prepare the bot
         await self.client.send_message(self.settings.bot.username, "/start")
         logger.info("Preparation /start sent")
 
-        await asyncio.sleep(1)
+        await self.bot_handler.prepare_fast_path()
+
+        if self.settings.booking.speculative_mode:
+            await asyncio.sleep(1)
+            await self.bot_handler.snapshot_menu()
+
+        await self.warm_up()
 
-        # Wait until monitoring start time
+        # Wait until monitoring start time, keeping the connection warm
         monitoring_start = target_datetime - timedelta(
             seconds=self.settings.booking.monitoring_start_seconds
         )
 
+        warm_up_task = asyncio.create_task(
+            self.client.keep_warm(
+                until=monitoring_start,
+                interval_ms=self.settings.booking.keepalive_interval_ms,
+                degradation_factor=self.settings.booking.rtt_degradation_factor
+            )
+        )
+
         while datetime.now() < monitoring_start:
             seconds_remaining = int((monitoring_start - datetime.now()).total_seconds())
             self.notifier.print_countdown(seconds_remaining, "preparation")
             await asyncio.sleep(0.1)
 
-        print()  # New line
+        self.notifier.end_countdown()
+        latency_report = await warm_up_task
+        self._log_latency_report(latency_report)
+
         logger.info("🔍 Intensive monitoring started!")
+        self.client.mark("monitoring_start")
+        self.start_loop_monitor()
 
         # Start SMS monitoring
         sms_message = await self.bot_handler.monitor_sms(
             polling_interval_ms=self.settings.performance.polling_interval_ms,
-            timeout_seconds=self.settings.booking.monitoring_start_seconds + 10
+            timeout_seconds=self.settings.booking.monitoring_start_seconds + 10,
+            event_driven=self.settings.booking.event_driven
         )
 
         if sms_message:
             logger.info("📨 SMS notification detected! Starting booking sequence...")
 
-            # Get target shipment patterns
-            target_patterns = []
-            for target in sorted(self.settings.targets, key=lambda x: x.priority):
-                target_patterns.extend(target.cities)
-
             # Execute booking
-            stats = await self.bot_handler.execute_booking_sequence(
-                sms_message,
-                target_patterns
-            )
+            stats = await self.bot_handler.execute_booking_sequence(sms_message)
+            self.release_gc()
+            await self.stop_loop_monitor()
 
             # Notify user
             await self.notifier.notify_booking_result(stats)
@@ -244,6 +285,89 @@ class AutoBookingApp:
         else:
             logger.warning("⚠️ No SMS notification detected within monitoring window")
 
+    async def warm_up(self) -> None:
+        """Warm up the booking code paths and freeze the GC for the attempt."""
+        booking = self.settings.booking
+
+        if booking.warm_up_rounds > 0:
+            logger.info("🔥 Warming up booking code paths...")
+            self.warm_up_report = await warm_up(
+                targets=sorted(self.settings.targets, key=lambda x: x.priority),
+                rounds=booking.warm_up_rounds,
+                speculative_mode=booking.speculative_mode,
+                fallback_to_any=booking.fallback_to_any,
+                sms_trigger_text=self.settings.bot.sms_trigger_text,
+                performance=self.settings.performance
+            )
+
+        if booking.freeze_gc:
+            freeze_gc(booking.gc_freeze_max_seconds)
+            self._gc_frozen = True
+
+    def release_gc(self) -> None:
+        """Re-enable automatic GC once the attempt is over."""
+        if self._gc_frozen:
+            release_gc()
+            self._gc_frozen = False
+
+    def start_loop_monitor(self) -> None:
+        """Start measuring event loop lag and GC pauses for the booking window."""
+        performance = self.settings.performance
+
+        if performance.loop_monitor and self.loop_monitor is None:
+            self.loop_monitor = LoopMonitor(
+                stall_threshold_ms=performance.loop_stall_threshold_ms,
+                capture_stacks=True
+            )
+            self.loop_monitor.start()
+
+    async def stop_loop_monitor(self) -> None:
+        """Stop the loop monitor and log its report."""
+        if self.loop_monitor is None:
+            return
+
+        report = await self.loop_monitor.stop()
+        self.loop_monitor = None
+
+        for line in format_report(report):
+            logger.info(line)
+
+    def persist_session(self) -> None:
+        """Flush the in-memory session to disk.
+
+        Only called outside the booking window: after login and on shutdown.
+        """
+        if self.client is None or self.client.session is None:
+            return
+
+        self.session_manager.flush_memory_session(
+            self.settings.telegram.session_name,
+            self.client.session
+        )
+
+    def _log_latency_report(self, report: dict) -> None:
+        """Log expected per-stage latency against configured budgets.
+
+        Args:
+            report: Latency report from BookingClient.keep_warm
+        """
+        logger.info(
+            f"RTT: p50={report['rtt_p50_ms']}ms, p90={report['rtt_p90_ms']}ms, "
+            f"p99={report['rtt_p99_ms']}ms ({report['samples']} samples, "
+            f"{report['reconnects']} reconnects)"
+        )
+        logger.info(f"RTT histogram: {report['rtt_histogram']}")
+
+        budgets = self.settings.performance
+        for stage, expected_ms in report["expected_stages_ms"].items():
+            budget_ms = getattr(budgets, stage)
+            if expected_ms is None:
+                logger.warning(f"Expected {stage}: unknown (no RTT samples)")
+            elif expected_ms > budget_ms:
+                logger.warning(f"Expected {stage}: {expected_ms}ms (budget {budget_ms}ms) ⚠️")
+            else:
+                logger.info(f"Expected {stage}: {expected_ms}ms (budget {budget_ms}ms)")
+
     async def run(self, mode: str = "immediate") -> None:
         """Run the application.
 
@@ -273,17 +397,24 @@ class AutoBookingApp:
         """Cleanup resources."""
         logger.info("Cleaning up...")
 
+        self.release_gc()
+        await self.stop_loop_monitor()
+
         if self.scheduler:
             self.scheduler.stop()
 
+        if self.notifier:
+            await self.notifier.close()
+
         if self.client:
             await self.client.disconnect()
+            self.persist_session()
 
         logger.info("Cleanup completed")
 
 
-async def main():
-    """Main function."""
+def parse_args():
+    """Parse command line arguments."""
     import argparse
 
     parser = argparse.ArgumentParser(
@@ -300,16 +431,29 @@ async def main():
         default="config.yaml",
         help="Path to configuration file (default: config.yaml)"
     )
+    parser.add_argument(
+        "--loop",
+        choices=LOOP_CHOICES,
+        default="auto",
+        help="Event loop implementation, auto picks uvloop when installed (default: auto)"
+    )
 
-    args = parser.parse_args()
+    return parser.parse_args()
 
+
+async def main(args, event_loop: str = "asyncio"):
+    """Main function."""
     app = AutoBookingApp(config_path=args.config)
+    logger.info(f"Event loop: {event_loop}")
     await app.run(mode=args.mode)
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    event_loop = install_event_loop(args.loop)
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args, event_loop))
     except KeyboardInterrupt:
         print("\n\nExiting...")
         sys.exit(0)
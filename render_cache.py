@@ -0,0 +1,146 @@
+"""Fingerprints of rendered messages, to skip edits that change nothing.
+
+Telegram rejects an edit whose text and keyboard equal what the message
+already shows ("message is not modified"), after a full round trip.
+``RenderCache`` remembers a fingerprint of the last content the bot put into
+each (chat, message), in a bounded LRU, and ``edit_text`` skips the request
+when the new content has the same fingerprint. Every edit of a message has
+to go through the cache, otherwise the remembered fingerprint goes stale.
+Handler edits of one message are serialised. A background keyboard update
+waits for them before it checks what the message shows, but sends its
+request without holding up the handlers that come after it.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                parse_mode: Optional[str] = None) -> bytes:
+    markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup else ''
+    content = '\0'.join((text, markup, parse_mode or ''))
+    return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+
+class RenderCache:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.edits = 0
+        self.skipped = 0
+        self.not_modified = 0
+        self._entries: 'OrderedDict[Tuple[int, int], bytes]' = OrderedDict()
+        # (chat, message) -> [lock, holders and waiters]
+        self._locks: Dict[Tuple[int, int], List] = {}
+
+    def remember(self, message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                 parse_mode: Optional[str] = None):
+        """Record the text message the bot has just sent or edited."""
+        self._store((message.chat.id, message.message_id), fingerprint(text, reply_markup, parse_mode))
+
+    def _store(self, key: Tuple[int, int], value: bytes):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, message: Message):
+        self._entries.pop((message.chat.id, message.message_id), None)
+
+    def current(self, chat_id: int, message_id: int) -> Optional[bytes]:
+        """Fingerprint of what the message shows, if the cache still knows it."""
+        return self._entries.get((chat_id, message_id))
+
+    def is_current(self, message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                   parse_mode: Optional[str] = None) -> bool:
+        key = (message.chat.id, message.message_id)
+        current = self._entries.get(key)
+        if current is None or current != fingerprint(text, reply_markup, parse_mode):
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    @asynccontextmanager
+    async def _locked(self, key: Tuple[int, int]):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def edit_text(self, message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                        parse_mode: Optional[str] = None) -> bool:
+        """Edit the message unless it already shows this content; return whether a request was sent."""
+        async with self._locked((message.chat.id, message.message_id)):
+            if self.is_current(message, text, reply_markup, parse_mode):
+                self.skipped += 1
+                return False
+
+            self.edits += 1
+            try:
+                await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+            except TelegramBadRequest as e:
+                # Content rendered before a restart or by another worker
+                if 'message is not modified' not in str(e):
+                    self.forget(message)
+                    raise
+                self.not_modified += 1
+            self.remember(message, text, reply_markup, parse_mode)
+            return True
+
+    async def edit_reply_markup(self, bot: Bot, chat_id: int, message_id: int, text: str,
+                                reply_markup: InlineKeyboardMarkup, parse_mode: Optional[str] = None,
+                                expected: Optional[bytes] = None) -> bool:
+        """Replace only the keyboard of a message whose ``text`` is unchanged.
+
+        With ``expected`` nothing is sent unless the message still shows the
+        content with that fingerprint.
+        """
+        key = (chat_id, message_id)
+        new = fingerprint(text, reply_markup, parse_mode)
+        async with self._locked(key):
+            current = self._entries.get(key)
+            if expected is not None and current != expected:
+                return False
+            if current == new:
+                self.skipped += 1
+                return False
+            # Recorded up front: a handler edit made meanwhile replaces it
+            self._store(key, new)
+
+        self.edits += 1
+        try:
+            await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+        except TelegramBadRequest as e:
+            if 'message is not modified' not in str(e):
+                if self._entries.get(key) == new:
+                    self._entries.pop(key, None)
+                raise
+            self.not_modified += 1
+        if self._entries.get(key) != new:
+            # A handler edited the message while this request was in flight
+            # and either may have landed last; the next edit must go out
+            self._entries.pop(key, None)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'edits_sent': self.edits,
+            'edits_skipped': self.skipped,
+            'edits_not_modified': self.not_modified,
+        }
@@ -0,0 +1,133 @@
+"""Per-user bot state kept outside the handlers.
+
+Test sessions and shipment timers used to live in module-level dicts of
+``bot.py``. ``MemoryStateStore`` keeps that behaviour; ``RedisStateStore``
+keeps them in Redis (``REDIS_URL``) with TTLs, so they survive restarts and
+are shared by worker processes. Every call is a single round trip, commands
+that belong together are pipelined.
+
+``create_stores`` builds the FSM storage and the state store on one Redis
+connection.
+"""
+
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+TEST_SESSION_INT_FIELDS = ('session_id',)
+
+
+class MemoryStateStore:
+    def __init__(self):
+        self.test_sessions: Dict[int, dict] = {}
+        self.timers: Dict[Tuple[int, int], float] = {}
+
+    async def start_timer(self, user_id: int, shipment_id: int):
+        self.timers[(user_id, shipment_id)] = time.time()
+
+    async def stop_timer(self, user_id: int, shipment_id: int) -> float:
+        started = self.timers.pop((user_id, shipment_id), None)
+        if started is None:
+            return 0.0
+        return round((time.time() - started) * 1000, 3)
+
+    async def get_test_session(self, user_id: int) -> Optional[dict]:
+        session = self.test_sessions.get(user_id)
+        return dict(session) if session is not None else None
+
+    async def update_test_session(self, user_id: int, **fields):
+        self.test_sessions.setdefault(user_id, {}).update(fields)
+
+    async def delete_test_session(self, user_id: int):
+        self.test_sessions.pop(user_id, None)
+
+    async def close(self):
+        pass
+
+
+class RedisStateStore:
+    def __init__(self, redis, session_ttl: int = 3600, timer_ttl: int = 600, prefix: str = 'bot'):
+        self.redis = redis
+        self.session_ttl = session_ttl
+        self.timer_ttl = timer_ttl
+        self.prefix = prefix
+
+    def _timer_key(self, user_id: int, shipment_id: int) -> str:
+        return f"{self.prefix}:timer:{user_id}:{shipment_id}"
+
+    def _session_key(self, user_id: int) -> str:
+        return f"{self.prefix}:test_session:{user_id}"
+
+    async def start_timer(self, user_id: int, shipment_id: int):
+        await self.redis.set(self._timer_key(user_id, shipment_id), repr(time.time()), ex=self.timer_ttl)
+
+    async def stop_timer(self, user_id: int, shipment_id: int) -> float:
+        started = await self.redis.getdel(self._timer_key(user_id, shipment_id))
+        if started is None:
+            return 0.0
+        return round((time.time() - float(started)) * 1000, 3)
+
+    async def get_test_session(self, user_id: int) -> Optional[dict]:
+        fields = await self.redis.hgetall(self._session_key(user_id))
+        if not fields:
+            return None
+
+        session = {}
+        for name, value in fields.items():
+            name = name.decode() if isinstance(name, bytes) else name
+            session[name] = int(value) if name in TEST_SESSION_INT_FIELDS else float(value)
+        return session
+
+    async def update_test_session(self, user_id: int, **fields):
+        key = self._session_key(user_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={name: repr(value) for name, value in fields.items()})
+            pipe.expire(key, self.session_ttl)
+            await pipe.execute()
+
+    async def delete_test_session(self, user_id: int):
+        await self.redis.delete(self._session_key(user_id))
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_stores(
+    backend: str = 'memory',
+    redis_url: Optional[str] = None,
+    state_ttl: int = 86400,
+    session_ttl: int = 3600,
+    timer_ttl: int = 600,
+    redis=None
+) -> Tuple[BaseStorage, object]:
+    """Build the FSM storage and the state store.
+
+    Args:
+        backend: 'memory' or 'redis'
+        redis_url: Redis connection URL for the 'redis' backend
+        state_ttl: TTL of FSM states and data in seconds
+        session_ttl: TTL of test sessions in seconds
+        timer_ttl: TTL of shipment timers in seconds
+        redis: Redis client to use instead of connecting to redis_url
+
+    Returns:
+        (FSM storage, state store)
+    """
+    if backend == 'memory':
+        return MemoryStorage(), MemoryStateStore()
+
+    if backend != 'redis':
+        raise ValueError(f"Unknown state storage {backend!r}, expected 'memory' or 'redis'")
+
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    if redis is None:
+        from redis.asyncio import Redis
+        redis = Redis.from_url(redis_url)
+
+    ttl = timedelta(seconds=state_ttl)
+    storage = RedisStorage(redis, state_ttl=ttl, data_ttl=ttl)
+    return storage, RedisStateStore(redis, session_ttl=session_ttl, timer_ttl=timer_ttl)
@@ -0,0 +1,59 @@
+"""Structured concurrency for handlers.
+
+``asyncio.TaskGroup`` needs Python 3.11 and the bot still runs on 3.10, so
+this is the small subset the handlers use: tasks started in the block are
+awaited when it exits, and the first failure, in a task or in the block
+itself, cancels the rest and is re-raised as is.
+"""
+
+import asyncio
+from typing import Awaitable, List
+
+
+class TaskGroup:
+    def __init__(self):
+        self._tasks: List[asyncio.Future] = []
+
+    def create_task(self, awaitable: Awaitable) -> asyncio.Future:
+        # ensure_future also takes aiogram methods, which are awaitable but not coroutines
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.append(task)
+        return task
+
+    async def __aenter__(self) -> 'TaskGroup':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            await self._cancel()
+            return False
+
+        try:
+            while True:
+                pending = [task for task in self._tasks if not task.done()]
+                if not pending:
+                    break
+                await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                failed = self._first_failure()
+                if failed is not None:
+                    await self._cancel()
+                    raise failed
+        except asyncio.CancelledError:
+            await self._cancel()
+            raise
+
+        failed = self._first_failure()
+        if failed is not None:
+            raise failed
+        return False
+
+    def _first_failure(self):
+        for task in self._tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                return task.exception()
+        return None
+
+    async def _cancel(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,905 @@
+#!/usr/bin/env python3
+"""Test script for the booking bot, driven through the local update harness."""
+
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault('BOT_TOKEN', '123456789:LOCAL_HARNESS_TOKEN')
+
+import config
+import database
+from aiogram.fsm.storage.base import StorageKey
+
+from booking_engine import BookingEngine
+from booking_service import BookingService, BookingServiceClient, BookingServiceError, ServiceStorage
+from callback_dedup import BY_ID, CallbackDeduplicator
+from db_backends import SQLiteBackend
+from bot_harness import BotHarness, FakeRedis, bot_module
+from render_cache import RenderCache
+from state_store import RedisStateStore
+from task_group import TaskGroup
+from update_scheduler import CRITICAL, NORMAL, UpdateScheduler, classify
+from workers import shard_for
+
+# Books random shipments from many concurrent users and prints every
+# confirmed booking once the engine has acknowledged it
+CRASH_WORKER = '''
+import asyncio, random, sys
+import database
+from booking_engine import BookingEngine
+from db_backends import SQLiteBackend
+
+database.use_backend(SQLiteBackend(sys.argv[1]))
+
+async def main():
+    engine = BookingEngine(sys.argv[2])
+    await engine.start()
+    shipments = sorted(engine.known)
+
+    async def user(user_id):
+        for shipment_id in random.sample(shipments, 20):
+            success, _ = await engine.book(shipment_id, user_id)
+            if success:
+                print(shipment_id, user_id, flush=True)
+
+    async def snapshots():
+        while True:
+            await asyncio.sleep(0.005)
+            await engine.snapshot()
+
+    asyncio.create_task(snapshots())
+    await asyncio.gather(*(user(user_id) for user_id in range(1, 301)))
+
+asyncio.run(main())
+'''
+
+
+def create_shipments(db_path: str, count: int) -> None:
+    database.use_backend(SQLiteBackend(db_path))
+    asyncio.run(database.init_db())
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            'INSERT INTO shipments (type, city, quantity) VALUES (?, ?, ?)',
+            [('direct', f'City{i}', 1) for i in range(count)]
+        )
+
+
+def test_bot_harness():
+    """Test feeding updates to the bot through the local harness."""
+    print("\n" + "=" * 60)
+    print("Testing Bot Harness")
+    print("=" * 60)
+
+    async def conversation():
+        harness = BotHarness()
+        await harness.start()
+        try:
+            await harness.send(1001, "/start")
+            await harness.press(1001, "direct_shipments")
+            return harness.session.calls
+        finally:
+            await harness.close()
+
+    calls = asyncio.run(conversation())
+    methods = [call.method for call in calls]
+
+    assert methods[0] in ("SendMessage", "SendPhoto")
+    assert "EditMessageText" in methods and "AnswerCallbackQuery" in methods
+    edit = next(call for call in calls if call.method == "EditMessageText")
+    assert edit.reply_markup.inline_keyboard
+    print(f"✓ Bot answered with {methods}")
+
+    return True
+
+
+def test_confirm_burst():
+    """Test that one user wins a shipment confirmed by many at once."""
+    print("\n" + "=" * 60)
+    print("Testing Confirm Burst")
+    print("=" * 60)
+
+    async def burst():
+        harness = BotHarness()
+        await harness.start()
+        try:
+            users = range(2001, 2051)
+            await asyncio.gather(*(harness.press(user_id, "confirm:1") for user_id in users))
+            replies = {user_id: harness.last_reply(user_id).text for user_id in users}
+
+            await harness.press(2001, "shipment:1")
+            detail = harness.last_reply(2001).text
+
+            await harness.engine.snapshot()
+            row = await database.get_shipment(1)
+            return replies, detail, row, harness.engine.commits
+        finally:
+            await harness.close()
+
+    replies, detail, row, commits = asyncio.run(burst())
+    winners = [user_id for user_id, text in replies.items() if "успешно" in text]
+
+    assert len(winners) == 1, winners
+    assert row['is_booked'] == 1 and row['booked_by'] == winners[0]
+    assert "уже забронирована" in detail
+    print(f"✓ User {winners[0]} won, {len(replies) - 1} rejected, {commits} journal commits")
+
+    return True
+
+
+def test_crash_recovery():
+    """Test that no confirmed booking is lost when the process is killed mid-burst."""
+    print("\n" + "=" * 60)
+    print("Testing Crash Recovery")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bot.db')
+        journal_path = os.path.join(tmp, 'bookings.journal')
+        create_shipments(db_path, 2000)
+
+        worker = subprocess.Popen(
+            [sys.executable, '-c', CRASH_WORKER, db_path, journal_path],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True
+        )
+
+        confirmed = []
+        for line in worker.stdout:
+            confirmed.append(tuple(map(int, line.split())))
+            if len(confirmed) >= 300:
+                worker.kill()
+                break
+
+        confirmed.extend(tuple(map(int, line.split())) for line in worker.stdout)
+        worker.wait()
+        assert worker.returncode != 0, "worker finished before it was killed"
+        print(f"✓ Worker killed after {len(confirmed)} confirmed bookings")
+
+        owners = dict(confirmed)
+        assert len(owners) == len(confirmed), "shipment confirmed to two users"
+
+        async def recover():
+            database.use_backend(SQLiteBackend(db_path))
+            engine = BookingEngine(journal_path)
+            await engine.start()
+            await engine.stop()
+            return engine.recovered
+
+        recovered = asyncio.run(recover())
+
+        with sqlite3.connect(db_path) as db:
+            booked = dict(db.execute('SELECT id, booked_by FROM shipments WHERE is_booked = 1'))
+
+        lost = {shipment_id: user_id for shipment_id, user_id in owners.items()
+                if booked.get(shipment_id) != user_id}
+        assert not lost, f"lost confirmed bookings: {lost}"
+        print(f"✓ All confirmed bookings present ({recovered} replayed from the journal)")
+
+    return True
+
+
+def test_journal_write_error():
+    """Test that a failed journal write fails its callers and is retried."""
+    print("\n" + "=" * 60)
+    print("Testing Journal Write Error")
+    print("=" * 60)
+
+    import errno
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bot.db')
+        journal_path = os.path.join(tmp, 'bookings.journal')
+        create_shipments(db_path, 2)
+
+        async def disk_full():
+            engine = BookingEngine(journal_path, retry_delay=0.05)
+            await engine.start()
+            write_batch = engine._write_batch
+
+            def full(data):
+                # Half of the batch reaches the file before the disk fills up
+                write_batch(data[:len(data) // 2])
+                raise OSError(errno.ENOSPC, "No space left on device")
+
+            engine._write_batch = full
+            try:
+                await asyncio.wait_for(engine.book(1, 3001), 2)
+                failed = None
+            except OSError as e:
+                failed = e
+
+            engine._write_batch = write_batch
+            retried = await asyncio.wait_for(engine.book(1, 3001), 2)
+            taken = await engine.book(1, 3002)
+            errors = engine.write_errors
+            engine._writer.cancel()
+            return failed, retried, taken, errors
+
+        failed, retried, taken, errors = asyncio.run(disk_full())
+        assert failed is not None and failed.errno == errno.ENOSPC, failed
+        assert retried[0] and not taken[0] and errors >= 1, (retried, taken, errors)
+        print("✓ Waiting caller failed with ENOSPC, retry made the booking durable")
+
+        async def recover():
+            engine = BookingEngine(journal_path)
+            await engine.start()
+            owners = dict(engine.owners)
+            await engine.stop()
+            return owners
+
+        owners = asyncio.run(recover())
+        assert owners[1][0] == 3001, owners
+        print("✓ Journal with a torn batch replays the retried record")
+
+    return True
+
+
+
+def test_graceful_stop():
+    """Test that SIGTERM runs the bot's cleanup and the journal sits next to the database."""
+    print("\n" + "=" * 60)
+    print("Testing Graceful Stop")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bot.db')
+        journal_path = os.path.join(tmp, 'bookings.journal')
+        env = dict(
+            os.environ,
+            BOT_TOKEN='123456789:ABCdefGHIjklMNOpqrsTUVwxyzABCdefGHI',
+            DATABASE_URL=f'sqlite:///{db_path}',
+            BOOKING_ENGINE_ENABLED='true'
+        )
+        env.pop('BOOKING_JOURNAL_PATH', None)
+
+        bot_process = subprocess.Popen(
+            [sys.executable, 'bot.py', '--loop', 'asyncio'],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+        try:
+            deadline = time.monotonic() + 20
+            while not os.path.exists(journal_path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert os.path.exists(journal_path), "journal not created next to the database"
+            print("✓ Journal created next to the database")
+
+            bot_process.send_signal(signal.SIGTERM)
+            output, _ = bot_process.communicate(timeout=20)
+        finally:
+            if bot_process.poll() is None:
+                bot_process.kill()
+                bot_process.wait()
+
+    assert bot_process.returncode == 0, output
+    assert "Bot stopped" in output, output
+    print("✓ SIGTERM stops the bot through its cleanup")
+
+    return True
+
+
+def test_booking_service():
+    """Test bookings and FSM state shared by two workers through the service."""
+    print("\n" + "=" * 60)
+    print("Testing Booking Service")
+    print("=" * 60)
+
+    async def two_workers(tmp):
+        database.use_backend(SQLiteBackend(os.path.join(tmp, 'bot.db')))
+        await database.init_db()
+        await database.initialize_default_shipments()
+
+        socket_path = os.path.join(tmp, 'booking.sock')
+        service = BookingService(socket_path, BookingEngine(os.path.join(tmp, 'bookings.journal')))
+        await service.start()
+        workers = [BookingServiceClient(socket_path), BookingServiceClient(socket_path)]
+        for client in workers:
+            await client.start()
+
+        try:
+            results = await asyncio.gather(*(
+                workers[user_id % 2].book(1, user_id) for user_id in range(3001, 3041)
+            ))
+            missing = await workers[0].book(999999, 3001)
+
+            rows = await database.get_shipments('direct')
+            await workers[1].refresh(rows)
+
+            key = StorageKey(bot_id=1, chat_id=3001, user_id=3001)
+            first, second = ServiceStorage(workers[0]), ServiceStorage(workers[1])
+            await first.set_state(key, "TestState:waiting_for_start")
+            await first.set_data(key, {"stage1_ms": 12.5})
+            state, data = await second.get_state(key), await second.get_data(key)
+            await second.set_state(key, None)
+            cleared = await first.get_state(key)
+
+            async def failing_snapshot():
+                raise OSError("No space left on device")
+
+            snapshot, service.engine.snapshot = service.engine.snapshot, failing_snapshot
+            try:
+                await workers[0].snapshot()
+                error = None
+            except BookingServiceError as e:
+                error = str(e)
+            service.engine.snapshot = snapshot
+
+            return results, missing, rows, state, data, cleared, error, service.engine.owners[1][0]
+        finally:
+            for client in workers:
+                await client.stop()
+            await service.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results, missing, rows, state, data, cleared, error, owner = asyncio.run(two_workers(tmp))
+
+    winners = [index for index, (success, _) in enumerate(results) if success]
+    assert len(winners) == 1
+    assert owner == 3001 + winners[0]
+    assert missing == (False, "Перевозка не найдена")
+    assert rows[0]['is_booked'] == 1 and rows[0]['booked_by'] == owner
+    print(f"✓ One winner out of {len(results)} requests from two workers")
+
+    assert state == "TestState:waiting_for_start" and data == {"stage1_ms": 12.5}
+    assert cleared is None
+    print("✓ FSM state shared between workers")
+
+    assert error is not None and "No space left" in error, error
+    print("✓ Failed service request raised in the worker")
+
+    async def lost_service(tmp):
+        socket_path = os.path.join(tmp, 'booking.sock')
+        service = BookingService(socket_path, BookingEngine(os.path.join(tmp, 'bookings.journal')))
+        await service.start()
+        client = BookingServiceClient(socket_path, timeout=0.1)
+        await client.start()
+
+        async def stuck_snapshot():
+            await asyncio.sleep(10)
+
+        snapshot, service.engine.snapshot = service.engine.snapshot, stuck_snapshot
+        try:
+            await client.snapshot()
+            timed_out = False
+        except asyncio.TimeoutError:
+            timed_out = True
+        pending = len(client._pending)
+        service.engine.snapshot = snapshot
+
+        await service.stop()
+        await asyncio.wait_for(client.closed.wait(), 1)
+        started = time.monotonic()
+        try:
+            await client.book(1, 3001)
+            refused = None
+        except ConnectionError:
+            refused = time.monotonic() - started
+        await client.stop()
+        return timed_out, pending, refused
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.use_backend(SQLiteBackend(os.path.join(tmp, 'bot.db')))
+        asyncio.run(database.init_db())
+        timed_out, pending, refused = asyncio.run(lost_service(tmp))
+
+    assert timed_out and pending == 0
+    print("✓ Unanswered service request timed out")
+
+    assert refused is not None and refused < 0.05, refused
+    print("✓ Requests after the service went away fail immediately")
+
+    return True
+
+
+def test_update_sharding():
+    """Test that all updates of a user go to the same worker."""
+    print("\n" + "=" * 60)
+    print("Testing Update Sharding")
+    print("=" * 60)
+
+    harness = BotHarness()
+    shards = {}
+    for user_id in range(4001, 4041):
+        updates = [
+            harness.message_update(user_id, "/start"),
+            harness.callback_update(user_id, "direct_shipments"),
+            harness.callback_update(user_id, "confirm:1"),
+        ]
+        assigned = {shard_for(update, 4) for update in updates}
+        assert len(assigned) == 1
+        shards[user_id] = assigned.pop()
+
+    assert set(shards.values()) == {0, 1, 2, 3}
+    print("✓ 40 users spread over 4 workers, each user pinned to one")
+
+    return True
+
+
+def test_redis_state_storage():
+    """Test FSM state, test sessions and timers kept in Redis across a restart."""
+    print("\n" + "=" * 60)
+    print("Testing Redis State Storage")
+    print("=" * 60)
+
+    redis = FakeRedis()
+    user_id = 5001
+
+    async def test_flow(db_path):
+        harness = BotHarness(db_path=db_path, redis=redis)
+        await harness.start()
+        try:
+            await harness.press(user_id, "test_mode")
+        finally:
+            await harness.close()
+
+        # A restarted bot continues the test from the state left in Redis
+        harness = BotHarness(db_path=db_path, redis=redis)
+        await harness.start()
+        try:
+            await harness.send(user_id, "/start")
+            keyboard = harness.last_reply(user_id).reply_markup.inline_keyboard
+            await harness.press(user_id, keyboard[0][0].callback_data)
+            result = harness.last_reply(user_id).text
+
+            await harness.press(user_id, "shipment:1")
+            timer_ttl = await redis.ttl(f"bot:timer:{user_id}:1")
+            await asyncio.sleep(0.01)
+            await harness.press(user_id, "confirm:1")
+            booking = harness.last_reply(user_id).text
+            return result, timer_ttl, booking
+        finally:
+            await harness.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result, timer_ttl, booking = asyncio.run(test_flow(os.path.join(tmp, 'bot.db')))
+
+    assert "РЕЗУЛЬТАТЫ ТЕСТА" in result
+    leftover = [key for key in list(redis.data)
+                if redis._alive(key) and str(user_id) in key and not key.startswith("bot:timer")]
+    assert not leftover, leftover
+    print("✓ Test mode finished after a restart, session and state cleared")
+
+    assert 0 < timer_ttl <= 600
+    assert "успешно" in booking and "<code>0.000</code>" not in booking
+    print(f"✓ Shipment timer kept with TTL {timer_ttl}s")
+
+    async def round_trips():
+        store = RedisStateStore(redis, session_ttl=60)
+        before = redis.round_trips
+        await store.update_test_session(user_id, session_id=7, test_start_time=time.time())
+        pipelined = redis.round_trips - before
+        session = await store.get_test_session(user_id)
+        session_ttl = await redis.ttl(f"bot:test_session:{user_id}")
+
+        redis.expires[f"bot:test_session:{user_id}"] = time.monotonic() - 1
+        expired = await store.get_test_session(user_id)
+        return pipelined, session, session_ttl, expired
+
+    pipelined, session, session_ttl, expired = asyncio.run(round_trips())
+    assert pipelined == 1
+    assert session["session_id"] == 7 and 0 < session_ttl <= 60
+    assert expired is None
+    print("✓ Session update pipelined into one round trip, expires with its TTL")
+
+    return True
+
+
+def test_update_scheduler():
+    """Test that confirm: overtakes a /start backlog and the normal queue pushes back."""
+    print("\n" + "=" * 60)
+    print("Testing Update Scheduler")
+    print("=" * 60)
+
+    async def run():
+        scheduler = UpdateScheduler(bot_module.dp, bot_module.bot, critical_workers=1,
+                                    normal_workers=1, queue_size=2)
+        harness = BotHarness(update_scheduler=scheduler)
+        await harness.start()
+        try:
+            lanes = (
+                classify(harness.callback_update(6001, "confirm:1")),
+                classify(harness.callback_update(6001, "shipment:1")),
+                classify(harness.callback_update(6001, "settings")),
+                classify(harness.message_update(6001, "/start")),
+            )
+
+            start_futures = []
+
+            async def storm():
+                for user_id in range(6101, 6109):
+                    start_futures.append(await scheduler.submit(harness.message_update(user_id, "/start")))
+
+            storm_task = asyncio.create_task(storm())
+            await asyncio.sleep(0)
+            await harness.press(6001, "confirm:1")
+            starts_done = sum(future.done() for future in start_futures)
+            await storm_task
+            await scheduler.join()
+            return lanes, starts_done, harness.last_reply(6001).text, dict(scheduler.processed), scheduler.backpressure_waits
+        finally:
+            await harness.close()
+
+    lanes, starts_done, booking, processed, waits = asyncio.run(run())
+
+    assert lanes == (CRITICAL, CRITICAL, NORMAL, NORMAL), lanes
+    print("✓ shipment:/confirm: classified as critical, the rest as normal")
+
+    assert "успешно" in booking
+    assert starts_done < 8, starts_done
+    print(f"✓ Confirm answered with {8 - starts_done} of 8 /start updates still pending")
+
+    assert processed == {CRITICAL: 1, NORMAL: 8}, processed
+    assert waits > 0
+    print(f"✓ Full normal queue made the submitter wait {waits} times")
+
+    return True
+
+
+def test_callback_dedup():
+    """Test that double taps and redeliveries of a callback run the handler once."""
+    print("\n" + "=" * 60)
+    print("Testing Callback Dedup")
+    print("=" * 60)
+
+    user_id = 7001
+
+    async def run():
+        harness = BotHarness()
+        await harness.start()
+        try:
+            await harness.press(user_id, "shipment:2")
+            calls_before = len(harness.session.calls)
+
+            first = harness.callback_update(user_id, "confirm:2")
+            taps = [first, first] + [harness.callback_update(user_id, "confirm:2") for _ in range(3)]
+            await asyncio.gather(*(harness.feed(update) for update in taps))
+
+            calls = [call.method for call in harness.session.calls[calls_before:]]
+            logs = [log for log in await database.get_user_logs(user_id) if log['action'] == 'confirm_booking_2']
+            stats = harness.callback_dedup.stats()
+
+            # Once the window is over the same tap is handled again
+            harness.callback_dedup.ttl_seconds = 0.01
+            await harness.press(user_id, "back_to_menu")
+            await harness.press(user_id, "shipment:3")
+            await asyncio.sleep(0.05)
+            await harness.press(user_id, "shipment:3")
+            return calls, logs, stats, harness.callback_dedup.executed
+        finally:
+            await harness.close()
+
+    calls, logs, stats, executed = asyncio.run(run())
+
+    assert calls.count('EditMessageText') == 1, calls
+    assert calls.count('AnswerCallbackQuery') == 4, calls
+    assert len(logs) == 1, logs
+    print(f"✓ 5 deliveries, 1 booking and 1 edit; API calls: {calls}")
+
+    assert stats == {'executed': 2, 'duplicates_by_id': 1, 'duplicates_by_action': 3}, stats
+    print(f"✓ Duplicates counted: {stats}")
+
+    assert executed == 4, executed
+    print("✓ Taps after the window are handled again")
+
+    async def failing_run():
+        dedup = CallbackDeduplicator(ttl_seconds=60)
+
+        async def fail():
+            raise RuntimeError("network")
+
+        async def succeed():
+            return "ok"
+
+        try:
+            await dedup.run("a", (1, 'confirm', 1), fail)
+        except RuntimeError:
+            pass
+        retried = await dedup.run("b", (1, 'confirm', 1), succeed)
+        duplicate = await dedup.run("b", (1, 'confirm', 1), succeed)
+        return retried, duplicate
+
+    retried, duplicate = asyncio.run(failing_run())
+    assert retried == ("ok", None) and duplicate == ("ok", BY_ID)
+    print("✓ A failed run is not cached")
+
+    return True
+
+
+def test_immediate_answer():
+    """Test that callbacks are answered first and a failing step cancels its siblings."""
+    print("\n" + "=" * 60)
+    print("Testing Immediate Callback Answer")
+    print("=" * 60)
+
+    async def run():
+        harness = BotHarness(api_latency_ms=20)
+        await harness.start()
+        try:
+            await harness.send(7101, "/start")
+            # Answered sequentially, the answer would come a full round trip
+            # (20ms) after the edit; in parallel they arrive together
+            answer_lag_ms = {}
+            for data in ("direct_shipments", "settings", "shipment:1", "confirm:1"):
+                calls_before = len(harness.session.calls)
+                await harness.press(7101, data)
+                calls = harness.session.calls[calls_before:]
+                answer = next(call.at for call in calls if call.method == 'AnswerCallbackQuery')
+                edit = next(call.at for call in calls if call.method == 'EditMessageText')
+                answer_lag_ms[data] = (answer - min(call.at for call in calls)) * 1000, (answer - edit) * 1000
+            return answer_lag_ms
+        finally:
+            await harness.close()
+
+    answer_lag_ms = asyncio.run(run())
+    detail_lag_ms = answer_lag_ms.pop("shipment:1")
+    assert all(lag < 10 for lag, _ in answer_lag_ms.values()), answer_lag_ms
+    print(f"✓ Spinner answered alongside the first request: {list(answer_lag_ms)}")
+
+    # The answer tells clients the confirm button is there
+    assert detail_lag_ms[1] >= 20, detail_lag_ms
+    print(f"✓ shipment: answered after the detail keyboard is shown ({detail_lag_ms[1]:.1f}ms later)")
+
+    async def failing_group():
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("edit failed")
+
+        try:
+            async with TaskGroup() as tasks:
+                tasks.create_task(slow())
+                tasks.create_task(fail())
+        except ValueError as e:
+            return str(e), cancelled
+        return None, cancelled
+
+    error, cancelled = asyncio.run(failing_group())
+    assert error == "edit failed" and cancelled == [True]
+    print("✓ Task group re-raises the first failure and cancels the rest")
+
+    return True
+
+
+def test_render_cache():
+    """Test that edits leaving a message unchanged are skipped and counted."""
+    print("\n" + "=" * 60)
+    print("Testing Render Cache")
+    print("=" * 60)
+
+    user_id = 7201
+
+    def edits(harness, since):
+        return sum(call.method == 'EditMessageText' for call in harness.session.calls[since:])
+
+    async def run():
+        harness = BotHarness()
+        await harness.start()
+        try:
+            harness.callback_dedup.ttl_seconds = 0
+            await harness.send(user_id, "/start")
+            menu_id = harness.last_reply(user_id).message_id
+
+            before = len(harness.session.calls)
+            await harness.press(user_id, "back_to_menu", message_id=menu_id)
+            await harness.press(user_id, "direct_shipments", message_id=menu_id)
+            await harness.press(user_id, "direct_shipments", message_id=menu_id)
+            unchanged = edits(harness, before)
+
+            # A booking changes the list, so the next tap is sent
+            await harness.press(user_id + 1, "confirm:1")
+            before = len(harness.session.calls)
+            await harness.press(user_id, "direct_shipments", message_id=menu_id)
+            changed = edits(harness, before)
+
+            # After a restart the cache is empty; Telegram's rejection is absorbed
+            bot_module.render_cache = RenderCache()
+            await harness.press(user_id, "direct_shipments", message_id=menu_id)
+            restarted = bot_module.render_cache.stats()
+            return unchanged, changed, harness.render_cache.stats(), restarted
+        finally:
+            await harness.close()
+
+    unchanged, changed, stats, restarted = asyncio.run(run())
+
+    assert unchanged == 1, unchanged
+    assert stats['edits_skipped'] == 2, stats
+    print(f"✓ Menu and repeated list left unchanged: 1 edit for 3 taps ({stats})")
+
+    assert changed == 1
+    print("✓ Changed list is edited")
+
+    assert restarted == {'edits_sent': 1, 'edits_skipped': 0, 'edits_not_modified': 1}, restarted
+    print("✓ 'message is not modified' after a restart is not an error")
+
+    cache = RenderCache(max_entries=2)
+    messages = [SimpleNamespace(chat=SimpleNamespace(id=1), message_id=i) for i in range(3)]
+    for message in messages:
+        cache.remember(message, "text")
+    assert not cache.is_current(messages[0], "text") and cache.is_current(messages[2], "text")
+    print("✓ Oldest fingerprints are evicted")
+
+    return True
+
+
+def test_catalog_push():
+    """Test that open shipment lists get the booked shipment pushed to them."""
+    print("\n" + "=" * 60)
+    print("Testing Catalog Push")
+    print("=" * 60)
+
+    viewers = (7301, 7302, 7303)
+    booker = 7310
+
+    def keyboard_edits(harness, since):
+        return [call for call in harness.session.calls[since:] if call.method == 'EditMessageReplyMarkup']
+
+    def booked(call, city):
+        return any(row[0].text.startswith(city) and row[0].text.endswith("❌")
+                   for row in call.reply_markup.inline_keyboard)
+
+    async def run():
+        harness = BotHarness()
+        await harness.start()
+        try:
+            lists = {}
+            for user_id in viewers:
+                await harness.send(user_id, "/start")
+                lists[user_id] = harness.last_reply(user_id).message_id
+                await harness.press(user_id, "direct_shipments", message_id=lists[user_id])
+
+            await harness.press(booker, "confirm:1")
+            await harness.press(booker + 1, "confirm:2")
+            before = len(harness.session.calls)
+            first = await harness.catalog_push.push()
+            pushed = keyboard_edits(harness, before)
+            again = await harness.catalog_push.push()
+
+            # A viewer who opened a shipment is no longer watching the list
+            await harness.press(viewers[0], "shipment:4", message_id=lists[viewers[0]])
+            await harness.press(booker + 2, "confirm:3")
+            before = len(harness.session.calls)
+            await harness.catalog_push.push()
+            after_leaving = keyboard_edits(harness, before)
+
+            harness.catalog_push.edits_per_run = 1
+            await harness.press(booker + 3, "confirm:4")
+            budgeted = [await harness.catalog_push.push() for _ in range(3)]
+            return first, pushed, again, after_leaving, budgeted, harness.catalog_push.stats()
+        finally:
+            await harness.close()
+
+    first, pushed, again, after_leaving, budgeted, stats = asyncio.run(run())
+
+    assert first == 3 and len(pushed) == 3, (first, pushed)
+    assert {call.chat_id for call in pushed} == set(viewers)
+    assert all(booked(call, "Челябинск") and booked(call, "Екатеринбург") for call in pushed)
+    print("✓ Two bookings reach every open list in one keyboard edit")
+
+    assert again == 0
+    print("✓ Up-to-date lists are not edited again")
+
+    assert [call.chat_id for call in after_leaving] == list(reversed(viewers[1:])), after_leaving
+    print("✓ A viewer who moved on is dropped")
+
+    assert budgeted == [1, 1, 0], budgeted
+    assert stats['catalog_views'] == 2 and stats['catalog_deferred'] == 1, stats
+    print(f"✓ Edits beyond the per-run budget wait for the next run ({stats})")
+
+    async def tap_during_push():
+        harness = BotHarness(api_latency_ms=30)
+        await harness.start()
+        try:
+            await harness.send(viewers[0], "/start")
+            list_id = harness.last_reply(viewers[0]).message_id
+            await harness.press(viewers[0], "direct_shipments", message_id=list_id)
+            await harness.press(booker, "confirm:1")
+
+            harness.catalog_push.burst = lambda: True
+            harness.catalog_push.burst_edits_per_run = 0.5
+            during_burst = [await harness.catalog_push.push() for _ in range(2)]
+            harness.catalog_push.burst = None
+            await harness.press(booker, "confirm:3")
+
+            push = asyncio.create_task(harness.catalog_push.push())
+            await asyncio.sleep(0.005)
+            await harness.press(viewers[0], "shipment:2", message_id=list_id)
+            await push
+            calls = harness.session.sent_to(viewers[0])
+            pushed = [call.at for call in calls if call.method == 'EditMessageReplyMarkup'][-1]
+            detail = [call.at for call in calls if call.method == 'EditMessageText'][-1]
+            return during_burst, (detail - pushed) * 1000, harness.session.contents[(viewers[0], list_id)]
+        finally:
+            await harness.close()
+
+    during_burst, detail_after_push_ms, shown = asyncio.run(tap_during_push())
+    assert during_burst == [0, 1], during_burst
+    print("✓ Pushes continue at the reduced rate during the burst")
+
+    # Held behind the push, the detail edit would land a full round trip (30ms) later
+    assert detail_after_push_ms < 20, detail_after_push_ms
+    assert "confirm:2" in shown[1], shown
+    print(f"✓ A tap does not wait for a push in flight ({detail_after_push_ms:.1f}ms apart)")
+
+    hour, minute = map(int, config.BOOKING_TIME.split(':'))
+    opened = datetime(2024, 1, 1, hour, minute)
+    assert bot_module.booking_burst(opened + timedelta(seconds=5))
+    assert not bot_module.booking_burst(opened - timedelta(seconds=5))
+    assert not bot_module.booking_burst(opened + timedelta(seconds=config.CATALOG_BURST_SECONDS))
+    print("✓ The burst lasts CATALOG_BURST_SECONDS after BOOKING_TIME")
+
+    shared, single = bot_module.create_catalog_push(4), bot_module.create_catalog_push()
+    assert shared.edits_per_run < single.edits_per_run
+    assert shared.burst_edits_per_run < single.burst_edits_per_run
+    print("✓ Worker processes share the push rate")
+
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 60)
+    print("BOOKING BOT - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        ("Bot Harness", test_bot_harness),
+        ("Confirm Burst", test_confirm_burst),
+        ("Crash Recovery", test_crash_recovery),
+        ("Journal Write Error", test_journal_write_error),
+        ("Graceful Stop", test_graceful_stop),
+        ("Booking Service", test_booking_service),
+        ("Update Sharding", test_update_sharding),
+        ("Redis State Storage", test_redis_state_storage),
+        ("Update Scheduler", test_update_scheduler),
+        ("Callback Dedup", test_callback_dedup),
+        ("Immediate Callback Answer", test_immediate_answer),
+        ("Render Cache", test_render_cache),
+        ("Catalog Push", test_catalog_push),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n✗ {test_name} failed with exception: {e}")
+            results[test_name] = False
+
+    print("\n" + "=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+
+    for test_name, result in results.items():
+        status = "✓ PASSED" if result else "✗ FAILED"
+        print(f"{test_name}: {status}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
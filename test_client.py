@@ -43,6 +43,15 @@ def test_metrics_collector():
     print(f"  - Actions recorded: {len(stats['actions'])}")
     print(f"  - test_action_1 avg: {stats['actions']['test_action_1']['avg_ms']:.2f}ms")
 
+    # Percentiles and histogram
+    assert metrics.get_percentile("test_action_1", 0) == 45.5
+    assert metrics.get_percentile("test_action_1", 100) == 52.3
+    assert metrics.get_percentile("missing_action", 50) is None
+
+    histogram = metrics.get_histogram("test_action_1")
+    assert histogram["<=50ms"] == 1 and histogram["<=100ms"] == 1
+    print(f"✓ Histogram: {histogram}")
+
     # Print summary
     metrics.print_summary()
 
@@ -68,6 +77,67 @@ def test_session_manager():
     return True
 
 
+def test_memory_session():
+    """Test in-memory sessions loaded from and flushed to session files."""
+    print("\n" + "=" * 60)
+    print("Testing In-Memory Session")
+    print("=" * 60)
+
+    import os
+    from datetime import datetime, timezone
+    from telethon.crypto import AuthKey
+    from telethon.sessions import MemorySession, SQLiteSession
+    from telethon.tl import types
+
+    manager = SessionManager(session_dir="test_sessions")
+    name = "memory_session"
+    manager.delete_session(name)
+
+    stored = SQLiteSession(manager.get_session_path(name))
+    stored.set_dc(2, "149.154.167.51", 443)
+    stored.auth_key = AuthKey(os.urandom(256))
+    stored.process_entities([
+        types.User(id=777000, access_hash=42, bot=True, username="booking_bot"),
+        types.Channel(id=1234, title="Отгрузки", photo=types.ChatPhotoEmpty(), date=None,
+                      access_hash=99, username="shipments")
+    ])
+    stored.cache_file(b"md5", 100, types.InputPhoto(id=5, access_hash=6, file_reference=b""))
+    stored.set_update_state(0, types.updates.State(
+        pts=10, qts=0, date=datetime.now(timezone.utc), seq=1, unread_count=0
+    ))
+    stored.close()
+
+    memory = manager.load_memory_session(name)
+    assert isinstance(memory, MemorySession)
+    assert memory.dc_id == 2 and memory.auth_key.key == stored.auth_key.key
+    assert memory.get_input_entity("booking_bot").user_id == 777000
+    assert memory.get_input_entity("shipments").access_hash == 99
+    assert memory.get_file(b"md5", 100, types.InputPhoto).id == 5
+    assert memory.get_update_state(0).pts == 10
+    print("✓ Session file loaded into memory")
+
+    memory.process_entities([types.User(id=555, access_hash=7, username="notify_user")])
+    memory.set_update_state(0, types.updates.State(
+        pts=25, qts=0, date=datetime.now(timezone.utc), seq=2, unread_count=0
+    ))
+    assert manager.flush_memory_session(name, memory)
+    assert manager.get_session_info(f"{name}.backup") is not None
+    assert not (manager.session_dir / f"{name}.flush.session").exists()
+
+    reloaded = manager.load_memory_session(name)
+    assert reloaded.auth_key.key == stored.auth_key.key
+    assert reloaded.get_input_entity("notify_user").user_id == 555
+    assert reloaded.get_input_entity("shipments").channel_id == 1234
+    assert reloaded.get_file(b"md5", 100, types.InputPhoto).access_hash == 6
+    assert reloaded.get_update_state(0).pts == 25
+    print("✓ Flushed atomically with a backup of the previous file")
+
+    assert not manager.flush_memory_session(name, MemorySession())
+    print("✓ Unauthorized session not flushed")
+
+    return True
+
+
 async def test_notifier():
     """Test Notifier."""
     print("\n" + "=" * 60)
@@ -93,7 +163,7 @@ async def test_notifier():
         notifier.print_countdown(i, "testing")
         await asyncio.sleep(0.5)
 
-    print("\n")
+    notifier.end_countdown()
 
     # Test success notification
     test_stats = {
@@ -118,6 +188,709 @@ async def test_notifier():
 
     await notifier.notify_booking_result(test_stats_fail)
 
+    # Output is rendered by the background worker
+    await notifier.close()
+
+    return True
+
+
+
+def test_notifier_output():
+    """Test that notifier output is throttled and kept off the event loop."""
+    print("\n" + "=" * 60)
+    print("Testing Notifier Output")
+    print("=" * 60)
+
+    import time
+    import auto_booking.utils.notifier as notifier_module
+
+    rendered = []
+    notifier_module.print = lambda *args, **kwargs: rendered.append(args[0] if args else "")
+    try:
+        notifier = Notifier(client=None, sound_alert=True, countdown_interval_ms=50)
+        finished = []
+
+        def slow(name):
+            def output(*args):
+                time.sleep(0.2)
+                finished.append(name)
+            return output
+
+        notifier._print_colored_box = slow("box")
+        notifier._play_sound_alert = slow("sound")
+
+        async def run():
+            for seconds in range(100, 0, -1):
+                notifier.print_countdown(seconds, "testing")
+                await asyncio.sleep(0.002)
+            await asyncio.sleep(0.1)
+            countdown = [line for line in rendered if "testing" in line]
+
+            start = time.perf_counter()
+            await notifier.notify_booking_result({"success": True, "stages": {}, "total_time_ms": 1})
+            notify_ms = (time.perf_counter() - start) * 1000
+            pending = list(finished)
+
+            await notifier.close()
+            return countdown, notify_ms, pending
+
+        countdown, notify_ms, pending = asyncio.run(run())
+    finally:
+        del notifier_module.print
+
+    assert 1 < len(countdown) <= 10, countdown
+    assert countdown[-1].endswith("00:00:01"), countdown[-1]
+    print(f"✓ 100 countdown updates rendered {len(countdown)} times, ending on the latest")
+
+    assert notify_ms < 50 and pending == [], (notify_ms, pending)
+    print(f"✓ Result notification returned in {notify_ms:.1f}ms despite slow output")
+
+    assert finished == ["box", "sound"], finished
+    print("✓ close() drained the queued output")
+
+    return True
+
+
+def test_button_matcher():
+    """Test ButtonMatcher priority ranking."""
+    print("\n" + "=" * 60)
+    print("Testing ButtonMatcher")
+    print("=" * 60)
+
+    from telethon.tl.types import (
+        KeyboardButtonCallback, KeyboardButtonRow, KeyboardButtonUrl,
+        Message, ReplyInlineMarkup
+    )
+    from auto_booking.core.button_matcher import ButtonMatcher
+
+    message = Message(id=1, message="menu", reply_markup=ReplyInlineMarkup([
+        KeyboardButtonRow([KeyboardButtonCallback("Омск_5", b"shipment:1")]),
+        KeyboardButtonRow([KeyboardButtonCallback("Москва_10", b"shipment:2")]),
+        KeyboardButtonRow([KeyboardButtonUrl("Челябинск", "https://example.com")]),
+        KeyboardButtonRow([KeyboardButtonCallback("ЧЕЛЯБИНСК_3", b"shipment:3")]),
+        KeyboardButtonRow([KeyboardButtonCallback("◀️ Назад в меню", b"back_to_menu")]),
+    ]))
+
+    matcher = ButtonMatcher(["Челябинск", "Москва"])
+
+    assert matcher.best_button(message) == ("ЧЕЛЯБИНСК_3", b"shipment:3")
+    assert matcher.first_button(message) == ("Москва_10", b"shipment:2")
+    assert [rank for rank, _, _ in matcher.rank_buttons(message)] == [0, 1]
+    assert ButtonMatcher(["Казань"]).best_button(message) is None
+    print("✓ Buttons ranked by target priority")
+
+    return True
+
+
+def test_shipment_selector():
+    """Test structured shipment parsing and selection rules."""
+    print("\n" + "=" * 60)
+    print("Testing ShipmentSelector")
+    print("=" * 60)
+
+    from telethon.tl.types import (
+        KeyboardButtonCallback, KeyboardButtonRow, Message, ReplyInlineMarkup
+    )
+    from auto_booking.config.settings import TargetShipment
+    from auto_booking.core.shipment_parser import (
+        ShipmentSelector, build_rules, parse_shipment_button
+    )
+
+    shipment = parse_shipment_button("Тест_Москва_2 ❌", b"shipment:7")
+    assert shipment.city == "Тест_Москва" and shipment.quantity == 2
+    assert shipment.booked and shipment.shipment_id == 7
+    assert parse_shipment_button("◀️ Назад в меню", b"back_to_menu") is None
+
+    message = Message(id=1, message="menu", reply_markup=ReplyInlineMarkup([
+        KeyboardButtonRow([KeyboardButtonCallback("Челябинск_3 ❌", b"shipment:1")]),
+        KeyboardButtonRow([KeyboardButtonCallback("Челябинск_1", b"shipment:2")]),
+        KeyboardButtonRow([KeyboardButtonCallback("Москва_10", b"shipment:3")]),
+        KeyboardButtonRow([KeyboardButtonCallback("Омск_5", b"shipment:4")]),
+        KeyboardButtonRow([KeyboardButtonCallback("◀️ Назад в меню", b"back_to_menu")]),
+    ]))
+
+    targets = [
+        TargetShipment(type="прямые", cities=["Челябинск"], priority=1, min_quantity=2),
+        TargetShipment(type="магистральные", cities=["Москва"], priority=2),
+    ]
+    selector = ShipmentSelector(build_rules(targets))
+    assert selector.select(message).shipment_id == 3
+    print("✓ Booked and too small shipments skipped")
+
+    selector = ShipmentSelector(build_rules(targets[:1]))
+    assert selector.select(message) is None
+    assert selector.fallback(message).shipment_id == 3
+    print("✓ Fallback never picks booked or unwanted shipments")
+
+    return True
+
+
+def test_request_templates():
+    """Test pre-built request pools."""
+    print("\n" + "=" * 60)
+    print("Testing RequestTemplates")
+    print("=" * 60)
+
+    from datetime import datetime
+    from telethon.tl import types
+    from auto_booking.core.request_templates import (
+        RequestTemplates, extract_sent_message_id
+    )
+
+    peer = types.InputPeerUser(user_id=1, access_hash=2)
+    templates = RequestTemplates("@bot", peer, pool_size=2)
+
+    first = templates.callback_request(10, b"shipment:1")
+    second = templates.callback_request(11, b"confirm:1")
+    assert first is not second and first.msg_id == 10 and second.data == b"confirm:1"
+
+    templates.callback_request(12, b"x")
+    assert templates.misses == 1
+    print("✓ Each pooled request is used once")
+
+    request = templates.send_request("/start")
+    assert request.message == "/start" and templates.supports_text("/start")
+
+    sent = types.UpdateShortSentMessage(id=5, pts=1, pts_count=1, date=datetime.now())
+    assert extract_sent_message_id(sent, request.random_id) == 5
+
+    updates = types.Updates(updates=[
+        types.UpdateMessageID(id=7, random_id=request.random_id)
+    ], users=[], chats=[], date=datetime.now(), seq=0)
+    assert extract_sent_message_id(updates, request.random_id) == 7
+    print("✓ Sent message ID extracted from raw results")
+
+    from telethon.tl.functions.messages import SendMessageRequest
+    from auto_booking.testing import FakeTelegramClient, create_offline_client
+
+    class BareUpdatesTelegram(FakeTelegramClient):
+        """Answers raw sends with an Updates container lacking the message."""
+
+        async def __call__(self, request, ordered=False):
+            result = await super().__call__(request, ordered)
+            if isinstance(request, SendMessageRequest):
+                return types.Updates(updates=[], users=[], chats=[], date=datetime.now(), seq=0)
+            return result
+
+    async def send_without_id():
+        fake = BareUpdatesTelegram([("Омск", 5)])
+        client = create_offline_client(fake)
+        await client.prepare_fast_path(fake.bot_username)
+        return await client.send_message(fake.bot_username, "/start"), fake
+
+    message_id, fake = asyncio.run(send_without_id())
+    assert fake._messages[message_id]["out"] and fake._messages[message_id]["text"] == "/start"
+    assert fake.requests.count("get_messages") == 1
+    print("✓ Missing sent message ID looked up in the chat history")
+
+    return True
+
+
+def test_offline_booking():
+    """Test the full booking sequence against the fake Telegram."""
+    print("\n" + "=" * 60)
+    print("Testing Offline Booking")
+    print("=" * 60)
+
+    from auto_booking.testing import (
+        Competitor, FakeTelegramClient, NetworkProfile, run_offline_booking
+    )
+
+    shipments = [("Омск", 5), ("Москва", 10), ("Челябинск", 3)]
+    network = NetworkProfile(latency_ms=5, jitter_ms=2, drop_rate=0.05, retransmit_ms=20)
+
+    for speculative, fast_path in ((False, False), (True, True)):
+        fake = FakeTelegramClient(shipments, network=network, seed=7)
+        stats = asyncio.run(run_offline_booking(
+            fake,
+            ["Челябинск", "Москва"],
+            speculative_mode=speculative,
+            fast_path=fast_path
+        ))
+
+        assert stats["success"], stats["error"]
+        assert stats["booked"] == ["Челябинск_3"]
+        print(f"✓ Booked in {stats['total_time_ms']}ms "
+              f"(speculative={speculative}, fast_path={fast_path})")
+
+    fake = FakeTelegramClient(
+        shipments, network=network, competitors=[Competitor("Челябинск", 0)], seed=7
+    )
+    stats = asyncio.run(run_offline_booking(fake, ["Челябинск", "Москва"]))
+
+    assert stats["booked"] == ["Москва_10"]
+    print("✓ Shipment taken by a competitor is skipped")
+
+    return True
+
+
+def test_record_replay():
+    """Test recording an offline booking and replaying it."""
+    print("\n" + "=" * 60)
+    print("Testing Record and Replay")
+    print("=" * 60)
+
+    import tempfile
+    from auto_booking.testing import (
+        FakeTelegramClient, NetworkProfile, create_offline_client,
+        replay_booking, run_offline_booking
+    )
+    import threading
+    from auto_booking.utils.recorder import CALL, MARK, UPDATE, SessionRecorder, read_recording
+
+    targets = ["Челябинск", "Москва"]
+    fake = FakeTelegramClient(
+        [("Омск", 5), ("Москва", 10), ("Челябинск", 3)],
+        network=NetworkProfile(latency_ms=5, jitter_ms=1),
+        seed=3
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/booking.rec"
+        client = create_offline_client(fake)
+        client.start_recording(path)
+        stats = asyncio.run(run_offline_booking(fake, targets, client=client))
+        client.stop_recording()
+
+        assert stats["success"], stats["error"]
+
+        records = list(read_recording(path))
+        kinds = {record.kind for record in records}
+        assert CALL in kinds and MARK in kinds and UPDATE not in kinds
+        assert all(b - a >= 0 for a, b in zip(
+            [r.t_ns for r in records], [r.t_ns for r in records][1:]
+        ))
+        print(f"✓ Recorded {len(records)} records")
+
+        for speed in (1.0, 4.0):
+            replayed = asyncio.run(replay_booking(path, targets, fake.bot_username, speed=speed))
+
+            assert replayed["success"], replayed["error"]
+            assert replayed["selected_shipment"] == "Челябинск_3"
+            assert replayed["replay"]["unmatched_calls"] == 0
+            print(f"✓ Replayed at {speed}x in {replayed['total_time_ms']}ms")
+
+        recorder = SessionRecorder(f"{tmp}/threshold.rec", flush_every=2)
+        writers = []
+        write = recorder._write
+        recorder._write = lambda buffer: (writers.append(threading.current_thread().name), write(buffer))
+        for i in range(5):
+            recorder.mark(f"mark{i}")
+        recorder.close()
+
+        assert writers == ["recorder-writer", "recorder-writer", threading.current_thread().name], writers
+        assert [r.meta["name"] for r in read_recording(recorder.path)] == [f"mark{i}" for i in range(5)]
+        print("✓ Full buffers are written by the writer thread, in order")
+
+    return True
+
+
+def test_tracing():
+    """Test span tracing of a booking attempt."""
+    print("\n" + "=" * 60)
+    print("Testing Tracing")
+    print("=" * 60)
+
+    import json
+    import tempfile
+    from auto_booking.testing import FakeTelegramClient, NetworkProfile, run_offline_booking
+    from auto_booking.utils.tracing import NULL_SPAN, Tracer, span
+
+    assert span("outside") is NULL_SPAN
+    print("✓ Spans are no-ops without an active tracer")
+
+    tracer = Tracer("unit")
+    token = tracer.activate()
+    with span("outer.block", key="value"):
+        with span("inner.block"):
+            pass
+    tracer.instant("marker")
+    Tracer.deactivate(token)
+
+    trace = tracer.to_chrome_trace()
+    spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+    assert spans["outer.block"]["dur"] >= spans["inner.block"]["dur"]
+    assert spans["outer.block"]["args"] == {"key": "value"}
+    print("✓ Nested spans exported as complete events")
+
+    fake = FakeTelegramClient(
+        [("Москва", 10), ("Челябинск", 3)], network=NetworkProfile(latency_ms=5)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = asyncio.run(run_offline_booking(fake, ["Челябинск"], trace_dir=tmp))
+        assert stats["success"], stats["error"]
+
+        with open(stats["trace_file"], encoding="utf-8") as f:
+            names = {event["name"] for event in json.load(f)["traceEvents"]}
+
+    for name in ("stage.sms_to_start", "stage.start_to_select", "stage.select_to_confirm",
+                 "rpc.send_message", "rpc.get_messages", "rpc.callback", "match.select_shipment"):
+        assert name in names, name
+    print("✓ Attempt trace written with stage and RPC spans")
+
+    from auto_booking.core.bot_handler import BotHandler
+    from auto_booking.testing import create_offline_client
+
+    async def cancelled_attempt():
+        slow = FakeTelegramClient([("Челябинск", 3)], network=NetworkProfile(latency_ms=50))
+        client = create_offline_client(slow)
+        handler = BotHandler(client, slow.bot_username, "Появились новые перевозки", ["Челябинск"])
+
+        asyncio.get_running_loop().call_later(0.02, asyncio.current_task().cancel)
+        try:
+            await handler.execute_booking_sequence(slow._render(slow.publish_sms()))
+        except asyncio.CancelledError:
+            pass
+        return handler.last_trace, span("after.cancel")
+
+    last_trace, after = asyncio.run(cancelled_attempt())
+    assert last_trace is not None and after is NULL_SPAN
+    print("✓ Cancelled attempt deactivates its tracer")
+
+    return True
+
+
+def test_stage_budgets():
+    """Test runtime enforcement of PerformanceConfig budgets."""
+    print("\n" + "=" * 60)
+    print("Testing Stage Budgets")
+    print("=" * 60)
+
+    import time
+
+    from auto_booking.config.settings import PerformanceConfig
+    from auto_booking.core.bot_handler import BotHandler
+    from auto_booking.testing import FakeTelegramClient, NetworkProfile, create_offline_client, run_offline_booking
+
+    performance = PerformanceConfig(
+        sms_to_start_ms=10, start_to_select_ms=20, select_to_confirm_ms=20, max_retries=5
+    )
+
+    # The bot answers later than the fixed pre-fetch delay
+    def slow_bot():
+        return FakeTelegramClient(
+            [("Москва", 10), ("Челябинск", 3)],
+            network=NetworkProfile(latency_ms=5),
+            bot_processing_ms=40
+        )
+
+    stats = asyncio.run(run_offline_booking(slow_bot(), ["Челябинск"]))
+    assert not stats["success"]
+    print("✓ Without budgets a late menu fails the attempt")
+
+    stats = asyncio.run(run_offline_booking(slow_bot(), ["Челябинск"], performance=performance))
+    counters = stats["handler_metrics"]["counters"]
+
+    assert stats["success"], stats["error"]
+    assert counters.get("stage_retry_start_to_select_ms", 0) >= 1
+    assert "start_to_select_ms" in stats["budget_violations"]
+    assert counters["budget_violation_start_to_select_ms"] == 1
+    print("✓ Late menu re-fetched and budget violations counted")
+
+    async def start_under_latency_spike():
+        fake = FakeTelegramClient([("Челябинск", 3)], network=NetworkProfile(latency_ms=2))
+        client = create_offline_client(fake)
+        handler = BotHandler(
+            client, fake.bot_username, "Появились новые перевозки", ["Челябинск"], performance=performance
+        )
+        await client.send_message(fake.bot_username, "/start")
+
+        # The /start round trip now overruns its deadline twice
+        fake.network = NetworkProfile(latency_ms=15)
+        message_id = await handler._with_deadline(
+            "sms_to_start_ms", (client.metrics, "send_message"),
+            client.send_message, fake.bot_username, "/start", retry=False
+        )
+        await asyncio.sleep(0.05)
+        return message_id, fake, handler.get_metrics()["counters"]
+
+    message_id, fake, counters = asyncio.run(start_under_latency_spike())
+    assert fake.requests.count("send_message") == 2, fake.requests
+    assert message_id == 3 and counters["stage_wait_sms_to_start_ms"] >= 1, (message_id, counters)
+    assert "stage_retry_sms_to_start_ms" not in counters
+    print("✓ Late /start awaited instead of sent twice")
+
+    async def speculative_select_under_latency_spike():
+        fake = FakeTelegramClient([("Челябинск", 3)], network=NetworkProfile(latency_ms=2))
+        client = create_offline_client(fake)
+        handler = BotHandler(
+            client, fake.bot_username, "Появились новые перевозки", ["Челябинск"],
+            speculative_mode=True, performance=performance
+        )
+        start_message_id = await client.send_message(fake.bot_username, "/start")
+        await asyncio.sleep(0.05)
+        assert await handler.snapshot_menu()
+        for _ in range(5):
+            handler.button_clicker.metrics.record_action("speculative_select", 5.0)
+
+        # Each click now takes longer than the whole stage deadline allows
+        fake.network = NetworkProfile(latency_ms=200)
+        stats = {"speculative": {"select": None, "confirm": None, "saved_ms": 0.0}}
+        started = time.perf_counter()
+        selected = await handler._speculative_select(
+            start_message_id, handler.menu_snapshot["target"], stats, max_attempts=1
+        )
+        return selected, (time.perf_counter() - started) * 1000, stats
+
+    selected, elapsed_ms, stats = asyncio.run(speculative_select_under_latency_spike())
+    assert selected is None and stats["speculative"]["select"] == "miss", stats
+    assert elapsed_ms < 400, elapsed_ms
+    print(f"✓ Slow speculative select missed after {elapsed_ms:.0f}ms under the stage deadline")
+
+    return True
+
+
+def test_hedged_confirm():
+    """Test hedging of a slow confirm callback."""
+    print("\n" + "=" * 60)
+    print("Testing Hedged Confirm")
+    print("=" * 60)
+
+    import gc
+    from auto_booking.core.button_clicker import ButtonClicker, HedgePolicy
+    from auto_booking.testing import FakeTelegramClient, NetworkProfile
+
+    async def confirm(lose_first_request: bool):
+        fake = FakeTelegramClient([("Челябинск", 3)], network=NetworkProfile(latency_ms=2))
+        clicker = ButtonClicker(fake, fake.bot_username)
+        clicker.hedge_policy = HedgePolicy(fallback_delay_ms=30)
+        shipment_id = next(iter(fake.shipments))
+
+        await fake.send_message(fake.bot_username, "/start")
+        await asyncio.sleep(0.05)
+        menu = (await fake.get_messages(fake.bot_username, limit=1))[0]
+        await clicker.click_by_id(menu.id, f"shipment:{shipment_id}".encode(), "select_shipment")
+
+        if lose_first_request:
+            fake.network = NetworkProfile(latency_ms=2, drop_rate=1.0, retransmit_ms=300)
+
+        click = asyncio.ensure_future(
+            clicker.hedged_click(menu.id, f"confirm:{shipment_id}".encode(), "confirm_booking")
+        )
+        await asyncio.sleep(0.001)
+        fake.network = NetworkProfile(latency_ms=2)
+        elapsed = await click
+
+        await asyncio.sleep(0.35)
+        result = (await fake.get_messages(fake.bot_username, limit=1))[0]
+        return elapsed, clicker.metrics, result.text, fake.bookings()
+
+    elapsed, metrics, text, booked = asyncio.run(confirm(lose_first_request=False))
+    assert not metrics.counters.get("confirm_booking_hedged")
+    assert "успешно" in text and len(booked) == 1
+    print(f"✓ Fast answer not hedged ({elapsed:.2f}ms)")
+
+    elapsed, metrics, text, booked = asyncio.run(confirm(lose_first_request=True))
+    assert metrics.counters["confirm_booking_hedged"] == 1
+    assert metrics.counters["confirm_booking_hedge_won"] == 1
+    assert elapsed < 200
+    assert metrics.get_action_stats("hedge_saved_ms")["count"] == 1
+    assert "успешно" in text and len(booked) == 1
+    print(f"✓ Hedge won after a lost request ({elapsed:.2f}ms), duplicate confirm kept the booking")
+
+    async def abandon():
+        fake = FakeTelegramClient([("Челябинск", 3)], network=NetworkProfile(latency_ms=20))
+        clicker = ButtonClicker(fake, fake.bot_username)
+        clicker.hedge_policy = HedgePolicy(fallback_delay_ms=5)
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+
+        # Both requests would be rejected after the caller's deadline
+        try:
+            await asyncio.wait_for(clicker.hedged_click(999, b"confirm:1", "confirm_booking"), 0.015)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.1)
+        gc.collect()
+        return errors, clicker.metrics
+
+    errors, metrics = asyncio.run(abandon())
+    assert metrics.counters["confirm_booking_hedged"] == 1
+    assert not errors, errors
+    print("✓ Cancelled hedged click leaves no unobserved requests")
+
+    return True
+
+
+def test_message_tracker():
+    """Test gap-free SMS detection under message bursts."""
+    print("\n" + "=" * 60)
+    print("Testing Message Tracker")
+    print("=" * 60)
+
+    from auto_booking.core.bot_handler import BotHandler
+    from auto_booking.testing import FakeTelegramClient, NetworkProfile, create_offline_client
+
+    async def monitor(scenario, event_driven=False, batch_limit=20):
+        fake = FakeTelegramClient(
+            [("Челябинск", 3)], network=NetworkProfile(latency_ms=2), push_updates=event_driven
+        )
+        handler = BotHandler(
+            create_offline_client(fake), fake.bot_username,
+            "Появились новые перевозки", ["Челябинск"]
+        )
+        handler.tracker.batch_limit = batch_limit
+        fake.publish_message("Старое сообщение")
+        await handler.initialize()
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.02, scenario, fake)
+        sms_message = await handler.monitor_sms(
+            polling_interval_ms=100, timeout_seconds=2, event_driven=event_driven
+        )
+        return sms_message, handler
+
+    def sms_then_statuses(fake, count=1):
+        fake.publish_sms()
+        for index in range(count):
+            fake.publish_message(f"Статус {index}")
+
+    sms_message, handler = asyncio.run(monitor(sms_then_statuses))
+    assert sms_message is not None and sms_message.id == 2
+    assert handler.last_message_id == 3
+    print("✓ SMS followed by a status message detected in one poll")
+
+    sms_message, _ = asyncio.run(monitor(lambda fake: sms_then_statuses(fake, 5), batch_limit=2))
+    assert sms_message is not None and sms_message.id == 2
+    print("✓ Burst larger than the batch paged back to the SMS")
+
+    sms_message, handler = asyncio.run(monitor(sms_then_statuses, event_driven=True))
+    assert sms_message is not None and sms_message.id == 2
+    assert not handler.tracker.gaps
+    print("✓ SMS detected from pushed updates")
+
+    def lost_sms(fake):
+        fake.lose_updates(1)
+        sms_then_statuses(fake)
+
+    sms_message, handler = asyncio.run(monitor(lost_sms, event_driven=True))
+    counters = handler.get_metrics()["counters"]
+    assert sms_message is not None and sms_message.id == 2
+    assert counters["update_gaps"] == 1 and counters["recovered_messages"] == 2
+    print("✓ Lost SMS update recovered after the pts gap")
+
+    return True
+
+
+def test_warm_up():
+    """Test the pre-window warm-up and GC freeze."""
+    print("\n" + "=" * 60)
+    print("Testing Warm-up")
+    print("=" * 60)
+
+    import gc
+    from auto_booking.config.settings import TargetShipment
+    from auto_booking.core.warmup import freeze_gc, release_gc, warm_up
+    from auto_booking.utils.logger import logger
+
+    targets = [TargetShipment(type="прямые", cities=["Челябинск"], priority=1, min_quantity=2)]
+    messages = []
+    sink = logger.add(messages.append, level="INFO", format="{message}")
+    try:
+        report = asyncio.run(warm_up(targets, rounds=2, speculative_mode=True))
+    finally:
+        logger.remove(sink)
+
+    assert report["rounds"] == 2
+    assert report["first_run_ms"] is not None and report["warm_ms"] is not None
+    print(f"✓ First run {report['first_run_cpu_ms']}ms CPU, warm {report['warm_cpu_ms']}ms CPU")
+
+    assert not any("BOOKING COMPLETED" in m or "SMS detected" in m for m in messages), messages
+    assert any(m.startswith("Warm-up:") for m in messages)
+    print("✓ Offline bookings kept out of the log")
+
+    freeze_gc()
+    try:
+        assert not gc.isenabled() and gc.get_freeze_count() > 0
+    finally:
+        release_gc()
+
+    assert gc.isenabled() and gc.get_freeze_count() == 0
+    print("✓ GC frozen for the attempt and released afterwards")
+
+    async def outlive_freeze():
+        freeze_gc(max_seconds=0.05)
+        frozen = not gc.isenabled()
+        await asyncio.sleep(0.1)
+        return frozen, gc.isenabled()
+
+    try:
+        frozen, enabled = asyncio.run(outlive_freeze())
+    finally:
+        release_gc()
+
+    assert frozen and enabled and gc.get_freeze_count() == 0
+    print("✓ GC released when the attempt outlives the freeze window")
+
+    return True
+
+
+def test_loop_monitor():
+    """Test event loop lag and GC pause monitoring."""
+    print("\n" + "=" * 60)
+    print("Testing Loop Monitor")
+    print("=" * 60)
+
+    import gc
+    import time
+    from event_loop import LoopMonitor, format_report
+
+    def block_loop():
+        time.sleep(0.08)
+
+    async def monitored():
+        monitor = LoopMonitor(stall_threshold_ms=30, capture_stacks=True)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        block_loop()
+        gc.collect()
+        await asyncio.sleep(0.02)
+        return await monitor.stop()
+
+    report = asyncio.run(monitored())
+    worst = report["worst_stalls"][0]
+
+    assert report["loop_lag"]["count"] > 5
+    assert worst["lag_ms"] >= 70
+    assert worst["stack"] is not None and "block_loop" in worst["stack"]
+    assert report["gc"]["by_generation"][2]["count"] >= 1
+    assert worst["gc_pauses"] >= 1
+    print(f"✓ Stall of {worst['lag_ms']}ms caught with its stack")
+
+    lines = format_report(report)
+    assert any(line.startswith("Loop stall") for line in lines)
+    print("✓ Report formatted")
+
+    return True
+
+
+def test_event_loop_selection():
+    """Test event loop policy selection with fallback."""
+    print("\n" + "=" * 60)
+    print("Testing Event Loop Selection")
+    print("=" * 60)
+
+    from event_loop import available_event_loops, install_event_loop
+
+    try:
+        assert install_event_loop("asyncio") == "asyncio"
+        assert type(asyncio.new_event_loop()).__module__.startswith("asyncio")
+        print("✓ asyncio loop installed on request")
+
+        expected = "uvloop" if "uvloop" in available_event_loops() else "asyncio"
+        assert install_event_loop("auto") == expected
+        assert install_event_loop("uvloop") == expected
+        print(f"✓ auto/uvloop resolve to {expected}")
+
+        try:
+            install_event_loop("trio")
+            return False
+        except ValueError:
+            print("✓ Unknown loop rejected")
+    finally:
+        asyncio.set_event_loop_policy(None)
+
     return True
 
 
@@ -156,6 +929,9 @@ def test_imports():
         "auto_booking.core.client",
         "auto_booking.core.bot_handler",
         "auto_booking.core.button_clicker",
+        "auto_booking.core.button_matcher",
+        "auto_booking.core.shipment_parser",
+        "auto_booking.core.request_templates",
         "auto_booking.core.scheduler",
         "auto_booking.config",
         "auto_booking.config.settings",
@@ -164,6 +940,9 @@ def test_imports():
         "auto_booking.utils.logger",
         "auto_booking.utils.metrics",
         "auto_booking.utils.notifier",
+        "auto_booking.utils.recorder",
+        "auto_booking.utils.tracing",
+        "auto_booking.testing",
     ]
 
     all_success = True
@@ -192,7 +971,21 @@ async def main():
         ("Module Imports", test_imports),
         ("Metrics Collector", test_metrics_collector),
         ("Session Manager", test_session_manager),
+        ("In-Memory Session", test_memory_session),
         ("Notifier", test_notifier),
+        ("Notifier Output", test_notifier_output),
+        ("Button Matcher", test_button_matcher),
+        ("Shipment Selector", test_shipment_selector),
+        ("Request Templates", test_request_templates),
+        ("Offline Booking", test_offline_booking),
+        ("Record and Replay", test_record_replay),
+        ("Tracing", test_tracing),
+        ("Stage Budgets", test_stage_budgets),
+        ("Hedged Confirm", test_hedged_confirm),
+        ("Message Tracker", test_message_tracker),
+        ("Warm-up", test_warm_up),
+        ("Loop Monitor", test_loop_monitor),
+        ("Event Loop Selection", test_event_loop_selection),
         ("Configuration", test_config_loading),
     ]
 
@@ -203,7 +996,7 @@ async def main():
             if asyncio.iscoroutinefunction(test_func):
                 result = await test_func()
             else:
-                result = test_func()
+                result = await asyncio.to_thread(test_func)
 
             results[test_name] = result
         except Exception as e:
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Conformance tests run against every database backend.
+
+SQLite always runs. PostgreSQL runs when DATABASE_TEST_URL points at a
+scratch database (its tables are reset) and asyncpg is installed.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from db_backends import DatabaseBackend, PostgresBackend, SQLiteBackend
+from db_backends.base import BOOKED_MESSAGE, NOT_FOUND_MESSAGE, TAKEN_MESSAGE
+
+
+async def run_conformance(backend: DatabaseBackend) -> None:
+    """Exercise every backend operation and check the results."""
+    await backend.init_db()
+    await backend.init_db()
+
+    await backend.add_user(1, 'alice', 'Alice')
+    await backend.add_user(1, 'alice2', 'Alice2')
+    await backend.add_user(2, None, 'Bob')
+    assert (await backend.get_user(1))['username'] == 'alice'
+    assert await backend.get_user(3) is None
+    assert sorted(await backend.get_user_ids()) == [1, 2]
+
+    await backend.initialize_default_shipments()
+    await backend.initialize_default_shipments()
+    default_count = await backend.count_shipments()
+    assert default_count > 0
+
+    test_id = await backend.add_shipment('direct', 'Тест', 5, is_test=True)
+    assert await backend.count_shipments(is_test=True) == 1
+    assert await backend.count_shipments() == default_count
+
+    direct = await backend.get_shipments('direct')
+    assert [s['id'] for s in direct] == sorted(s['id'] for s in direct)
+    assert all(s['is_test'] == 0 for s in direct)
+    assert [s['id'] for s in await backend.get_shipments('direct', is_test=True)] == [test_id]
+
+    shipment_id = direct[0]['id']
+    shipment = await backend.get_shipment(shipment_id)
+    assert shipment['city'] == direct[0]['city'] and shipment['is_booked'] == 0
+    assert await backend.get_shipment(999999) is None
+
+    results = await asyncio.gather(*(backend.book_shipment(shipment_id, user_id) for user_id in (1, 2, 1, 2)))
+    winners = {user_id for user_id, (ok, _) in zip((1, 2, 1, 2), results) if ok}
+    assert len(winners) == 1, f"shipment booked by {winners}"
+    winner = winners.pop()
+    assert await backend.book_shipment(shipment_id, winner) == (True, BOOKED_MESSAGE)
+    assert await backend.book_shipment(shipment_id, 3 - winner) == (False, TAKEN_MESSAGE)
+    assert await backend.book_shipment(999999, 1) == (False, NOT_FOUND_MESSAGE)
+    assert [s['id'] for s in await backend.get_user_bookings(winner)] == [shipment_id]
+    assert await backend.get_user_bookings(3 - winner) == []
+
+    state = {row[0]: row[1:] for row in await backend.get_booking_state()}
+    assert len(state) == default_count + 1
+    assert state[shipment_id][:2] == (1, winner)
+
+    other_id = direct[1]['id']
+    await backend.save_booking_state([(0, None, None, shipment_id), (1, 2, '2024-01-01T11:30:00', other_id)])
+    state = {row[0]: row[1:] for row in await backend.get_booking_state()}
+    assert state[shipment_id] == (0, None, None)
+    assert state[other_id] == (1, 2, '2024-01-01T11:30:00')
+
+    await backend.add_log(1, 'start', 10.0)
+    await backend.add_log(1, 'confirm', 30.0, success=False, is_test_mode=True, test_stage='stage2')
+    await backend.add_log(2, 'start')
+    logs = await backend.get_user_logs(1)
+    assert {log['action'] for log in logs} == {'start', 'confirm'}
+    assert len(await backend.get_user_logs(1, limit=1)) == 1
+
+    await backend.create_test_session(1)
+    latest = await backend.create_test_session(1)
+    await backend.update_test_session_start(1)
+    await backend.complete_test_session(1, 100.0, 200.0, 300.0)
+    sessions = await backend.get_test_sessions(1)
+    assert sessions[0]['id'] == latest and sessions[0]['total_time_ms'] == 300.0
+    assert sessions[0]['start_command_time'] is not None
+    assert sessions[1]['total_time_ms'] is None
+    assert len(await backend.get_test_sessions()) == 2
+
+    stats = await backend.get_stats()
+    assert stats['users_count'] == 2
+    assert stats['bookings_count'] == 1
+    assert stats['avg_response_time'] == 20.0
+
+    await backend.reset_bookings()
+    assert (await backend.get_stats())['bookings_count'] == 0
+    assert await backend.get_user_bookings(2) == []
+
+
+async def reset_postgres(backend: PostgresBackend) -> None:
+    pool = await backend.pool()
+    await pool.execute('DROP TABLE IF EXISTS logs, test_sessions, shipments, users')
+
+
+def test_sqlite_backend():
+    """Run the conformance suite on a temporary SQLite file."""
+    print("\n" + "=" * 60)
+    print("TEST: SQLite Backend")
+    print("=" * 60)
+
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'bot.db'))
+            try:
+                await run_conformance(backend)
+            finally:
+                await backend.close()
+
+    asyncio.run(run())
+    print("✓ All operations conform")
+    return True
+
+
+def test_postgres_backend():
+    """Run the conformance suite on DATABASE_TEST_URL if configured."""
+    print("\n" + "=" * 60)
+    print("TEST: PostgreSQL Backend")
+    print("=" * 60)
+
+    url = os.getenv('DATABASE_TEST_URL')
+    if not url:
+        print("- Skipped: DATABASE_TEST_URL is not set")
+        return True
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError:
+        print("- Skipped: asyncpg is not installed")
+        return True
+
+    async def run():
+        backend = PostgresBackend(url, min_size=1, max_size=4)
+        try:
+            await reset_postgres(backend)
+            await run_conformance(backend)
+        finally:
+            await backend.close()
+
+    asyncio.run(run())
+    print("✓ All operations conform")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("\n" + "=" * 60)
+    print("DATABASE BACKENDS - TEST SUITE")
+    print("=" * 60)
+
+    tests = [
+        ("SQLite Backend", test_sqlite_backend),
+        ("PostgreSQL Backend", test_postgres_backend),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"\n✗ {test_name} failed with exception: {e!r}")
+            results[test_name] = False
+
+    print("\n" + "=" * 60)
+    print("TEST SUMMARY")
+    print("=" * 60)
+
+    for test_name, result in results.items():
+        status = "✓ PASSED" if result else "✗ FAILED"
+        print(f"{test_name}: {status}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
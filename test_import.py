@@ -41,6 +41,14 @@ def test_imports():
         print(f"    ✗ Error importing utils: {e}")
         return False
     
+    try:
+        print("  - Importing event_loop...")
+        import event_loop
+        print("    ✓ event_loop imported successfully")
+    except Exception as e:
+        print(f"    ✗ Error importing event_loop: {e}")
+        return False
+    
     print("\n✓ All modules imported successfully!")
     return True
 
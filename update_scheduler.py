@@ -0,0 +1,133 @@
+"""Priority scheduling of incoming updates.
+
+Updates are classified before they reach the router. Booking-critical
+callbacks (``shipment:`` and ``confirm:``) go to a lane with its own
+workers, so a storm of /start photo sends, list views and log writes cannot
+take their concurrency. Everything else goes through a bounded queue served
+by a fixed number of workers; when that queue is full ``submit`` waits,
+which stops the poller from fetching more updates until the bot catches up.
+Telegram delivers updates in one ordered stream, so while the poller waits
+critical updates queue behind it too: size the queue to hold a whole /start
+storm and let the worker counts do the bounding. Idle normal workers also
+pick up queued critical updates first.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = 'critical'
+NORMAL = 'normal'
+
+CRITICAL_PREFIXES = ('confirm:', 'shipment:')
+
+
+def classify(update: Update) -> str:
+    """Return the lane of an update."""
+    callback = update.callback_query
+    if callback is not None and callback.data and callback.data.startswith(CRITICAL_PREFIXES):
+        return CRITICAL
+    return NORMAL
+
+
+class UpdateScheduler:
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, critical_workers: int = 16,
+                 normal_workers: int = 32, queue_size: int = 1000):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.critical_workers = critical_workers
+        self.normal_workers = normal_workers
+
+        self.critical: asyncio.Queue = asyncio.Queue()
+        self.normal: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.processed: Dict[str, int] = {CRITICAL: 0, NORMAL: 0}
+        self.backpressure_waits = 0
+
+        self._workers = []
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._critical_worker()) for _ in range(self.critical_workers)
+        ] + [
+            asyncio.create_task(self._normal_worker()) for _ in range(self.normal_workers)
+        ]
+
+    async def stop(self):
+        """Finish queued updates and stop the workers."""
+        await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self):
+        await self.critical.join()
+        await self.normal.join()
+
+    async def submit(self, update: Update, **kwargs: Any) -> asyncio.Future:
+        """Queue an update; the returned future resolves once it is processed."""
+        future = asyncio.get_running_loop().create_future()
+        job = (update, kwargs, future)
+
+        if classify(update) == CRITICAL:
+            self.critical.put_nowait(job)
+        else:
+            if self.normal.full():
+                self.backpressure_waits += 1
+            await self.normal.put(job)
+        return future
+
+    async def _critical_worker(self):
+        while True:
+            job = await self.critical.get()
+            await self._process(CRITICAL, job)
+            self.critical.task_done()
+
+    async def _normal_worker(self):
+        while True:
+            if not self.critical.empty():
+                job = self.critical.get_nowait()
+                await self._process(CRITICAL, job)
+                self.critical.task_done()
+                continue
+
+            job = await self.normal.get()
+            await self._process(NORMAL, job)
+            self.normal.task_done()
+
+    async def _process(self, lane: str, job):
+        update, kwargs, future = job
+        response = None
+        try:
+            response = await self.dispatcher.feed_update(self.bot, update, **kwargs)
+            if isinstance(response, TelegramMethod):
+                await self.dispatcher.silent_call_request(self.bot, response)
+        except Exception as e:
+            # Same as aiogram polling: the update counts as processed
+            logger.exception(f"Failed to process update {update.update_id}: {e}")
+        if not future.done():
+            future.set_result(response)
+        self.processed[lane] += 1
+
+    async def poll(self, polling_timeout: int = 30, allowed_updates: Optional[list] = None):
+        """Long-poll Telegram and submit updates until cancelled."""
+        offset = None
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset, timeout=polling_timeout, allowed_updates=allowed_updates
+                )
+            except Exception as e:
+                logger.error(f"Failed to get updates: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                await self.submit(update)
@@ -74,6 +74,21 @@ def format_stats(stats: dict) -> str:
     text += f"✅ Успешных бронирований: <b>{stats['bookings_count']}</b>\n"
     text += f"⏱️ Средняя скорость: <code>{stats['avg_response_time']:.3f}</code> мс\n"
     
+    if 'duplicates_by_id' in stats:
+        text += (
+            f"🔁 Повторных нажатий: <b>{stats['duplicates_by_action']}</b>, "
+            f"повторных доставок: <b>{stats['duplicates_by_id']}</b>\n"
+        )
+    
+    if 'edits_skipped' in stats:
+        text += f"✏️ Пропущено неизменных правок: <b>{stats['edits_skipped']}</b>\n"
+    
+    if 'catalog_views' in stats:
+        text += (
+            f"🔄 Открытых списков: <b>{stats['catalog_views']}</b>, "
+            f"обновлений кнопок: <b>{stats['catalog_edits']}</b>\n"
+        )
+    
     return text
 
 
@@ -0,0 +1,232 @@
+"""Multi-process deployment of the bot.
+
+    python workers.py --workers 4
+
+The parent process long-polls Telegram and shards updates by user id over
+Unix sockets to N worker processes that run the ``bot.py`` handlers. A
+user's updates always reach the same worker, so the per-user dicts in
+``bot.py`` stay valid. Bookings and FSM state go through one booking
+service process (``booking_service.py``), which keeps bookings serialised
+while handler CPU is spread over the cores. With ``STATE_STORAGE=redis`` the
+workers keep FSM state in Redis instead.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+from aiogram.types import Update
+
+import config
+import database
+from booking_service import BookingServiceClient, ServiceStorage, read_frame, run_service, write_frame
+from event_loop import install_event_loop
+
+logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+logger = logging.getLogger(__name__)
+
+SOCKET_WAIT_SECONDS = 10
+
+
+def shard_for(update, workers: int) -> int:
+    """Pick the worker for an update by the id of the user who sent it."""
+    event = update.event
+    user = getattr(event, 'from_user', None) or getattr(event, 'user', None)
+    return user.id % workers if user else 0
+
+
+def wait_for_socket(path: str, process: multiprocessing.Process):
+    deadline = time.monotonic() + SOCKET_WAIT_SECONDS
+    while not os.path.exists(path):
+        if not process.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError(f"{process.name} did not open {path}")
+        time.sleep(0.05)
+
+
+async def serve_worker(update_socket: str, service_socket: str, workers: int = 1):
+    import bot as bot_module
+
+    client = BookingServiceClient(service_socket)
+    await client.start()
+    bot_module.booking_engine = client
+    if config.STATE_STORAGE != 'redis':
+        # With Redis every worker reaches the shared FSM state directly
+        bot_module.dp.fsm.storage = ServiceStorage(client)
+    bot_module.dp.include_router(bot_module.router)
+
+    update_scheduler = None
+    tasks = set()
+    if config.UPDATE_SCHEDULER_ENABLED:
+        update_scheduler = bot_module.create_update_scheduler()
+        update_scheduler.start()
+    if config.CATALOG_PUSH_ENABLED:
+        # Each worker updates the lists its own users have open
+        bot_module.catalog_push = bot_module.create_catalog_push(workers)
+        bot_module.catalog_push.start()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                update = json.loads(await read_frame(reader))
+                if update_scheduler:
+                    # Waits while the normal queue is full, so the parent's drain() slows polling
+                    await update_scheduler.submit(Update.model_validate(update, context={'bot': bot_module.bot}))
+                    continue
+                task = asyncio.create_task(bot_module.dp.feed_raw_update(bot_module.bot, update))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    server = await asyncio.start_unix_server(handle, path=update_socket)
+    try:
+        # Without the booking service no confirm can be answered; exit so
+        # the parent's writes to this worker fail and the bot stops
+        await client.closed.wait()
+        raise ConnectionError("Booking service disconnected, stopping the worker")
+    finally:
+        server.close()
+        await bot_module.catalog_push.stop()
+        if update_scheduler:
+            await update_scheduler.stop()
+        await client.stop()
+        await bot_module.bot.session.close()
+
+
+def run_process(coro_factory, *args):
+    install_event_loop(config.EVENT_LOOP)
+
+    async def main():
+        task = asyncio.create_task(coro_factory(*args))
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+
+
+def run_child(coro_factory, *args):
+    # Ctrl+C reaches the whole process group; the parent stops the children
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_process(coro_factory, *args)
+
+
+async def poll_updates(update_sockets):
+    import bot as bot_module
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    writers = []
+    for path in update_sockets:
+        _, writer = await asyncio.open_unix_connection(path)
+        writers.append(writer)
+
+    hour, minute = config.BOOKING_TIME.split(':')
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(bot_module.scheduled_booking_open, 'cron', hour=int(hour), minute=int(minute))
+    scheduler.start()
+
+    bot = bot_module.bot
+    offset = None
+    logger.info(f"Polling updates for {len(writers)} workers")
+
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30)
+            except Exception as e:
+                logger.error(f"Failed to get updates: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                body = update.model_dump(mode='json', by_alias=True, exclude_none=True)
+                write_frame(writers[shard_for(update, len(writers))], json.dumps(body).encode())
+
+            await asyncio.gather(*(writer.drain() for writer in writers))
+    finally:
+        scheduler.shutdown(wait=False)
+        await bot.session.close()
+
+
+async def prepare_database():
+    await database.init_db()
+    await database.initialize_default_shipments()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking bot with several worker processes")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.BOT_WORKERS,
+        help="Number of worker processes (default: BOT_WORKERS or CPU count)"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(prepare_database())
+
+    # A socket left by a crashed service would look like a ready one
+    if os.path.exists(config.BOOKING_SERVICE_SOCKET):
+        os.unlink(config.BOOKING_SERVICE_SOCKET)
+
+    context = multiprocessing.get_context('spawn')
+    socket_dir = tempfile.mkdtemp(prefix='booking-bot-')
+    processes = []
+
+    service = context.Process(
+        target=run_child,
+        args=(
+            run_service,
+            config.BOOKING_SERVICE_SOCKET,
+            config.BOOKING_JOURNAL_PATH,
+            config.BOOKING_SNAPSHOT_SECONDS,
+            config.BOOKING_GROUP_COMMIT_MS,
+        ),
+        name='booking-service'
+    )
+    service.start()
+    processes.append(service)
+
+    try:
+        wait_for_socket(config.BOOKING_SERVICE_SOCKET, service)
+
+        update_sockets = []
+        for index in range(args.workers):
+            path = os.path.join(socket_dir, f'worker-{index}.sock')
+            worker = context.Process(
+                target=run_child,
+                args=(serve_worker, path, config.BOOKING_SERVICE_SOCKET, args.workers),
+                name=f'bot-worker-{index}'
+            )
+            worker.start()
+            processes.append(worker)
+            update_sockets.append(path)
+
+        for path, worker in zip(update_sockets, processes[1:]):
+            wait_for_socket(path, worker)
+
+        run_process(poll_updates, update_sockets)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Workers first, so no booking request is cut off by the service
+        for process in reversed(processes):
+            process.terminate()
+            process.join()
+        for name in os.listdir(socket_dir):
+            os.unlink(os.path.join(socket_dir, name))
+        os.rmdir(socket_dir)
+
+
+if __name__ == '__main__':
+    main()